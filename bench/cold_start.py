@@ -0,0 +1,181 @@
+import argparse
+import collections
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import typing
+
+import bench.report
+import bench.stubs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter per sample, like a new Lambda container.
+CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+import khc.app as app
+imported = time.perf_counter()
+app.get_handler()
+created = time.perf_counter()
+class Context:
+    def get_remaining_time_in_millis(self):
+        return 8000
+response = app.lambda_handler(json.loads(sys.argv[1]), Context())
+invoked = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - started,
+    "create_skill_seconds": created - imported,
+    "first_invocation_seconds": invoked - created,
+    "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "speech": response["response"]["outputSpeech"]["ssml"],
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """
+    Parse the output of python -X importtime.
+
+    Args:
+        stderr: The standard error of the interpreter.
+
+    Returns:
+        dict[str, tuple[int, int]]: Self and cumulative import time in
+            microseconds per module.
+    """
+    modules: dict[str, tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        modules[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return modules
+
+
+def run_once(
+    env: dict[str, str], envelope: dict[str, typing.Any]
+) -> dict[str, typing.Any]:
+    """
+    Measure one cold start in a fresh interpreter.
+
+    Args:
+        env: Environment of the interpreter.
+        envelope: The request envelope of the first invocation.
+
+    Returns:
+        dict[str, Any]: The measurements of the child and the parsed import
+            times.
+
+    Raises:
+        RuntimeError: If the child failed or did not get its answer from the
+            stubs.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, json.dumps(envelope)],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=ROOT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Cold start failed:\n{result.stderr[-2000:]}")
+    sample = json.loads(result.stdout.strip().splitlines()[-1])
+    if "Stubhausen" not in sample["speech"]:
+        raise RuntimeError(f"Unexpected answer: {sample['speech']}")
+    sample["imports"] = parse_importtime(result.stderr)
+    return sample
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Measure the cold start of the skill against local stubs of its APIs.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: Exit code.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters")
+    parser.add_argument("--top", type=int, default=25, help="Modules to report")
+    parser.add_argument("--output", help="JSON report file (default: stdout)")
+    parser.add_argument(
+        "--openrouter-latency", default="fixed:0", help="e.g. lognormal:400:0.5"
+    )
+    parser.add_argument("--alexa-latency", default="fixed:0", help="e.g. fixed:50")
+    args = parser.parse_args(argv)
+
+    with (
+        bench.stubs.alexa_stub(args.alexa_latency) as alexa,
+        bench.stubs.openrouter_stub(args.openrouter_latency) as openrouter,
+        tempfile.TemporaryDirectory() as scratch,
+    ):
+        env = {
+            **os.environ,
+            **bench.stubs.stub_environment(alexa.url, openrouter.url),
+            "PYTHONPATH": os.pathsep.join([os.path.join(ROOT, "src"), ROOT]),
+            # Nothing may be cached across samples.
+            "KHC_GAZETTEER_PATH": os.path.join(scratch, "missing.bin"),
+            "KHC_PROGRESSIVE_RESPONSE": "false",
+        }
+        for name in ("KHC_DISK_CACHE_DIR", "KHC_SHARED_CACHE_URL", "KHC_EAGER_INIT"):
+            env.pop(name, None)
+        samples = [
+            run_once(env, bench.stubs.launch_request(alexa.url, device=str(run)))
+            for run in range(args.runs)
+        ]
+
+    self_times: dict[str, list[int]] = collections.defaultdict(list)
+    cumulative_times: dict[str, list[int]] = collections.defaultdict(list)
+    for sample in samples:
+        for module, (self_us, cumulative_us) in sample["imports"].items():
+            self_times[module].append(self_us)
+            cumulative_times[module].append(cumulative_us)
+    modules = sorted(
+        self_times, key=lambda module: -sum(self_times[module]) / args.runs
+    )
+
+    def values(name: str) -> list[float]:
+        return [float(sample[name]) for sample in samples]
+
+    init = [
+        sample["import_seconds"] + sample["create_skill_seconds"] for sample in samples
+    ]
+    bench.report.write_report(
+        {
+            "benchmark": "cold_start",
+            "environment": bench.report.environment(),
+            "runs": args.runs,
+            "import_seconds": bench.report.summarize(values("import_seconds")),
+            "create_skill_seconds": bench.report.summarize(
+                values("create_skill_seconds")
+            ),
+            "init_seconds": bench.report.summarize(init),
+            "first_invocation_seconds": bench.report.summarize(
+                values("first_invocation_seconds")
+            ),
+            "peak_rss_kib": bench.report.summarize(values("peak_rss_kib")),
+            "modules_imported": len(self_times),
+            "imports": [
+                {
+                    "module": module,
+                    "self_us": sum(self_times[module]) / len(self_times[module]),
+                    "cumulative_us": sum(cumulative_times[module])
+                    / len(cumulative_times[module]),
+                }
+                for module in modules[: args.top]
+            ],
+        },
+        args.output,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+import argparse
+import concurrent.futures
+import os
+import random
+import threading
+import time
+import typing
+
+import bench.report
+import bench.stubs
+
+
+def postal_codes(count: int, seed: int = 0) -> list[str]:
+    """
+    Draw distinct German-looking postal codes.
+
+    Args:
+        count: Number of postal codes.
+        seed: Seed of the random generator, for reproducible runs.
+
+    Returns:
+        list[str]: The postal codes, most popular first.
+    """
+    rng = random.Random(seed)
+    return [f"{code:05d}" for code in rng.sample(range(1067, 99999), count)]
+
+
+def zipf_weights(count: int, exponent: float) -> list[float]:
+    """
+    Weights of a Zipf distribution, modelling the skew of real traffic where
+    a few cities send most requests.
+
+    Args:
+        count: Number of ranks.
+        exponent: Skew, 0 for uniform traffic.
+
+    Returns:
+        list[float]: Weight per rank.
+    """
+    return [1 / (rank**exponent) for rank in range(1, count + 1)]
+
+
+class LoadResult:
+    """
+    Outcome of one invocation.
+
+    Args:
+        seconds: Latency of the invocation.
+        outcome: "ok", "fallback" for an apology or fallback answer, or
+            "exception".
+    """
+
+    def __init__(self, seconds: float, outcome: str) -> None:
+        self.seconds = seconds
+        self.outcome = outcome
+
+
+def invoke(
+    handler: typing.Callable[[dict[str, typing.Any], typing.Any], typing.Any],
+    envelope: dict[str, typing.Any],
+    fallbacks: typing.Collection[str],
+    budget_seconds: float,
+) -> LoadResult:
+    """
+    Invoke the Lambda handler once and classify the answer.
+
+    Args:
+        handler: The Lambda handler.
+        envelope: The request envelope.
+        fallbacks: Speech texts that count as degraded answers.
+        budget_seconds: Remaining time reported by the Lambda context.
+
+    Returns:
+        LoadResult: Latency and outcome.
+    """
+    started = time.perf_counter()
+    try:
+        response = handler(envelope, bench.stubs.LambdaContext(budget_seconds))
+        ssml = response["response"]["outputSpeech"]["ssml"]
+        outcome = "fallback" if any(text in ssml for text in fallbacks) else "ok"
+    except Exception:
+        outcome = "exception"
+    return LoadResult(time.perf_counter() - started, outcome)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Drive app.lambda_handler with LaunchRequests against local API stubs.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: Exit code.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--requests", type=int, default=1000, help="Invocations")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel calls")
+    parser.add_argument("--devices", type=int, default=500, help="Distinct devices")
+    parser.add_argument(
+        "--postal-codes", type=int, default=200, help="Distinct postal codes"
+    )
+    parser.add_argument(
+        "--zipf", type=float, default=1.0, help="Skew of postal codes, 0 = uniform"
+    )
+    parser.add_argument(
+        "--no-consent", type=float, default=0.0, help="Share without permission"
+    )
+    parser.add_argument("--alexa-latency", default="lognormal:60:0.4")
+    parser.add_argument("--alexa-error-rate", type=float, default=0.0)
+    parser.add_argument("--openrouter-latency", default="lognormal:700:0.6")
+    parser.add_argument("--openrouter-error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--budget", type=float, default=8.0, help="Lambda time budget in seconds"
+    )
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Skill setting, e.g. KHC_STRUCTURED_VERDICTS=true",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", help="JSON report file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    codes = postal_codes(args.postal_codes, args.seed)
+    weights = zipf_weights(len(codes), args.zipf)
+    device_codes = rng.choices(codes, weights, k=args.devices)
+    device_weights = zipf_weights(args.devices, 0.5)
+    settings = dict(setting.split("=", 1) for setting in args.env)
+
+    with (
+        bench.stubs.alexa_stub(args.alexa_latency, args.alexa_error_rate) as alexa,
+        bench.stubs.openrouter_stub(
+            args.openrouter_latency, args.openrouter_error_rate
+        ) as openrouter,
+    ):
+        os.environ.update(bench.stubs.stub_environment(alexa.url, openrouter.url))
+        os.environ.update(settings)
+        # Imported only now, the skill reads its settings on creation.
+        import khc.app
+        import khc.handler.launch_request_handler
+        import khc.services.openrouter.client
+
+        handler = khc.app.get_handler()
+        fallbacks = [
+            *khc.services.openrouter.client.ERROR_MESSAGES,
+            khc.handler.launch_request_handler.TIMEOUT_MESSAGE,
+        ]
+        envelopes = []
+        for _ in range(args.requests):
+            device = rng.choices(range(args.devices), device_weights)[0]
+            envelopes.append(
+                bench.stubs.launch_request(
+                    alexa.url,
+                    device_codes[device],
+                    str(device),
+                    consent=rng.random() >= args.no_consent,
+                )
+            )
+
+        lock = threading.Lock()
+        results: list[LoadResult] = []
+
+        def run(envelope: dict[str, typing.Any]) -> None:
+            result = invoke(handler, envelope, fallbacks, args.budget)
+            with lock:
+                results.append(result)
+
+        started = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(args.concurrency) as executor:
+            for future in [executor.submit(run, envelope) for envelope in envelopes]:
+                future.result()
+        elapsed = time.perf_counter() - started
+
+        stubs = {
+            name: {"requests": stub.requests, "errors": stub.errors}
+            for name, stub in (("alexa", alexa), ("openrouter", openrouter))
+        }
+
+    outcomes = {
+        outcome: sum(result.outcome == outcome for result in results) / len(results)
+        for outcome in ("ok", "fallback", "exception")
+    }
+    bench.report.write_report(
+        {
+            "benchmark": "load",
+            "environment": bench.report.environment(),
+            "settings": {**vars(args), "env": settings},
+            "latency_seconds": bench.report.summarize(
+                [result.seconds for result in results]
+            ),
+            "throughput_per_second": len(results) / elapsed,
+            "outcome_rates": outcomes,
+            "stubs": stubs,
+        },
+        args.output,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,278 @@
+import argparse
+import json
+import os
+import sys
+import timeit
+import typing
+
+import ask_sdk_core.handler_input
+import ask_sdk_core.skill
+import ask_sdk_core.skill_builder
+import ask_sdk_model
+
+import bench.report
+import bench.stubs
+import khc.handler.launch_request_handler
+import khc.services.openrouter.client
+import khc.services.openrouter.models
+import khc.services.postal_code.provider
+import khc.services.weather.service
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baselines", "micro.json"
+)
+# Allowed slowdown against the baseline before the gate fails. Timings of
+# microseconds vary by a quarter between runs on shared machines.
+TOLERANCE = 0.5
+POSTAL_CODE = "89073"
+ANSWER = "Ja, in Ulm kann man heute eine kurze Hose tragen. Lass baumeln."
+RESPONSE_BODY = json.dumps(
+    {
+        "id": "gen-bench",
+        "model": khc.services.openrouter.client.MODEL,
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": ANSWER},
+            }
+        ],
+        "usage": {"prompt_tokens": 74, "completion_tokens": 21, "total_tokens": 95},
+    }
+)
+
+
+def create_benchmarks() -> dict[str, typing.Callable[[], object]]:
+    """
+    Create one callable per step of an invocation, all without network access.
+
+    The services are real, but the postal code and the answer are cached, so
+    the handler takes the path of a warm invocation.
+
+    Returns:
+        dict[str, Callable[[], object]]: Benchmarks by name, in invocation order.
+    """
+    event = bench.stubs.launch_request("http://127.0.0.1:9", POSTAL_CODE)
+    payload = json.dumps(event)
+
+    weather_service = khc.services.weather.service.WeatherService(
+        openrouter_client=khc.services.openrouter.client.OpenRouterClient(
+            api_key="bench-api-key"
+        )
+    )
+    weather_service.answer_cache.put(POSTAL_CODE, ANSWER)
+    postal_provider = khc.services.postal_code.provider.PostalCodeProvider()
+    launch_handler = khc.handler.launch_request_handler.LaunchRequestHandler(
+        weather_service=weather_service, postal_provider=postal_provider
+    )
+    sb = ask_sdk_core.skill_builder.SkillBuilder()
+    sb.add_request_handler(launch_handler)
+    handler = sb.lambda_handler()
+    skill = ask_sdk_core.skill.CustomSkill(skill_configuration=sb.skill_configuration)
+    serializer = skill.serializer
+
+    request_envelope = typing.cast(
+        ask_sdk_model.RequestEnvelope,
+        serializer.deserialize(payload=payload, obj_type=ask_sdk_model.RequestEnvelope),
+    )
+    postal_provider.cache.put(request_envelope, POSTAL_CODE)
+    # The deadline is read once per handle(), the budget only has to outlast the run.
+    context = bench.stubs.LambdaContext(budget_seconds=24 * 60 * 60)
+    response_envelope = skill.invoke(request_envelope=request_envelope, context=context)
+    if ANSWER not in json.dumps(serializer.serialize(response_envelope)):
+        raise RuntimeError("The handler did not answer from the cache.")
+
+    prompt = (
+        f"Ich bin ein Alexa-Skill. Kann man heute in der Postleitzahl {POSTAL_CODE} "
+        "(Ulm, Baden-Württemberg) eine kurze Hose tragen?"
+    )
+
+    def handle() -> object:
+        return launch_handler.handle(
+            ask_sdk_core.handler_input.HandlerInput(
+                request_envelope=request_envelope, context=context
+            )
+        )
+
+    # Without the address permission the handler asks for it without any API
+    # call, the unreachable endpoint would make a lookup fail loudly.
+    no_consent_envelope = typing.cast(
+        ask_sdk_model.RequestEnvelope,
+        serializer.deserialize(
+            payload=json.dumps(
+                bench.stubs.launch_request(
+                    "http://127.0.0.1:9", POSTAL_CODE, "no-consent", consent=False
+                )
+            ),
+            obj_type=ask_sdk_model.RequestEnvelope,
+        ),
+    )
+
+    if "erlaube" not in json.dumps(
+        serializer.serialize(
+            skill.invoke(request_envelope=no_consent_envelope, context=context)
+        )
+    ):
+        raise RuntimeError("The handler did not ask for the address permission.")
+
+    def no_consent() -> object:
+        return launch_handler.handle(
+            ask_sdk_core.handler_input.HandlerInput(
+                request_envelope=no_consent_envelope, context=context
+            )
+        )
+
+    return {
+        "deserialize_envelope": lambda: serializer.deserialize(
+            payload=payload, obj_type=ask_sdk_model.RequestEnvelope
+        ),
+        # Like the wrapper of SkillBuilder.lambda_handler(), per invocation.
+        "dispatch": lambda: ask_sdk_core.skill.CustomSkill(
+            skill_configuration=sb.skill_configuration
+        ).invoke(request_envelope=request_envelope, context=context),
+        "handle": handle,
+        "no_consent": no_consent,
+        "openrouter_request_to_dict": lambda: json.dumps(
+            khc.services.openrouter.models.OpenRouterRequest(
+                model=khc.services.openrouter.client.MODEL,
+                messages=[{"role": "user", "content": prompt}],
+            ).to_dict()
+        ),
+        "openrouter_response_from_json": lambda: (
+            khc.services.openrouter.models.OpenRouterResponse.from_json(
+                json.loads(RESPONSE_BODY)
+            ).get_message_content()
+        ),
+        "serialize_response": lambda: serializer.serialize(response_envelope),
+        "lambda_handler": lambda: handler(event, context),
+    }
+
+
+def measure(fn: typing.Callable[[], object], repeat: int) -> float:
+    """
+    Time a callable with timeit.
+
+    Args:
+        fn: The callable.
+        repeat: Number of timing runs; the fastest one is reported, the others
+            are slowed down by noise.
+
+    Returns:
+        float: Microseconds per call.
+    """
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+
+def compare(
+    results: dict[str, float], baseline: dict[str, float], tolerance: float
+) -> list[str]:
+    """
+    Find benchmarks slower than their baseline.
+
+    Args:
+        results: Microseconds per call by benchmark.
+        baseline: Baseline microseconds per call by benchmark.
+        tolerance: Allowed slowdown as a fraction of the baseline.
+
+    Returns:
+        list[str]: The regressed benchmarks.
+    """
+    return [
+        name
+        for name, micros in results.items()
+        if name in baseline and micros > baseline[name] * (1 + tolerance)
+    ]
+
+
+def load_baseline(path: str) -> dict[str, float]:
+    """
+    Load stored baselines.
+
+    Args:
+        path: The baseline file.
+
+    Returns:
+        dict[str, float]: Microseconds per call by benchmark, empty if there is
+            no baseline yet.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {name: float(micros) for name, micros in data["micros_per_call"].items()}
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Measure the CPU time of each step of an invocation against stored baselines.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: Exit code, 1 if a benchmark regressed beyond the tolerance.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--repeat", type=int, default=7, help="Timing runs")
+    parser.add_argument(
+        "--tolerance", type=float, default=TOLERANCE, help="Allowed slowdown"
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file")
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="Store results as baseline"
+    )
+    parser.add_argument("--only", action="append", help="Run only this benchmark")
+    parser.add_argument("--output", help="JSON report file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    benchmarks = create_benchmarks()
+    results = {
+        name: measure(fn, args.repeat)
+        for name, fn in benchmarks.items()
+        if not args.only or name in args.only
+    }
+    environment = bench.report.environment()
+
+    if args.update_baseline:
+        baseline = {**load_baseline(args.baseline), **results}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        bench.report.write_report(
+            {"environment": environment, "micros_per_call": baseline}, args.baseline
+        )
+        regressed: list[str] = []
+    else:
+        baseline = load_baseline(args.baseline)
+        regressed = compare(results, baseline, args.tolerance)
+        # Measure again before failing, one noisy run is not a regression.
+        for name in regressed:
+            results[name] = min(results[name], measure(benchmarks[name], args.repeat))
+        regressed = compare(results, baseline, args.tolerance)
+
+    bench.report.write_report(
+        {
+            "benchmark": "micro",
+            "environment": environment,
+            "micros_per_call": results,
+            "baseline_ratio": {
+                name: micros / baseline[name]
+                for name, micros in results.items()
+                if baseline.get(name)
+            },
+            "tolerance": args.tolerance,
+            "regressed": regressed,
+        },
+        args.output,
+    )
+    for name in regressed:
+        print(
+            f"{name}: {results[name]:.1f} us per call, baseline {baseline[name]:.1f} us",
+            file=sys.stderr,
+        )
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
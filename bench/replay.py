@@ -0,0 +1,467 @@
+import argparse
+import collections
+import concurrent.futures
+import datetime
+import hashlib
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+import typing
+
+import bench.load
+import bench.report
+import bench.stubs
+import khc.services.postal_code.provider
+
+# A RESOLVED_MESSAGE of PostalCodeProvider anywhere in a log line.
+RESOLVED_PATTERN = re.compile(
+    re.escape(khc.services.postal_code.provider.RESOLVED_MESSAGE)
+    .replace(r"\{postal_code\}", r"(?P<postal_code>\w+)")
+    .replace(r"\{device\}", r"(?P<device>[0-9a-f]+)")
+)
+# Share of records without a postal code from which capture and replay warn:
+# they all use DEFAULT_POSTAL_CODE, so the cache hit rates say little.
+MISSING_POSTAL_CODE_WARNING = 0.5
+
+
+def anonymize(value: str, salt: str) -> str:
+    """
+    Replace an Alexa id by a salted hash, stable within one capture.
+
+    Args:
+        value: The device or user id.
+        salt: Salt of the capture.
+
+    Returns:
+        str: The first 16 hex digits of the hash.
+    """
+    return hashlib.sha256(f"{salt}:{value}".encode("utf-8")).hexdigest()[:16]
+
+
+def resolved_postal_codes(paths: typing.Iterable[str]) -> dict[str, str]:
+    """
+    Collect the postal codes the skill logged per device.
+
+    Args:
+        paths: Skill logs, e.g. exported from CloudWatch, with the
+            RESOLVED_MESSAGE lines of PostalCodeProvider.
+
+    Returns:
+        dict[str, str]: The latest postal code per device key.
+    """
+    postal_codes: dict[str, str] = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for text in f:
+                match = RESOLVED_PATTERN.search(text)
+                if match:
+                    postal_codes[match["device"]] = match["postal_code"]
+    return postal_codes
+
+
+def to_record(
+    line: dict[str, typing.Any],
+    salt: str,
+    postal_codes: typing.Mapping[str, str] | None = None,
+) -> dict[str, typing.Any] | None:
+    """
+    Reduce a logged request to a replay record.
+
+    Only the timing, the anonymized device and user, the postal code and
+    whether the address permission was granted are kept. Tokens, session and
+    request ids are dropped.
+
+    Args:
+        line: A request envelope, or {"event": envelope, "postal_code": ...}
+            if the postal code the device had is known.
+        salt: Salt for anonymize().
+        postal_codes: Postal codes per device key from
+            resolved_postal_codes(), for envelopes without one.
+
+    Returns:
+        dict[str, Any] | None: The record, or None if it is no LaunchRequest.
+    """
+    envelope = line.get("event", line)
+    request = envelope.get("request") or {}
+    if request.get("type") != "LaunchRequest":
+        return None
+    system: dict[str, typing.Any] = (envelope.get("context") or {}).get("System") or {}
+    device: dict[str, typing.Any] = system.get("device") or {}
+    user: dict[str, typing.Any] = system.get("user") or {}
+    timestamp = datetime.datetime.fromisoformat(
+        request["timestamp"].replace("Z", "+00:00")
+    )
+    device_id = device.get("deviceId", "")
+    postal_code = line.get("postal_code") or (postal_codes or {}).get(
+        khc.services.postal_code.provider.device_key(device_id)
+    )
+    return {
+        "t": round(timestamp.timestamp(), 3),
+        "device": anonymize(device_id, salt),
+        "user": anonymize(user.get("userId", ""), salt),
+        "postal_code": postal_code,
+        "consent": bool((user.get("permissions") or {}).get("consentToken")),
+    }
+
+
+def capture(
+    input_path: str,
+    output_path: str,
+    salt: str,
+    postal_code_logs: typing.Iterable[str] = (),
+) -> tuple[int, int, int]:
+    """
+    Convert logged requests to a compact, anonymized replay log.
+
+    Args:
+        input_path: JSON lines of logged requests, see to_record().
+        output_path: The replay log, JSON lines ordered by time.
+        salt: Salt for anonymize().
+        postal_code_logs: Skill logs to take the postal codes of the devices
+            from, see resolved_postal_codes().
+
+    Returns:
+        tuple[int, int, int]: Records written, lines skipped and records with
+            address permission but without a postal code.
+    """
+    postal_codes = resolved_postal_codes(postal_code_logs)
+    records = []
+    skipped = 0
+    with open(input_path, encoding="utf-8") as f:
+        for text in f:
+            if not text.strip():
+                continue
+            record = to_record(json.loads(text), salt, postal_codes)
+            if record is None:
+                skipped += 1
+                continue
+            records.append(record)
+    records.sort(key=lambda record: record["t"])
+    with open(output_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    return len(records), skipped, len(missing_postal_code(records))
+
+
+def missing_postal_code(
+    records: list[dict[str, typing.Any]],
+) -> list[dict[str, typing.Any]]:
+    """
+    Find the records that replay with DEFAULT_POSTAL_CODE.
+
+    Args:
+        records: Replay records.
+
+    Returns:
+        list[dict[str, Any]]: The records with address permission but without
+            a postal code.
+    """
+    return [
+        record for record in records if record["consent"] and not record["postal_code"]
+    ]
+
+
+def warn_missing_postal_codes(missing: int, total: int) -> None:
+    """
+    Warn if most records lack a postal code, their cache hits are meaningless.
+
+    Args:
+        missing: Records with address permission but without a postal code.
+        total: Records with address permission.
+    """
+    if total and missing / total >= MISSING_POSTAL_CODE_WARNING:
+        print(
+            f"Warning: {missing} of {total} requests have no postal code and use "
+            f"{bench.stubs.DEFAULT_POSTAL_CODE}. Pass the skill logs with "
+            "--postal-code-log to capture them.",
+            file=sys.stderr,
+        )
+
+
+def load_records(path: str, limit: int | None = None) -> list[dict[str, typing.Any]]:
+    """
+    Read a replay log written by capture().
+
+    Args:
+        path: The replay log.
+        limit: Maximum number of records. Defaults to all.
+
+    Returns:
+        list[dict[str, Any]]: The records, ordered by time.
+    """
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(text) for text in f if text.strip()]
+    return records[:limit] if limit is not None else records
+
+
+def schedule(
+    records: list[dict[str, typing.Any]],
+    speedup: float = 1.0,
+    rate: float | None = None,
+) -> list[float]:
+    """
+    Compute when each record is replayed.
+
+    Args:
+        records: The records, ordered by time.
+        speedup: Factor the original inter-arrival times are compressed by.
+            Defaults to 1, the original timing.
+        rate: Fixed rate in requests per second, ignoring the original timing.
+
+    Returns:
+        list[float]: Seconds after the start of the replay, per record.
+    """
+    if rate is not None:
+        return [index / rate for index in range(len(records))]
+    if not records:
+        return []
+    first = records[0]["t"]
+    return [(record["t"] - first) / speedup for record in records]
+
+
+def find_launch_handler(sb: typing.Any) -> typing.Any:
+    """
+    Find the LaunchRequestHandler of a skill, to read its cache statistics.
+
+    Args:
+        sb: SkillBuilder of khc.app.create_skill().
+
+    Returns:
+        LaunchRequestHandler: The handler.
+    """
+    import khc.handler.launch_request_handler
+
+    for chain in sb.runtime_configuration_builder.request_handler_chains:
+        if isinstance(
+            chain.request_handler,
+            khc.handler.launch_request_handler.LaunchRequestHandler,
+        ):
+            return chain.request_handler
+    raise LookupError("The skill has no LaunchRequestHandler.")
+
+
+def cache_report(stats: typing.Any) -> dict[str, float]:
+    """
+    Describe an AnswerCache with its hit rate.
+
+    Args:
+        stats: CacheStats of the cache.
+
+    Returns:
+        dict[str, float]: The counters and the hit rate.
+    """
+    counters = stats.to_dict()
+    lookups = counters["hits"] + counters["misses"]
+    return {**counters, "hit_rate": counters["hits"] / lookups if lookups else 0.0}
+
+
+def replay(args: argparse.Namespace) -> int:
+    """
+    Replay a log against the lambda handler of the skill with stubbed APIs.
+
+    Every device answers the address lookup with its recorded postal code, so
+    the per-device and per-postal-code caches see the recorded skew.
+
+    Args:
+        args: The arguments of the replay command.
+
+    Returns:
+        int: Exit code.
+    """
+    records = load_records(args.log, args.limit)
+    if not records:
+        print(f"No records in {args.log}.")
+        return 1
+    offsets = schedule(records, args.speedup, args.rate)
+    consenting = sum(record["consent"] for record in records)
+    defaulted = len(missing_postal_code(records))
+    warn_missing_postal_codes(defaulted, consenting)
+    settings = {
+        # Directives would be counted as address lookups by the Alexa stub.
+        "KHC_PROGRESSIVE_RESPONSE": "false",
+        **dict(setting.split("=", 1) for setting in args.env),
+    }
+
+    with (
+        bench.stubs.alexa_stub(args.alexa_latency, args.alexa_error_rate) as alexa,
+        bench.stubs.openrouter_stub(
+            args.openrouter_latency, args.openrouter_error_rate
+        ) as openrouter,
+    ):
+        os.environ.update(bench.stubs.stub_environment(alexa.url, openrouter.url))
+        os.environ.update(settings)
+        # Imported only now, the skill reads its settings on creation.
+        import khc.app
+        import khc.handler.launch_request_handler
+        import khc.services.openrouter.client
+
+        sb = khc.app.create_skill()
+        launch_handler = find_launch_handler(sb)
+        handler = sb.lambda_handler()
+        fallbacks = [
+            *khc.services.openrouter.client.ERROR_MESSAGES,
+            khc.handler.launch_request_handler.TIMEOUT_MESSAGE,
+        ]
+        envelopes = [
+            bench.stubs.launch_request(
+                alexa.url,
+                record.get("postal_code") or bench.stubs.DEFAULT_POSTAL_CODE,
+                record["device"],
+                consent=record["consent"],
+            )
+            for record in records
+        ]
+
+        lock = threading.Lock()
+        results: list[bench.load.LoadResult] = []
+        queue_delays: list[float] = []
+
+        def run(envelope: dict[str, typing.Any], due: float) -> None:
+            delay = time.perf_counter() - due
+            result = bench.load.invoke(handler, envelope, fallbacks, args.budget)
+            with lock:
+                results.append(result)
+                queue_delays.append(delay)
+
+        started = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(args.concurrency) as executor:
+            futures = []
+            for envelope, offset in zip(envelopes, offsets):
+                due = started + offset
+                time.sleep(max(due - time.perf_counter(), 0.0))
+                futures.append(executor.submit(run, envelope, due))
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - started
+
+        stubs = {
+            name: {"requests": stub.requests, "errors": stub.errors}
+            for name, stub in (("alexa", alexa), ("openrouter", openrouter))
+        }
+
+    postal_codes: collections.Counter[str | None] = collections.Counter(
+        record.get("postal_code") for record in records if record["consent"]
+    )
+    top = postal_codes.most_common(max(len(postal_codes) // 10, 1))
+    bench.report.write_report(
+        {
+            "benchmark": "replay",
+            "environment": bench.report.environment(),
+            "settings": {**vars(args), "env": settings},
+            "traffic": {
+                "requests": len(records),
+                "original_seconds": records[-1]["t"] - records[0]["t"],
+                "devices": len({record["device"] for record in records}),
+                "postal_codes": len(postal_codes),
+                "default_postal_code_requests": defaulted,
+                "default_postal_code_share": defaulted / max(consenting, 1),
+                "top_10_percent_postal_code_share": sum(count for _, count in top)
+                / max(sum(postal_codes.values()), 1),
+            },
+            "latency_seconds": bench.report.summarize(
+                [result.seconds for result in results]
+            ),
+            "queue_delay_seconds": bench.report.summarize(queue_delays),
+            "throughput_per_second": len(results) / elapsed,
+            "outcome_rates": {
+                outcome: sum(result.outcome == outcome for result in results)
+                / len(results)
+                for outcome in ("ok", "fallback", "exception")
+            },
+            "caches": {
+                "answer_cache": cache_report(
+                    launch_handler.weather_service.answer_cache.stats
+                ),
+                "verdict_cache": cache_report(
+                    launch_handler.weather_service.verdict_cache.stats
+                ),
+            },
+            "stubs": stubs,
+        },
+        args.output,
+    )
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Capture anonymized Alexa requests and replay them against the skill.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: Exit code.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    capture_parser = commands.add_parser("capture", help="Write a replay log")
+    capture_parser.add_argument("input", help="JSON lines of logged requests")
+    capture_parser.add_argument("output", help="Replay log to write")
+    capture_parser.add_argument(
+        "--postal-code-log",
+        action="append",
+        default=[],
+        help="Skill log with the resolved postal codes of the devices",
+    )
+    capture_parser.add_argument(
+        "--salt",
+        default=None,
+        help="Salt of the id hashes, random by default. Reuse it to link captures",
+    )
+
+    replay_parser = commands.add_parser("replay", help="Replay a log")
+    replay_parser.add_argument("log", help="Replay log written by capture")
+    timing = replay_parser.add_mutually_exclusive_group()
+    timing.add_argument(
+        "--speedup",
+        type=float,
+        default=1.0,
+        help="Compress the original inter-arrival times, 1 = original timing",
+    )
+    timing.add_argument("--rate", type=float, help="Fixed requests per second")
+    replay_parser.add_argument("--limit", type=int, help="Replay the first records")
+    replay_parser.add_argument("--concurrency", type=int, default=32)
+    replay_parser.add_argument("--alexa-latency", default="lognormal:60:0.4")
+    replay_parser.add_argument("--alexa-error-rate", type=float, default=0.0)
+    replay_parser.add_argument("--openrouter-latency", default="lognormal:700:0.6")
+    replay_parser.add_argument("--openrouter-error-rate", type=float, default=0.0)
+    replay_parser.add_argument(
+        "--budget", type=float, default=8.0, help="Lambda time budget in seconds"
+    )
+    replay_parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Skill setting, e.g. KHC_REGION=prefix:2",
+    )
+    replay_parser.add_argument("--output", help="JSON report file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.command == "capture":
+        written, skipped, missing = capture(
+            args.input,
+            args.output,
+            args.salt or secrets.token_hex(16),
+            args.postal_code_log,
+        )
+        print(
+            f"Captured {written} requests, skipped {skipped}, "
+            f"{missing} without postal code."
+        )
+        warn_missing_postal_codes(
+            missing,
+            sum(record["consent"] for record in load_records(args.output)),
+        )
+        return 0
+    return replay(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
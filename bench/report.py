@@ -0,0 +1,83 @@
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import typing
+
+
+def percentile(values: typing.Sequence[float], p: float) -> float:
+    """
+    Return a percentile of the values (nearest rank).
+
+    Args:
+        values: The measured values, not necessarily sorted.
+        p: The percentile as a fraction, e.g. 0.95.
+
+    Returns:
+        float: The percentile, or NaN for no values.
+    """
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p * len(ordered)), 1) - 1]
+
+
+def summarize(values: typing.Sequence[float]) -> dict[str, float]:
+    """
+    Summarize measurements for a report.
+
+    Args:
+        values: The measured values.
+
+    Returns:
+        dict[str, float]: Count, mean, p50, p95, p99 and max.
+    """
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values) if values else math.nan,
+        "p50": percentile(values, 0.5),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": max(values) if values else math.nan,
+    }
+
+
+def environment() -> dict[str, str]:
+    """
+    Describe what was measured, so reports of different commits can be compared.
+
+    Returns:
+        dict[str, str]: Git commit, Python version and machine.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+
+
+def write_report(report: dict[str, object], path: str | None) -> None:
+    """
+    Write a report as JSON to a file or stdout.
+
+    Args:
+        report: The report.
+        path: The output file, or None for stdout.
+    """
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path is None:
+        sys.stdout.write(text + "\n")
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
@@ -0,0 +1,330 @@
+import http.server
+import json
+import math
+import random
+import re
+import threading
+import time
+import typing
+import uuid
+
+ADDRESS_PATH = re.compile(
+    r"^/v1/devices/([^/]+)/settings/address/countryAndPostalCode$"
+)
+DEFAULT_POSTAL_CODE = "10115"
+
+
+def parse_latency(spec: str) -> typing.Callable[[], float]:
+    """
+    Parse a latency distribution of a stub.
+
+    Args:
+        spec: "fixed:MS", "uniform:MIN_MS:MAX_MS" or "lognormal:MEDIAN_MS:SIGMA".
+            Lognormal latencies have the long tail of real APIs.
+
+    Returns:
+        Callable[[], float]: Draws a latency in seconds.
+
+    Raises:
+        ValueError: If the spec is invalid.
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(":")] if params else []
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(max(values[0], 0.001) / 1000)
+        return lambda: random.lognormvariate(mu, values[1])
+    raise ValueError(f"Invalid latency distribution: {spec}")
+
+
+class StubServer(http.server.ThreadingHTTPServer):
+    """
+    Local stand-in for an HTTP API, serving on a random port in a thread.
+
+    Every request waits for a latency drawn from the distribution and fails
+    with a 500 at the given error rate.
+
+    Args:
+        latency: Latency distribution spec, see parse_latency().
+            Defaults to no latency.
+        error_rate: Share of requests answered with a 500. Defaults to 0.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        handler: type[http.server.BaseHTTPRequestHandler],
+        latency: str = "fixed:0",
+        error_rate: float = 0.0,
+    ) -> None:
+        super().__init__(("127.0.0.1", 0), handler)
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "StubServer":
+        """Serve in a daemon thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def delay(self) -> bool:
+        """
+        Wait for one request's latency and decide whether it fails.
+
+        Returns:
+            bool: True if the request should be answered with an error.
+        """
+        time.sleep(max(self.latency(), 0.0))
+        failed = random.random() < self.error_rate
+        with self._lock:
+            self.requests += 1
+            self.errors += failed
+        return failed
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def stub(self) -> StubServer:
+        return typing.cast(StubServer, self.server)
+
+    def send_json(self, status: int, data: object) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_empty(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def read_json(self) -> dict[str, typing.Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        data = json.loads(self.rfile.read(length) or b"{}")
+        return data if isinstance(data, dict) else {}
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class AlexaHandler(StubHandler):
+    """
+    Device Address API and directive service. The postal code of a device is
+    the part of its id after the last "-", e.g. "bench-device-7-89073".
+    """
+
+    def do_GET(self) -> None:
+        match = ADDRESS_PATH.match(self.path)
+        if match is None:
+            self.send_empty(404)
+            return
+        if self.stub.delay():
+            self.send_json(500, {"message": "Stub error"})
+            return
+        _, _, postal_code = match.group(1).rpartition("-")
+        self.send_json(
+            200,
+            {
+                "countryCode": "DE",
+                "postalCode": postal_code
+                if postal_code.isdigit()
+                else DEFAULT_POSTAL_CODE,
+            },
+        )
+
+    def do_POST(self) -> None:
+        self.read_json()
+        if self.path != "/v1/directives":
+            self.send_empty(404)
+            return
+        self.send_empty(500 if self.stub.delay() else 204)
+
+
+class OpenRouterHandler(StubHandler):
+    """
+    Chat completions endpoint, answering free-text, verdict, batch and
+    streaming requests like the skill expects.
+    """
+
+    def do_POST(self) -> None:
+        request = self.read_json()
+        if self.stub.delay():
+            self.send_json(500, {"error": {"message": "Stub error"}})
+            return
+        content = self.answer(request)
+        if request.get("stream"):
+            self.send_stream(content)
+            return
+        self.send_json(
+            200,
+            {
+                "id": f"gen-{uuid.uuid4().hex}",
+                "choices": [{"message": {"role": "assistant", "content": content}}],
+            },
+        )
+
+    @staticmethod
+    def answer(request: dict[str, typing.Any]) -> str:
+        prompt = str(request.get("messages", [{}])[-1].get("content", ""))
+        response_format = request.get("response_format") or {}
+        name = response_format.get("json_schema", {}).get("name")
+        if name == "verdicts":
+            codes = re.findall(r"^(\d{5})", prompt, re.MULTILINE)
+            return json.dumps(
+                {"verdicts": [{"plz": code, "shorts": True} for code in codes]}
+            )
+        if name == "verdict":
+            return json.dumps({"shorts": True, "place": "Stubhausen"})
+        return "Ja, in Stubhausen kann man heute eine kurze Hose tragen. Lass baumeln."
+
+    def send_stream(self, content: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for word in content.split(" "):
+            chunk = {"choices": [{"delta": {"content": word + " "}}]}
+            self.wfile.write(
+                f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+            )
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+def alexa_stub(latency: str = "fixed:0", error_rate: float = 0.0) -> StubServer:
+    """
+    Create a stub of the Alexa APIs, not started yet.
+
+    Args:
+        latency: Latency distribution spec, see parse_latency().
+        error_rate: Share of requests answered with a 500.
+
+    Returns:
+        StubServer: The stub.
+    """
+    return StubServer(AlexaHandler, latency, error_rate)
+
+
+def openrouter_stub(latency: str = "fixed:0", error_rate: float = 0.0) -> StubServer:
+    """
+    Create a stub of the OpenRouter chat completions API, not started yet.
+
+    Args:
+        latency: Latency distribution spec, see parse_latency().
+        error_rate: Share of requests answered with a 500.
+
+    Returns:
+        StubServer: The stub.
+    """
+    return StubServer(OpenRouterHandler, latency, error_rate)
+
+
+def launch_request(
+    api_endpoint: str,
+    postal_code: str = DEFAULT_POSTAL_CODE,
+    device: str = "0",
+    consent: bool = True,
+) -> dict[str, typing.Any]:
+    """
+    Build a LaunchRequest envelope as Alexa sends it.
+
+    Args:
+        api_endpoint: Base URL of the Alexa APIs, e.g. of alexa_stub().
+        postal_code: Postal code the stub returns for the device.
+        device: Distinguishes devices with the same postal code.
+        consent: Whether the user granted the address permission.
+
+    Returns:
+        dict[str, Any]: The request envelope.
+    """
+    user: dict[str, typing.Any] = {"userId": f"amzn1.ask.account.bench-{device}"}
+    if consent:
+        user["permissions"] = {"consentToken": "bench-consent-token"}
+    return {
+        "version": "1.0",
+        "session": {
+            "new": True,
+            "sessionId": f"amzn1.echo-api.session.{uuid.uuid4()}",
+            "application": {"applicationId": "amzn1.ask.skill.bench"},
+            "user": user,
+        },
+        "context": {
+            "System": {
+                "application": {"applicationId": "amzn1.ask.skill.bench"},
+                "user": user,
+                "device": {
+                    "deviceId": f"bench-device-{device}-{postal_code}",
+                    "supportedInterfaces": {},
+                },
+                "apiEndpoint": api_endpoint,
+                "apiAccessToken": "bench-access-token",
+            }
+        },
+        "request": {
+            "type": "LaunchRequest",
+            "requestId": f"amzn1.echo-api.request.{uuid.uuid4()}",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "locale": "de-DE",
+        },
+    }
+
+
+class LambdaContext:
+    """
+    Minimal Lambda context for invoking the handler locally.
+
+    Args:
+        budget_seconds: Remaining time reported to the handler. Defaults to 8.
+    """
+
+    def __init__(self, budget_seconds: float = 8.0) -> None:
+        self._deadline = time.monotonic() + budget_seconds
+
+    def get_remaining_time_in_millis(self) -> int:
+        return int((self._deadline - time.monotonic()) * 1000)
+
+
+def stub_environment(alexa_url: str, openrouter_url: str) -> dict[str, str]:
+    """
+    Environment variables pointing the skill at the stubs.
+
+    Args:
+        alexa_url: Base URL of alexa_stub().
+        openrouter_url: Base URL of openrouter_stub().
+
+    Returns:
+        dict[str, str]: The variables.
+    """
+    return {
+        "OPENROUTER_API_KEY": "bench-api-key",
+        "KHC_OPENROUTER_URL": f"{openrouter_url}/api/v1/chat/completions",
+        "KHC_ALEXA_API_ENDPOINT": alexa_url,
+    }
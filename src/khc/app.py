@@ -1,27 +1,212 @@
+import datetime
+import logging
 import os
-import khc.handler.launch_request_handler
-import khc.services.postal_code.provider
-import khc.services.openrouter.client
-import khc.services.weather.service
-import ask_sdk_core.skill_builder
+import threading
+import time
+import typing
+
+import khc.base.deadline
+
+ALEXA_API_ENDPOINT = "https://api.eu.amazonalexa.com"
+# Upper bound for importing this module, checked by the tests. The services,
+# requests and the ask-sdk are only imported by create_skill().
+IMPORT_BUDGET_SECONDS = 0.05
+
+logger = logging.getLogger(__name__)
 
 
 def create_skill():
     """
     Create and configure the Alexa skill with necessary handlers and services.
 
+    The modules of optional features are only imported if their environment
+    variable enables them.
+
     Returns:
         ask_sdk_core.skill_builder.SkillBuilder: Configured SkillBuilder instance.
     """
+    import ask_sdk_core.skill_builder
+    import khc.handler.launch_request_handler
+    import khc.services.gazetteer.index
+    import khc.services.openrouter.client
+    import khc.services.openrouter.models
+    import khc.services.postal_code.cache
+    import khc.services.postal_code.provider
+    import khc.services.session
+    import khc.services.weather.cache
+    import khc.services.weather.service
+
     api_key = os.getenv("OPENROUTER_API_KEY")
+    pool_maxsize = int(os.getenv("KHC_HTTP_POOL_MAXSIZE", "10"))
+    prime = os.getenv("KHC_PRIME_CONNECTIONS", "false").lower() == "true"
+
+    postal_session = khc.services.session.create_session(
+        pool_maxsize=pool_maxsize,
+        prime_urls=[os.getenv("KHC_ALEXA_API_ENDPOINT", ALEXA_API_ENDPOINT)]
+        if prime
+        else [],
+    )
+    openrouter_url = os.getenv(
+        "KHC_OPENROUTER_URL", khc.services.openrouter.client.OPENROUTER_URL
+    )
+    openrouter_session = khc.services.session.create_session(
+        pool_maxsize=pool_maxsize,
+        prime_urls=[openrouter_url] if prime else [],
+    )
+
+    postal_code_db = os.getenv("KHC_POSTAL_CODE_DB")
+    persistence_adapter = None
+    if postal_code_db:
+        import khc.services.postal_code.persistence
+
+        persistence_adapter = (
+            khc.services.postal_code.persistence.SQLitePersistenceAdapter(
+                postal_code_db
+            )
+        )
+    postal_cache = khc.services.postal_code.cache.PostalCodeCache(
+        persistence_adapter=persistence_adapter
+    )
+
+    postal_provider = khc.services.postal_code.provider.PostalCodeProvider(
+        session=postal_session, cache=postal_cache
+    )
+    models = [model for model in os.getenv("KHC_MODELS", "").split(",") if model]
+    router = None
+    if models:
+        import khc.services.openrouter.router
+
+        router = khc.services.openrouter.router.ModelRouter(
+            models,
+            exploration=float(
+                os.getenv(
+                    "KHC_EXPLORATION", str(khc.services.openrouter.router.EXPLORATION)
+                )
+            ),
+        )
+    disk_cache_dir = os.getenv("KHC_DISK_CACHE_DIR")
+    disk_cache = None
+    if disk_cache_dir:
+        import khc.services.openrouter.disk_cache
+
+        disk_cache = khc.services.openrouter.disk_cache.DiskCache(
+            disk_cache_dir,
+            ttl_seconds=float(os.getenv("KHC_DISK_CACHE_TTL_SECONDS", "3600")),
+            mode=os.getenv(
+                "KHC_DISK_CACHE_MODE", khc.services.openrouter.disk_cache.READ_WRITE
+            ),
+        )
+    openrouter_client = khc.services.openrouter.client.OpenRouterClient(
+        api_key=api_key,
+        session=openrouter_session,
+        model=os.getenv("KHC_MODEL", khc.services.openrouter.client.MODEL),
+        hedge_model=os.getenv("KHC_HEDGE_MODEL") or None,
+        hedge_percentile=float(
+            os.getenv(
+                "KHC_HEDGE_PERCENTILE",
+                str(khc.services.openrouter.client.HEDGE_PERCENTILE),
+            )
+        ),
+        hedge_ratio=float(
+            os.getenv(
+                "KHC_HEDGE_RATIO", str(khc.services.openrouter.client.HEDGE_RATIO)
+            )
+        ),
+        router=router,
+        emit_metrics=os.getenv("KHC_METRICS", "false").lower() == "true",
+        disk_cache=disk_cache,
+        url=openrouter_url,
+    )
+    answer_store_path = os.getenv("KHC_ANSWER_STORE_PATH")
+    answer_store = None
+    if answer_store_path:
+        import khc.services.weather.answer_store
+
+        answer_store = khc.services.weather.answer_store.AnswerStore(answer_store_path)
+    gazetteer = khc.services.gazetteer.index.GazetteerIndex(
+        os.getenv("KHC_GAZETTEER_PATH", khc.services.gazetteer.index.DEFAULT_PATH)
+    )
+    refresh_after = os.getenv("KHC_REFRESH_AFTER_MINUTES")
+    refresh_delta = (
+        datetime.timedelta(minutes=float(refresh_after)) if refresh_after else None
+    )
+    negative_ttl = os.getenv("KHC_NEGATIVE_TTL_SECONDS")
+    negative_delta = (
+        datetime.timedelta(seconds=float(negative_ttl)) if negative_ttl else None
+    )
+    structured = os.getenv("KHC_STRUCTURED_VERDICTS", "false").lower() == "true"
+    region = os.getenv("KHC_REGION", "postal_code")
+    region_mapper = None
+    if region != "postal_code":
+        import khc.services.weather.region
+
+        if not structured and answer_store is None:
+            # Only the verdict cache and the answer store work per region.
+            logger.warning(
+                f"KHC_REGION={region} has no effect without "
+                "KHC_STRUCTURED_VERDICTS=true or KHC_ANSWER_STORE_PATH, answers "
+                "are cached per postal code."
+            )
+
+        region_mapper = khc.services.weather.region.create_region_mapper(
+            region, gazetteer
+        )
+    shared_cache_url = os.getenv("KHC_SHARED_CACHE_URL")
+    answer_cache: khc.services.weather.cache.AnswerCache[str]
+    verdict_cache: khc.services.weather.cache.AnswerCache[
+        khc.services.openrouter.models.ShortsVerdict
+    ]
+    if shared_cache_url:
+        import khc.services.weather.shared_cache
 
-    postal_provider = khc.services.postal_code.provider.PostalCodeProvider()
-    openrouter_client = khc.services.openrouter.client.OpenRouterClient(api_key=api_key)
+        backend = khc.services.weather.shared_cache.create_backend(shared_cache_url)
+        answer_cache = khc.services.weather.shared_cache.TieredCache(
+            backend,
+            "answer",
+            refresh_after=refresh_delta,
+            negative_ttl=negative_delta,
+        )
+        verdict_cache = khc.services.weather.shared_cache.create_verdict_cache(
+            backend, region, refresh_after=refresh_delta, negative_ttl=negative_delta
+        )
+    else:
+        answer_cache = khc.services.weather.cache.AnswerCache(
+            refresh_after=refresh_delta, negative_ttl=negative_delta
+        )
+        verdict_cache = khc.services.weather.cache.AnswerCache(
+            refresh_after=refresh_delta, negative_ttl=negative_delta
+        )
     weather_service = khc.services.weather.service.WeatherService(
-        openrouter_client=openrouter_client
+        openrouter_client=openrouter_client,
+        answer_cache=answer_cache,
+        verdict_cache=verdict_cache,
+        stream=os.getenv("KHC_STREAM_COMPLETIONS", "false").lower() == "true",
+        structured=structured,
+        gazetteer=gazetteer,
+        answer_store=answer_store,
+        region_mapper=region_mapper,
     )
+    progressive_response = None
+    if os.getenv("KHC_PROGRESSIVE_RESPONSE", "false").lower() == "true":
+        import khc.services.directive.progressive_response
+
+        progressive_response = (
+            khc.services.directive.progressive_response.ProgressiveResponseSender(
+                # The directive service is served by the same host as the address API.
+                session=postal_session,
+                delay_seconds=float(
+                    os.getenv(
+                        "KHC_PROGRESSIVE_RESPONSE_DELAY_SECONDS",
+                        str(khc.services.directive.progressive_response.DELAY_SECONDS),
+                    )
+                ),
+            )
+        )
     launch_handler = khc.handler.launch_request_handler.LaunchRequestHandler(
-        weather_service=weather_service, postal_provider=postal_provider
+        weather_service=weather_service,
+        postal_provider=postal_provider,
+        progressive_response=progressive_response,
+        speculate=os.getenv("KHC_SPECULATE", "false").lower() == "true",
     )
 
     sb = ask_sdk_core.skill_builder.SkillBuilder()
@@ -29,5 +214,48 @@ def create_skill():
     return sb
 
 
-sb = create_skill()
-lambda_handler = sb.lambda_handler()
+_handler: typing.Callable[[dict[str, typing.Any], typing.Any], typing.Any] | None = None
+_handler_lock = threading.Lock()
+
+
+def get_handler() -> typing.Callable[[dict[str, typing.Any], typing.Any], typing.Any]:
+    """
+    Return the Lambda handler of the skill, creating the skill on first use.
+
+    Returns:
+        Callable: The handler built by the SkillBuilder of create_skill().
+    """
+    global _handler
+    with _handler_lock:
+        if _handler is None:
+            _handler = create_skill().lambda_handler()
+        return _handler
+
+
+def lambda_handler(event: dict[str, typing.Any], context: typing.Any) -> typing.Any:
+    """
+    Entry point of the Lambda function.
+
+    The skill is created on the first invocation rather than on import, so
+    the init phase only loads this module. Set KHC_EAGER_INIT=true to create it
+    during the init phase instead, e.g. with provisioned concurrency, where
+    the init phase is not on the path of a request. The start of the
+    invocation is recorded before, so the deadline of the request includes the
+    time spent creating the skill.
+
+    Args:
+        event: The Alexa request envelope.
+        context: The Lambda context.
+
+    Returns:
+        The Alexa response envelope.
+    """
+    token = khc.base.deadline.INVOCATION_STARTED.set(time.monotonic())
+    try:
+        return get_handler()(event, context)
+    finally:
+        khc.base.deadline.INVOCATION_STARTED.reset(token)
+
+
+if os.getenv("KHC_EAGER_INIT", "false").lower() == "true":
+    get_handler()
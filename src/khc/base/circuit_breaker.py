@@ -0,0 +1,195 @@
+import collections
+import logging
+import threading
+import time
+import typing
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open."""
+
+
+class CallPermit:
+    """
+    Admission of one call by CircuitBreaker.allow(), passed back with the
+    outcome of the call.
+
+    Args:
+        generation: Number of times the circuit had opened when the call was
+            admitted.
+        probe: Whether the call is the probe of the half-open circuit.
+    """
+
+    def __init__(self, generation: int, probe: bool = False) -> None:
+        self.generation = generation
+        self.probe = probe
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker for calls to an unreliable upstream service.
+
+    The breaker is closed while the upstream service is healthy. It opens once
+    enough of the recent calls failed or were slower than slow_seconds, and
+    rejects calls for open_seconds. Afterwards it is half-open and lets a
+    single probe call through: if the probe succeeds, the breaker closes
+    again, otherwise it opens for another open_seconds. Outcomes are matched
+    to the permit allow() gave their call: only the probe decides the
+    half-open state, and calls admitted before the circuit last opened are
+    ignored.
+
+    Args:
+        failure_ratio: Share of bad calls in the window that opens the circuit.
+            Defaults to 0.5.
+        slow_seconds: Calls taking longer than this count as bad.
+            Defaults to 3.0.
+        window: Number of most recent calls considered. Defaults to 20.
+        min_calls: Number of calls in the window needed before the circuit can
+            open. Defaults to 5.
+        open_seconds: Time the circuit stays open. Defaults to 30.0.
+        clock: Monotonic clock in seconds. Defaults to time.monotonic.
+    """
+
+    def __init__(
+        self,
+        failure_ratio: float = 0.5,
+        slow_seconds: float = 3.0,
+        window: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_ratio = failure_ratio
+        self.slow_seconds = slow_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self._outcomes: collections.deque[bool] = collections.deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """The current state: CLOSED, OPEN or HALF_OPEN."""
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> CallPermit | None:
+        """
+        Return whether a call may be made now.
+
+        In the half-open state only one probe call is allowed at a time. Every
+        allowed call must be followed by record_success() or record_failure()
+        with the returned permit.
+
+        Returns:
+            CallPermit | None: The permit of the call, or None if it may not
+                be made.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return CallPermit(self._generation)
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return CallPermit(self._generation, probe=True)
+            return None
+
+    def admits(self) -> bool:
+        """
+        Return whether allow() would admit a call now, without taking a permit.
+
+        Returns:
+            bool: False while the circuit is open or the probe of the half-open
+                circuit is running.
+        """
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN and not self._probing)
+
+    def record_success(
+        self,
+        seconds: float,
+        slow_seconds: float | None = None,
+        permit: CallPermit | None = None,
+    ) -> None:
+        """
+        Record a call that returned, slow calls count as bad.
+
+        Args:
+            seconds: Duration of the call.
+            slow_seconds: Threshold for this call, e.g. for calls that may
+                legitimately take longer. Defaults to the slow_seconds of the
+                breaker.
+            permit: The permit allow() gave the call. Defaults to None, a call
+                admitted now.
+        """
+        threshold = self.slow_seconds if slow_seconds is None else slow_seconds
+        self._record(seconds > threshold, permit)
+
+    def record_failure(self, permit: CallPermit | None = None) -> None:
+        """
+        Record a call that failed.
+
+        Args:
+            permit: The permit allow() gave the call. Defaults to None, a call
+                admitted now.
+        """
+        self._record(True, permit)
+
+    def release(self, permit: CallPermit) -> None:
+        """
+        Give a permit back without an outcome, e.g. for a call cut short by
+        the caller's own deadline, which tells nothing about the upstream
+        service. A released probe lets the next call probe instead.
+
+        Args:
+            permit: The permit allow() gave the call.
+        """
+        with self._lock:
+            if permit.probe and self._probing and permit.generation == self._generation:
+                self._probing = False
+
+    def _record(self, bad: bool, permit: CallPermit | None) -> None:
+        with self._lock:
+            if permit is not None and permit.probe:
+                if self._probing and permit.generation == self._generation:
+                    self._probing = False
+                    if bad:
+                        self._open()
+                    else:
+                        logger.info("Circuit closed.")
+                        self._state = CLOSED
+                        self._outcomes.clear()
+                return
+            if permit is not None and permit.generation != self._generation:
+                # Admitted before the circuit last opened, it tells nothing
+                # about the upstream service since.
+                return
+            self._outcomes.append(bad)
+            if (
+                self._state == CLOSED
+                and len(self._outcomes) >= self.min_calls
+                and sum(self._outcomes) >= self.failure_ratio * len(self._outcomes)
+            ):
+                self._open()
+
+    def _open(self) -> None:
+        logger.warning(f"Circuit opened for {self.open_seconds:.0f}s.")
+        self._generation += 1
+        self._state = OPEN
+        self._opened_at = self.clock()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+        return self._state
@@ -0,0 +1,132 @@
+import contextvars
+import time
+import typing
+import aws_lambda_typing.context as context_
+
+# Alexa gives up on a skill response after 8 seconds.
+ALEXA_BUDGET_SECONDS = 7.5
+# Time kept back for building and serializing the response.
+RESERVE_SECONDS = 0.3
+# Stages are not started with less than this many seconds left.
+MINIMUM_SECONDS = 0.05
+# Monotonic time at which the running invocation entered the Lambda handler,
+# set by khc.app.lambda_handler before the skill is created.
+INVOCATION_STARTED: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "invocation_started", default=None
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the time budget of a request is used up."""
+
+
+class Deadline:
+    """
+    Point in time by which a request has to be answered.
+
+    A deadline is created once per invocation and handed down the pipeline, so
+    every stage can derive its timeout from the time that is actually left.
+
+    Args:
+        expires_at: Time on the clock at which the budget is used up.
+        clock: Monotonic clock in seconds. Defaults to time.monotonic.
+    """
+
+    def __init__(
+        self,
+        expires_at: float,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.expires_at = expires_at
+        self.clock = clock
+
+    @classmethod
+    def after(
+        cls, seconds: float, clock: typing.Callable[[], float] = time.monotonic
+    ) -> "Deadline":
+        """
+        Create a deadline the given number of seconds from now.
+
+        Args:
+            seconds: Budget in seconds.
+            clock: Monotonic clock in seconds. Defaults to time.monotonic.
+
+        Returns:
+            Deadline: The new deadline.
+        """
+        return cls(expires_at=clock() + seconds, clock=clock)
+
+    @classmethod
+    def from_lambda_context(
+        cls,
+        context: context_.Context | None,
+        budget: float = ALEXA_BUDGET_SECONDS,
+        reserve: float = RESERVE_SECONDS,
+        started: float | None = None,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> "Deadline":
+        """
+        Create the deadline for an invocation from the Lambda context.
+
+        The Alexa response budget counts from the start of the invocation, so
+        the time spent creating the skill on a cold start and deserializing the
+        request is charged against it. The deadline is further capped by the
+        remaining Lambda time.
+
+        Args:
+            context: Lambda context, or None when running outside Lambda.
+            budget: Maximum budget in seconds. Defaults to ALEXA_BUDGET_SECONDS.
+            reserve: Seconds kept back for building the response.
+                Defaults to RESERVE_SECONDS.
+            started: Time on the clock at which the invocation started.
+                Defaults to INVOCATION_STARTED, or now if it is not set.
+            clock: Monotonic clock in seconds. Defaults to time.monotonic.
+
+        Returns:
+            Deadline: The deadline for the invocation.
+        """
+        now = clock()
+        if started is None:
+            started = INVOCATION_STARTED.get()
+        expires_at = (now if started is None else started) + budget
+        if context is not None:
+            expires_at = min(
+                expires_at, now + context.get_remaining_time_in_millis() / 1000
+            )
+        return cls(expires_at=max(expires_at - reserve, now), clock=clock)
+
+    def remaining(self) -> float:
+        """
+        Return the seconds left until the deadline, never less than zero.
+
+        Returns:
+            float: Remaining seconds.
+        """
+        return max(self.expires_at - self.clock(), 0.0)
+
+    def expired(self) -> bool:
+        """
+        Return whether the budget is used up.
+
+        Returns:
+            bool: True if less than MINIMUM_SECONDS are left.
+        """
+        return self.remaining() < MINIMUM_SECONDS
+
+    def timeout(self, cap: float) -> float:
+        """
+        Return the timeout for the next stage.
+
+        Args:
+            cap: Maximum timeout of the stage in seconds.
+
+        Returns:
+            float: The smaller of cap and the remaining time.
+
+        Raises:
+            DeadlineExceeded: If the budget is used up.
+        """
+        remaining = self.remaining()
+        if remaining < MINIMUM_SECONDS:
+            raise DeadlineExceeded("Request deadline exceeded.")
+        return min(cap, remaining)
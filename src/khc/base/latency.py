@@ -0,0 +1,50 @@
+import collections
+import math
+import threading
+
+
+class LatencyTracker:
+    """
+    Thread-safe rolling window of observed latencies.
+
+    Args:
+        window: Number of most recent samples kept. Defaults to 200.
+        min_samples: Number of samples needed before percentiles are reported.
+            Defaults to 20.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20) -> None:
+        self.min_samples = min_samples
+        self._samples: collections.deque[float] = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """
+        Add an observed latency.
+
+        Args:
+            seconds: The latency in seconds.
+        """
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        """
+        Return a percentile of the latencies in the window (nearest rank).
+
+        Args:
+            p: The percentile as a fraction, e.g. 0.95.
+
+        Returns:
+            float | None: The latency in seconds, or None if there are fewer than
+                min_samples samples.
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        rank = max(math.ceil(p * len(ordered)), 1)
+        return ordered[rank - 1]
+
+    def __len__(self) -> int:
+        return len(self._samples)
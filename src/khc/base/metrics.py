@@ -0,0 +1,47 @@
+import json
+import sys
+import time
+import typing
+
+NAMESPACE = "KurzeHoseChecker"
+
+
+def emit_metrics(
+    metrics: dict[str, tuple[float, str]],
+    dimensions: dict[str, str],
+    namespace: str = NAMESPACE,
+    stream: typing.TextIO | None = None,
+    clock: typing.Callable[[], float] = time.time,
+) -> None:
+    """
+    Write metrics in the CloudWatch Embedded Metric Format.
+
+    Lambda forwards stdout to CloudWatch Logs, which extracts the metrics from
+    the JSON line without any API call.
+
+    Args:
+        metrics: Values and units per metric name, e.g. {"Latency": (120.0,
+            "Milliseconds")}.
+        dimensions: Dimension values the metrics are recorded for.
+        namespace: CloudWatch namespace. Defaults to NAMESPACE.
+        stream: Stream to write to. Defaults to sys.stdout.
+        clock: Clock in seconds since the epoch. Defaults to time.time.
+    """
+    record: dict[str, object] = {
+        "_aws": {
+            "Timestamp": int(clock() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": namespace,
+                    "Dimensions": [list(dimensions)],
+                    "Metrics": [
+                        {"Name": name, "Unit": unit}
+                        for name, (_, unit) in metrics.items()
+                    ],
+                }
+            ],
+        },
+        **dimensions,
+        **{name: value for name, (value, _) in metrics.items()},
+    }
+    (stream or sys.stdout).write(json.dumps(record) + "\n")
@@ -0,0 +1,62 @@
+import threading
+import time
+import typing
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket limiting how often an operation may start.
+
+    Args:
+        rate: Tokens added per second.
+        burst: Maximum number of tokens that can accumulate. Defaults to 1.
+        clock: Monotonic clock in seconds. Defaults to time.monotonic.
+        sleep: Function used to wait. Defaults to time.sleep.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        clock: typing.Callable[[], float] = time.monotonic,
+        sleep: typing.Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """
+        Take a token if one is available, without waiting.
+
+        Returns:
+            bool: True if a token was taken.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        """Take a token, waiting until one becomes available."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
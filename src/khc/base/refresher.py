@@ -0,0 +1,114 @@
+import collections
+import logging
+import threading
+import time
+import typing
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRefresher:
+    """
+    Bounded background worker for refreshing cached values.
+
+    Jobs are deduplicated per key and queued up to max_pending; further jobs
+    are dropped. A single daemon thread is started on first use. Jobs that have
+    waited longer than max_age_seconds by wall-clock time are dropped instead
+    of run, so a Lambda container thawed after a long freeze does not work off
+    a backlog of refreshes that were requested long ago. A job that is already
+    running when the container is frozen resumes after the thaw, so jobs
+    should bound their own time, e.g. with a Deadline.
+
+    Args:
+        max_pending: Maximum number of queued jobs. Defaults to 32.
+        max_age_seconds: Maximum wall-clock time a job may wait before it is
+            dropped. Defaults to 10.0.
+        clock: Wall clock in seconds. Defaults to time.time.
+    """
+
+    def __init__(
+        self,
+        max_pending: int = 32,
+        max_age_seconds: float = 10.0,
+        clock: typing.Callable[[], float] = time.time,
+    ) -> None:
+        self.max_pending = max_pending
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+        self._jobs: collections.OrderedDict[
+            str, tuple[float, typing.Callable[[], object]]
+        ] = collections.OrderedDict()
+        self._running: set[str] = set()
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, key: str, fn: typing.Callable[[], object]) -> bool:
+        """
+        Queue a refresh job unless one for the key is already queued or running.
+
+        Args:
+            key: Key identifying the refreshed value, e.g. a postal code.
+            fn: The refresh function. Its result is ignored, exceptions are
+                logged.
+
+        Returns:
+            bool: True if the job was queued.
+        """
+        with self._condition:
+            if key in self._jobs or key in self._running:
+                return False
+            if len(self._jobs) >= self.max_pending:
+                logger.warning(f"Refresh queue full, dropping refresh of {key}.")
+                return False
+            self._jobs[key] = (self.clock(), fn)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._work, name="refresher", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+            return True
+
+    def pending(self) -> int:
+        """
+        Return the number of queued and running jobs.
+
+        Returns:
+            int: Number of jobs not finished yet.
+        """
+        with self._condition:
+            return len(self._jobs) + len(self._running)
+
+    def join(self, timeout: float | None = None) -> bool:
+        """
+        Wait until all queued jobs are finished, e.g. in tests or on shutdown.
+
+        Args:
+            timeout: Maximum seconds to wait. Defaults to no limit.
+
+        Returns:
+            bool: True if all jobs are finished.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._jobs and not self._running, timeout
+            )
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: bool(self._jobs))
+                key, (queued_at, fn) = self._jobs.popitem(last=False)
+                if self.clock() - queued_at > self.max_age_seconds:
+                    logger.info(f"Dropping outdated refresh of {key}.")
+                    self._condition.notify_all()
+                    continue
+                self._running.add(key)
+            try:
+                fn()
+            except Exception as e:
+                logger.error(f"Refresh of {key} failed: {e}")
+            finally:
+                with self._condition:
+                    self._running.discard(key)
+                    self._condition.notify_all()
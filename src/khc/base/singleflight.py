@@ -0,0 +1,83 @@
+import concurrent.futures
+import logging
+import threading
+import typing
+
+import khc.base.deadline
+
+logger = logging.getLogger(__name__)
+
+T = typing.TypeVar("T")
+
+
+class SingleFlight(typing.Generic[T]):
+    """
+    Coalesces concurrent calls for the same key into one call.
+
+    The first caller for a key runs the function. Callers arriving while it is
+    still running wait for its result instead of starting their own call and
+    receive the same result or exception. Once the call has finished, the next
+    caller for the key starts a new one.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, concurrent.futures.Future[T]] = {}
+        self._lock = threading.Lock()
+
+    def do(
+        self, key: str, fn: typing.Callable[[], T], timeout: float | None = None
+    ) -> T:
+        """
+        Run fn for the key, or wait for the call already in flight.
+
+        Args:
+            key: Key identifying identical calls, e.g. a postal code.
+            fn: Function computing the result.
+            timeout: Seconds a waiting caller waits for the call in flight.
+                Does not limit the caller running fn. Defaults to no limit.
+
+        Returns:
+            T: The result of fn.
+
+        Raises:
+            DeadlineExceeded: If a waiting caller timed out.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if future is None:
+                future = concurrent.futures.Future()
+                self._calls[key] = future
+
+        if not leader:
+            logger.info(f"Waiting for call in flight for {key}.")
+            try:
+                return future.result(timeout)
+            except concurrent.futures.TimeoutError as e:
+                raise khc.base.deadline.DeadlineExceeded(
+                    f"Call in flight for {key} did not finish in time."
+                ) from e
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result
+
+    def in_flight(self) -> int:
+        """
+        Return the number of calls currently running.
+
+        Returns:
+            int: Number of keys with a call in flight.
+        """
+        with self._lock:
+            return len(self._calls)
+
+    def _finish(self, key: str) -> None:
+        with self._lock:
+            del self._calls[key]
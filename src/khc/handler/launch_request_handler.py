@@ -1,11 +1,23 @@
+import concurrent.futures
 import logging
+import threading
+import typing
 import ask_sdk_core.dispatch_components
 import ask_sdk_core.utils
+import khc.base.deadline
 import khc.services.weather.service
 import khc.services.postal_code.provider
 
+if typing.TYPE_CHECKING:
+    # Only created by create_skill() if KHC_PROGRESSIVE_RESPONSE is enabled.
+    import khc.services.directive.progressive_response
+
 logger = logging.getLogger(__name__)
 
+TIMEOUT_MESSAGE = (
+    "Tut mir leid, das dauert gerade zu lange. Bitte frag mich gleich noch einmal."
+)
+
 
 class LaunchRequestHandler(ask_sdk_core.dispatch_components.AbstractRequestHandler):
     """
@@ -14,12 +26,18 @@ class LaunchRequestHandler(ask_sdk_core.dispatch_components.AbstractRequestHandl
     Args:
         weather_service: Service providing weather-related responses.
         postal_provider: Service to retrieve postal code from Alexa device.
+        progressive_response: Sender of a progressive response spoken while the
+            answer takes long. Defaults to None, i.e. no progressive response.
+        speculate: Whether to start the answer for the postal code remembered
+            for the device while its address is looked up. Defaults to False.
     """
 
     def __init__(
         self,
         weather_service: khc.services.weather.service.WeatherService,
         postal_provider: khc.services.postal_code.provider.PostalCodeProvider,
+        progressive_response: "khc.services.directive.progressive_response.ProgressiveResponseSender | None" = None,
+        speculate: bool = False,
     ) -> None:
         """
         Initialize the LaunchRequestHandler with required services.
@@ -27,9 +45,15 @@ class LaunchRequestHandler(ask_sdk_core.dispatch_components.AbstractRequestHandl
         Args:
             weather_service (khc.services.weather.service.WeatherService): The weather service instance.
             postal_provider (khc.services.postal_code.provider.PostalCodeProvider): The postal code provider instance.
+            progressive_response (khc.services.directive.progressive_response.ProgressiveResponseSender | None): The progressive response sender.
+            speculate (bool): Whether to answer for the remembered postal code speculatively.
         """
         self.weather_service = weather_service
         self.postal_provider = postal_provider
+        self.progressive_response = progressive_response
+        self.speculate = speculate
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
 
     def can_handle(self, handler_input):
         """
@@ -47,24 +71,88 @@ class LaunchRequestHandler(ask_sdk_core.dispatch_components.AbstractRequestHandl
         """
         Handle the LaunchRequest by retrieving postal code and returning weather advice.
 
+        The time budget of the invocation is taken from the Lambda context and
+        shared by the postal code lookup and the weather answer. If it runs out,
+        a short apology is returned instead of letting Alexa time out. If the
+        answer is not ready quickly, a progressive response is spoken in the
+        meantime. With speculate, the answer for the postal code remembered from
+        an earlier invocation is computed while the address is looked up, and
+        only used if the address still has that postal code.
+
         Args:
             handler_input: Input from Alexa service.
 
         Returns:
             Response: Alexa response object with speech output.
         """
+        deadline = khc.base.deadline.Deadline.from_lambda_context(handler_input.context)
+        pending = (
+            self.progressive_response.start(handler_input, deadline)
+            if self.progressive_response
+            else None
+        )
+        try:
+            speak_output, end_session = self._get_speech(handler_input, deadline)
+        finally:
+            if pending is not None:
+                pending.finish()
+        response_builder = handler_input.response_builder.speak(speak_output)
+        if end_session:
+            response_builder = response_builder.set_should_end_session(True)
+        return response_builder.response
+
+    def _get_speech(
+        self, handler_input, deadline: khc.base.deadline.Deadline
+    ) -> tuple[str, bool]:
+        remembered = (
+            self.postal_provider.last_known_postal_code(handler_input)
+            if self.speculate
+            else None
+        )
+        speculation = (
+            self._get_executor().submit(
+                self.weather_service.get_short_answer, remembered, deadline=deadline
+            )
+            if remembered
+            else None
+        )
         try:
-            postal_code = self.postal_provider.get_postal_code(handler_input)
+            postal_code = self.postal_provider.get_postal_code(
+                handler_input, deadline=deadline
+            )
+        except khc.base.deadline.DeadlineExceeded:
+            logger.error("Deadline exceeded while retrieving the postal code.")
+            return TIMEOUT_MESSAGE, True
         except PermissionError:
             speak_output = (
                 "Bitte erlaube in den Einstellungen der Alexa App den Zugriff auf deine Postleitzahl, "
                 "damit ich dir Auskunft geben kann."
             )
-            return (
-                handler_input.response_builder.speak(speak_output)
-                .set_should_end_session(True)
-                .response
-            )
+            return speak_output, True
+
+        if speculation is not None:
+            if postal_code == remembered:
+                logger.info(f"Using speculative answer for {postal_code}.")
+                try:
+                    return speculation.result(timeout=deadline.remaining()), False
+                except concurrent.futures.TimeoutError:
+                    logger.error(
+                        "Deadline exceeded while awaiting the speculative answer."
+                    )
+                    return TIMEOUT_MESSAGE, True
+            # A running answer cannot be interrupted, it only fills the cache.
+            speculation.cancel()
+            logger.info(f"Postal code changed from {remembered} to {postal_code}.")
+
+        speak_output = self.weather_service.get_short_answer(
+            postal_code, deadline=deadline
+        )
+        return speak_output, False
 
-        speak_output = self.weather_service.get_short_answer(postal_code)
-        return handler_input.response_builder.speak(speak_output).response
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=4, thread_name_prefix="speculation"
+                )
+            return self._executor
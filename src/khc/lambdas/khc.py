@@ -2,11 +2,24 @@ import typing
 import aws_lambda_typing.context as context_
 import khc.base._lambda
 import khc.events.khc
+import khc.services.gazetteer.index
 
 
 class KHCLambda(khc.base._lambda.LambdaFunction):
     """Lambda function for Kurze Hosen Checker."""
 
+    def __init__(
+        self, gazetteer: khc.services.gazetteer.index.GazetteerIndex | None = None
+    ) -> None:
+        """
+        Initialize the KHC Lambda.
+
+        Args:
+            gazetteer: Index of German postal codes. If it is available, unknown
+                postal codes are rejected without any network call.
+        """
+        self.gazetteer = gazetteer
+
     # type: ignore[override]
     def handler(
         self,
@@ -34,6 +47,16 @@ class KHCLambda(khc.base._lambda.LambdaFunction):
                 "message": "Invalid postal code. Must be 5 digits.",
             }
 
+        if (
+            self.gazetteer is not None
+            and self.gazetteer.available()
+            and event["postal_code"] not in self.gazetteer
+        ):
+            return {
+                "statusCode": 400,
+                "message": "Unknown postal code.",
+            }
+
         # For now, just return the input data
         return {
             "statusCode": 200,
@@ -0,0 +1,242 @@
+import argparse
+import concurrent.futures
+import datetime
+import json
+import logging
+import os
+import threading
+import typing
+import khc.base.rate_limiter
+import khc.services.gazetteer.index
+import khc.services.openrouter.client
+import khc.services.openrouter.models
+import khc.services.session
+import khc.services.weather.answer_store
+import khc.services.weather.cache
+import khc.services.weather.region
+import khc.services.weather.service
+import khc.services.weather.shared_cache
+
+logger = logging.getLogger(__name__)
+
+
+def load_checkpoint(path: str, day: datetime.date) -> dict[str, bool]:
+    """
+    Load the verdicts an earlier, interrupted run already computed for the day.
+
+    Args:
+        path: Path of the checkpoint file.
+        day: The day being precomputed. Entries for other days are ignored.
+
+    Returns:
+        dict[str, bool]: Verdicts per key.
+    """
+    verdicts: dict[str, bool] = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The last line may be incomplete if the run was killed.
+                    continue
+                if entry.get("day") == day.isoformat():
+                    verdicts[entry["key"]] = bool(entry["shorts"])
+    except FileNotFoundError:
+        pass
+    return verdicts
+
+
+def precompute(
+    weather_service: khc.services.weather.service.WeatherService,
+    keys: typing.Iterable[str],
+    day: datetime.date,
+    checkpoint_path: str,
+    rate_limiter: khc.base.rate_limiter.RateLimiter,
+    workers: int = 8,
+    region_mapper: khc.services.weather.region.RegionMapper | None = None,
+    batch_size: int = 50,
+) -> tuple[dict[str, bool], list[str]]:
+    """
+    Compute the verdicts for all regions of the given postal codes on a thread pool.
+
+    One verdict is computed per region, using the first postal code of the
+    region. Each worker asks for the verdicts of batch_size regions at once.
+    Every finished verdict is appended to the checkpoint file right away, so an
+    interrupted run can be resumed. Regions already in the checkpoint are
+    skipped. So are regions the verdict cache of the service already has an
+    answer for today, looked up in one batch; computed verdicts are written to
+    that cache, so with a TieredCache they are shared with the skill at once.
+
+    Args:
+        weather_service: Service to ask for the verdicts.
+        keys: The postal codes to compute verdicts for.
+        day: The day the verdicts are computed for.
+        checkpoint_path: Path of the checkpoint file.
+        rate_limiter: Global limit on the number of started completion
+            requests, including the retries and splits of get_verdicts().
+        workers: Number of worker threads. Defaults to 8.
+        region_mapper: Maps postal codes to regions. Defaults to one region per
+            postal code.
+        batch_size: Number of regions per batch. Defaults to 50.
+
+    Returns:
+        tuple[dict[str, bool], list[str]]: The verdicts per region and the
+            regions for which no verdict could be obtained.
+    """
+    region_mapper = (
+        region_mapper or khc.services.weather.region.PostalCodeRegionMapper()
+    )
+    representatives: dict[str, str] = {}
+    for postal_code in keys:
+        representatives.setdefault(region_mapper.region_of(postal_code), postal_code)
+
+    verdicts = load_checkpoint(checkpoint_path, day)
+    pending = [key for key in representatives if key not in verdicts]
+    cached = weather_service.verdict_cache.get_many(pending)
+    pending = [key for key in pending if key not in cached]
+    logger.info(
+        f"Resuming with {len(verdicts)} verdicts, {len(cached)} cached, "
+        f"{len(pending)} pending."
+    )
+    failed: list[str] = []
+    lock = threading.Lock()
+
+    def record(
+        answered: dict[str, khc.services.openrouter.models.ShortsVerdict],
+    ) -> None:
+        for key, verdict in answered.items():
+            verdicts[key] = verdict.shorts
+            checkpoint.write(
+                json.dumps(
+                    {"day": day.isoformat(), "key": key, "shorts": verdict.shorts}
+                )
+                + "\n"
+            )
+        checkpoint.flush()
+
+    def compute(batch: list[str]) -> None:
+        answered = weather_service.get_verdicts(
+            [representatives[key] for key in batch], rate_limiter=rate_limiter
+        )
+        computed = {
+            key: answered[representatives[key]]
+            for key in batch
+            if representatives[key] in answered
+        }
+        weather_service.verdict_cache.put_many(computed)
+        with lock:
+            failed.extend(key for key in batch if key not in computed)
+            record(computed)
+
+    with (
+        open(checkpoint_path, "a+", encoding="utf-8") as checkpoint,
+        concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor,
+    ):
+        # Terminate a line left incomplete by a killed run.
+        if checkpoint.tell() > 0:
+            checkpoint.seek(checkpoint.tell() - 1)
+            if checkpoint.read(1) != "\n":
+                checkpoint.write("\n")
+        record(cached)
+        for future in concurrent.futures.as_completed(
+            executor.submit(compute, pending[start : start + batch_size])
+            for start in range(0, len(pending), batch_size)
+        ):
+            future.result()
+
+    return verdicts, sorted(failed)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Precompute today's shorts verdicts for all German postal codes.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: Exit code, 1 if some verdicts could not be computed.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("output", help="Answer store file to write")
+    parser.add_argument(
+        "--gazetteer",
+        default=khc.services.gazetteer.index.DEFAULT_PATH,
+        help="Postal code index file",
+    )
+    parser.add_argument(
+        "--checkpoint", help="Checkpoint file for resuming (default: OUTPUT.partial)"
+    )
+    parser.add_argument("--workers", type=int, default=8, help="Worker threads")
+    parser.add_argument(
+        "--rate", type=float, default=1.0, help="Completion requests started per second"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=50, help="Postal codes per batch"
+    )
+    parser.add_argument(
+        "--limit", type=int, help="Only precompute the first N postal codes"
+    )
+    parser.add_argument(
+        "--region",
+        default=os.getenv("KHC_REGION", "postal_code"),
+        help="Region mapping, e.g. prefix:3 or grid:0.25 (default: KHC_REGION)",
+    )
+    parser.add_argument(
+        "--shared-cache",
+        default=os.getenv("KHC_SHARED_CACHE_URL"),
+        help="Shared verdict cache, e.g. redis://host:6379 (default: "
+        "KHC_SHARED_CACHE_URL)",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    gazetteer = khc.services.gazetteer.index.GazetteerIndex(args.gazetteer)
+    if not gazetteer.available():
+        logger.error("The postal code index is required, run 'make gazetteer'.")
+        return 1
+    region_mapper = khc.services.weather.region.create_region_mapper(
+        args.region, gazetteer
+    )
+
+    openrouter_client = khc.services.openrouter.client.OpenRouterClient(
+        api_key=os.getenv("OPENROUTER_API_KEY"),
+        session=khc.services.session.create_session(pool_maxsize=args.workers),
+    )
+    weather_service = khc.services.weather.service.WeatherService(
+        openrouter_client=openrouter_client,
+        structured=True,
+        gazetteer=gazetteer,
+        region_mapper=region_mapper,
+        verdict_cache=khc.services.weather.shared_cache.create_verdict_cache(
+            khc.services.weather.shared_cache.create_backend(args.shared_cache),
+            args.region,
+        )
+        if args.shared_cache
+        else None,
+    )
+    keys = list(gazetteer.postal_codes())[: args.limit]
+    day = datetime.datetime.now(tz=khc.services.weather.cache.BERLIN).date()
+    checkpoint_path = args.checkpoint or f"{args.output}.partial"
+
+    verdicts, failed = precompute(
+        weather_service,
+        keys,
+        day,
+        checkpoint_path,
+        khc.base.rate_limiter.RateLimiter(rate=args.rate, burst=args.workers),
+        workers=args.workers,
+        region_mapper=region_mapper,
+        batch_size=args.batch_size,
+    )
+    khc.services.weather.answer_store.write_answer_store(args.output, day, verdicts)
+    logger.info(
+        f"Wrote {len(verdicts)} verdicts for {day} to {args.output}, "
+        f"{len(failed)} failed."
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
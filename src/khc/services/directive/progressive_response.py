@@ -0,0 +1,165 @@
+import concurrent.futures
+import logging
+import threading
+import requests
+import ask_sdk_core.handler_input
+
+import khc.base.deadline
+import khc.services.session
+
+logger = logging.getLogger(__name__)
+
+SPEECH = "Ich schaue kurz nach…"
+DELAY_SECONDS = 0.3
+TIMEOUT_SECONDS = 1.0
+
+
+class PendingProgressiveResponse:
+    """
+    A progressive response that is scheduled or being sent.
+
+    Args:
+        future: The job sending the directive. Its result tells whether the
+            directive was sent.
+        finished: Event telling the job that the answer is ready.
+    """
+
+    def __init__(
+        self, future: concurrent.futures.Future[bool], finished: threading.Event
+    ) -> None:
+        self.future = future
+        self.finished = finished
+
+    def finish(self) -> bool:
+        """
+        Mark the answer as ready, before it is returned to Alexa.
+
+        A directive that is still waiting for its delay is not sent anymore. One
+        that is already being sent is waited for, since Alexa ignores
+        progressive responses arriving after the response of the skill and a
+        Lambda container is frozen once the handler has returned.
+
+        Returns:
+            bool: True if the directive was sent.
+        """
+        self.finished.set()
+        return self.future.result()
+
+
+class ProgressiveResponseSender:
+    """
+    Sender of Alexa progressive responses, spoken while the skill is still
+    working on its answer.
+
+    The directive is posted to the directive service at the API endpoint of the
+    request envelope, in the background and only if the answer is not ready
+    after delay_seconds, so fast answers are not preceded by a filler.
+
+    Args:
+        session: Pooled HTTP session to reuse across invocations. Defaults to a
+            new session from create_session().
+        speech: Text spoken as progressive response. Defaults to SPEECH.
+        delay_seconds: Time the answer may take before the progressive response
+            is sent. Defaults to DELAY_SECONDS.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session | None = None,
+        speech: str = SPEECH,
+        delay_seconds: float = DELAY_SECONDS,
+    ) -> None:
+        self.session = session or khc.services.session.create_session()
+        self.speech = speech
+        self.delay_seconds = delay_seconds
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def start(
+        self,
+        handler_input: ask_sdk_core.handler_input.HandlerInput,
+        deadline: khc.base.deadline.Deadline | None = None,
+    ) -> PendingProgressiveResponse:
+        """
+        Schedule a progressive response for the request in the background.
+
+        Args:
+            handler_input: The Alexa SDK handler input of the request.
+            deadline: Deadline of the request. The directive call gets the
+                remaining time, but at most TIMEOUT_SECONDS.
+
+        Returns:
+            PendingProgressiveResponse: Handle whose finish() must be called once
+                the answer is ready.
+        """
+        finished = threading.Event()
+
+        def send_unless_finished() -> bool:
+            if finished.wait(self.delay_seconds):
+                return False
+            return self.send(handler_input, deadline)
+
+        future = self._get_executor().submit(send_unless_finished)
+        return PendingProgressiveResponse(future, finished)
+
+    def send(
+        self,
+        handler_input: ask_sdk_core.handler_input.HandlerInput,
+        deadline: khc.base.deadline.Deadline | None = None,
+    ) -> bool:
+        """
+        Send a progressive response for the request right away.
+
+        Failures are logged, a missing progressive response must not break the
+        answer.
+
+        Args:
+            handler_input: The Alexa SDK handler input of the request.
+            deadline: Deadline of the request. The directive call gets the
+                remaining time, but at most TIMEOUT_SECONDS.
+
+        Returns:
+            bool: True if Alexa accepted the directive.
+        """
+        envelope = handler_input.request_envelope
+        system = envelope.context.system if envelope.context else None
+        request_id = envelope.request.request_id if envelope.request else None
+        if (
+            system is None
+            or not system.api_endpoint
+            or not system.api_access_token
+            or not request_id
+        ):
+            logger.warning("Request envelope lacks what a progressive response needs.")
+            return False
+
+        url = f"{system.api_endpoint}/v1/directives"
+        body = {
+            "header": {"requestId": request_id},
+            "directive": {"type": "VoicePlayer.Speak", "speech": self.speech},
+        }
+        headers = {"Authorization": f"Bearer {system.api_access_token}"}
+        try:
+            timeout = deadline.timeout(TIMEOUT_SECONDS) if deadline else TIMEOUT_SECONDS
+            response = self.session.post(
+                url, json=body, headers=headers, timeout=timeout
+            )
+        except (requests.RequestException, khc.base.deadline.DeadlineExceeded) as e:
+            logger.error(f"Progressive response failed: {e}")
+            return False
+        if response.status_code != 204:
+            logger.error(
+                f"Progressive response rejected: {response.status_code} - "
+                f"{response.text}"
+            )
+            return False
+        logger.info("Progressive response sent.")
+        return True
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=4, thread_name_prefix="progressive-response"
+                )
+            return self._executor
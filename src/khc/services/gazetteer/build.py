@@ -0,0 +1,104 @@
+import argparse
+import csv
+import sys
+import typing
+
+import khc.services.gazetteer.index
+
+# Germany has about 8200 postal codes. A smaller index is a broken download.
+MIN_POSTAL_CODES = 8000
+
+
+def read_geonames(
+    lines: typing.Iterable[str],
+) -> typing.Iterator[khc.services.gazetteer.index.Place]:
+    """
+    Parse a GeoNames postal code dump (e.g. DE.txt from the DE.zip export).
+
+    Args:
+        lines: Tab-separated lines of the dump.
+
+    Returns:
+        Iterator of places for all German 5-digit postal codes.
+    """
+    for row in csv.reader(lines, delimiter="\t", quoting=csv.QUOTE_NONE):
+        if len(row) < 11 or row[0] != "DE":
+            continue
+        postal_code, name, state = row[1], row[2], row[3]
+        if len(postal_code) != 5 or not postal_code.isdigit():
+            continue
+        yield khc.services.gazetteer.index.Place(
+            postal_code=postal_code,
+            name=name,
+            state=state,
+            latitude=float(row[9]),
+            longitude=float(row[10]),
+        )
+
+
+def check_index(path: str, minimum: int = MIN_POSTAL_CODES) -> str | None:
+    """
+    Check that an index file exists and is complete, e.g. before deploying.
+
+    Args:
+        path: The index file.
+        minimum: Number of postal codes the index must at least have.
+
+    Returns:
+        str | None: The problem found, or None if the index is fine.
+    """
+    gazetteer = khc.services.gazetteer.index.GazetteerIndex(path)
+    if not gazetteer.available():
+        return f"Gazetteer index {path} is missing or invalid, run make gazetteer."
+    if len(gazetteer) < minimum:
+        return f"Gazetteer index {path} has only {len(gazetteer)} postal codes."
+    return None
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Build the gazetteer index from a GeoNames postal code dump.
+
+    Args:
+        argv: Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: Exit code, 1 if --check finds the index missing or incomplete.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "source", nargs="?", help="GeoNames postal code file, e.g. DE.txt"
+    )
+    parser.add_argument(
+        "target",
+        nargs="?",
+        default=khc.services.gazetteer.index.DEFAULT_PATH,
+        help="Index file to write",
+    )
+    parser.add_argument(
+        "--check",
+        metavar="INDEX",
+        help="Only check that INDEX exists and is complete",
+    )
+    args = parser.parse_args(argv)
+
+    if args.check:
+        problem = check_index(args.check)
+        if problem is not None:
+            print(problem, file=sys.stderr)
+            return 1
+        print(f"Gazetteer index {args.check} is complete.")
+        return 0
+    source: str | None = args.source
+    if source is None:
+        parser.error("the source file is required")
+        return 2
+
+    with open(source, encoding="utf-8") as f:
+        count = khc.services.gazetteer.index.write_index(read_geonames(f), args.target)
+    print(f"Wrote {count} postal codes to {args.target}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
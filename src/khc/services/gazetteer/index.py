@@ -0,0 +1,234 @@
+import array
+import bisect
+import logging
+import os
+import struct
+import sys
+import threading
+import typing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "data", "postal_codes.bin")
+
+MAGIC = b"KHCG"
+VERSION = 1
+# Magic, version, number of postal codes, byte length of names and states.
+HEADER = struct.Struct("<4sHIII")
+
+
+class Place:
+    """
+    Place a German postal code belongs to.
+
+    Args:
+        postal_code: The 5-digit postal code.
+        name: Name of the place.
+        state: Name of the Bundesland.
+        latitude: Latitude of the centroid.
+        longitude: Longitude of the centroid.
+    """
+
+    def __init__(
+        self,
+        postal_code: str,
+        name: str,
+        state: str,
+        latitude: float,
+        longitude: float,
+    ) -> None:
+        self.postal_code = postal_code
+        self.name = name
+        self.state = state
+        self.latitude = latitude
+        self.longitude = longitude
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Place) and (
+            self.postal_code,
+            self.name,
+            self.state,
+            round(self.latitude, 4),
+            round(self.longitude, 4),
+        ) == (
+            other.postal_code,
+            other.name,
+            other.state,
+            round(other.latitude, 4),
+            round(other.longitude, 4),
+        )
+
+    def __repr__(self) -> str:
+        return f"Place({self.postal_code!r}, {self.name!r}, {self.state!r})"
+
+
+class GazetteerIndex:
+    """
+    Read-only index of German postal codes with place name, state and centroid.
+
+    The index file is loaded lazily on first use into flat arrays, so a lookup
+    is a binary search over the sorted postal codes without any network call.
+    If the file does not exist, the index is unavailable and every lookup
+    returns None.
+
+    Args:
+        path: Path of the index file written by write_index(). Defaults to the
+            file bundled with the package.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH) -> None:
+        self.path = path
+        self._codes: array.array[int] = array.array("I")
+        self._latitudes: array.array[float] = array.array("f")
+        self._longitudes: array.array[float] = array.array("f")
+        self._name_ids: array.array[int] = array.array("H")
+        self._state_ids: array.array[int] = array.array("B")
+        self._names: list[str] = []
+        self._states: list[str] = []
+        self._available = False
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """
+        Return whether the index file exists and could be loaded.
+
+        Returns:
+            bool: True if lookups are answered from the index.
+        """
+        self._ensure_loaded()
+        return self._available
+
+    def lookup(self, postal_code: str) -> Place | None:
+        """
+        Look up the place of a postal code.
+
+        Args:
+            postal_code: The 5-digit postal code.
+
+        Returns:
+            Place | None: The place, or None if the postal code is unknown.
+        """
+        self._ensure_loaded()
+        if len(postal_code) != 5 or not postal_code.isdigit():
+            return None
+        code = int(postal_code)
+        position = bisect.bisect_left(self._codes, code)
+        if position == len(self._codes) or self._codes[position] != code:
+            return None
+        return Place(
+            postal_code=postal_code,
+            name=self._names[self._name_ids[position]],
+            state=self._states[self._state_ids[position]],
+            latitude=self._latitudes[position],
+            longitude=self._longitudes[position],
+        )
+
+    def postal_codes(self) -> typing.Iterator[str]:
+        """
+        Iterate over all postal codes in ascending order.
+
+        Returns:
+            Iterator of 5-digit postal codes.
+        """
+        self._ensure_loaded()
+        return (f"{code:05d}" for code in self._codes)
+
+    def __contains__(self, postal_code: object) -> bool:
+        return isinstance(postal_code, str) and self.lookup(postal_code) is not None
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._codes)
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                with open(self.path, "rb") as f:
+                    self._read(f.read())
+                self._available = True
+                logger.info(f"Loaded {len(self._codes)} postal codes from {self.path}.")
+            except FileNotFoundError:
+                logger.warning(f"Gazetteer index {self.path} not found.")
+            except (ValueError, struct.error) as e:
+                logger.error(f"Invalid gazetteer index {self.path}: {e}")
+            self._loaded = True
+
+    def _read(self, data: bytes) -> None:
+        magic, version, count, names_length, states_length = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Unsupported file format")
+        offset = HEADER.size
+        arrays = (
+            self._codes,
+            self._latitudes,
+            self._longitudes,
+            self._name_ids,
+            self._state_ids,
+        )
+        for values in arrays:
+            end = offset + count * values.itemsize
+            values.frombytes(data[offset:end])
+            if sys.byteorder == "big":
+                values.byteswap()
+            offset = end
+        self._names = data[offset : offset + names_length].decode("utf-8").split("\n")
+        offset += names_length
+        self._states = data[offset : offset + states_length].decode("utf-8").split("\n")
+
+
+def write_index(places: typing.Iterable[Place], path: str) -> int:
+    """
+    Write places to an index file readable by GazetteerIndex.
+
+    If a postal code occurs several times, the first place is kept.
+
+    Args:
+        places: The places to index.
+        path: Path of the file to write.
+
+    Returns:
+        int: Number of postal codes written.
+    """
+    by_code: dict[int, Place] = {}
+    for place in places:
+        by_code.setdefault(int(place.postal_code), place)
+
+    names: dict[str, int] = {}
+    states: dict[str, int] = {}
+    codes: array.array[int] = array.array("I")
+    latitudes: array.array[float] = array.array("f")
+    longitudes: array.array[float] = array.array("f")
+    name_ids: array.array[int] = array.array("H")
+    state_ids: array.array[int] = array.array("B")
+    for code in sorted(by_code):
+        place = by_code[code]
+        codes.append(code)
+        latitudes.append(place.latitude)
+        longitudes.append(place.longitude)
+        name_ids.append(names.setdefault(place.name, len(names)))
+        state_ids.append(states.setdefault(place.state, len(states)))
+
+    names_data = "\n".join(names).encode("utf-8")
+    states_data = "\n".join(states).encode("utf-8")
+    arrays = (codes, latitudes, longitudes, name_ids, state_ids)
+    if sys.byteorder == "big":
+        for values in arrays:
+            values.byteswap()
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(
+            HEADER.pack(MAGIC, VERSION, len(codes), len(names_data), len(states_data))
+        )
+        for values in arrays:
+            f.write(values.tobytes())
+        f.write(names_data)
+        f.write(states_data)
+    return len(codes)
@@ -1,73 +1,632 @@
+import concurrent.futures
+import copy
+import json
 import logging
+import math
+import threading
+import time
+import typing
 import requests
+import khc.base.circuit_breaker
+import khc.base.deadline
+import khc.base.metrics
 import khc.services.openrouter.models
+import khc.services.openrouter.router
+import khc.services.session
+
+if typing.TYPE_CHECKING:
+    # Only created by create_skill() if KHC_DISK_CACHE_DIR is set.
+    import khc.services.openrouter.disk_cache
 
 logger = logging.getLogger(__name__)
 
+NOT_CONFIGURED_MESSAGE = "Der Skill ist aktuell nicht richtig konfiguriert."
+FALLBACK_MESSAGE = "Tut mir leid, ich konnte die Antwort gerade nicht erhalten."
+ERROR_MESSAGES = frozenset({NOT_CONFIGURED_MESSAGE, FALLBACK_MESSAGE})
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+TIMEOUT_SECONDS = 5.0
+# Batches generate many more tokens than a single verdict.
+BATCH_TIMEOUT_SECONDS = 30.0
+MODEL = "gpt-4o-mini"
+# Percentile of the primary model's latency after which a hedge is sent.
+HEDGE_PERCENTILE = 0.95
+# Hedge delay until enough latencies have been observed.
+HEDGE_DELAY_SECONDS = 1.5
+# Share of requests that may be hedged, and hedges that may be saved up.
+HEDGE_RATIO = 0.05
+HEDGE_BURST = 3.0
+# A hedge is not sent with less than this many seconds left.
+HEDGE_MINIMUM_SECONDS = 0.5
+# Failures that only say no answer could be obtained right now, not that the
+# model has none.
+TRANSIENT_ERRORS = (
+    khc.base.deadline.DeadlineExceeded,
+    khc.base.circuit_breaker.CircuitOpenError,
+    requests.RequestException,
+)
+
 
 class OpenRouterClient:
     """
     Client to interact with the OpenRouter chat completion API.
 
+    Non-streaming completions can be hedged: if the model has not answered
+    within the HEDGE_PERCENTILE latency, the same request is sent to the hedge
+    model and whichever answers first is used. The hedge model is also tried
+    when the primary request fails.
+
     Args:
         api_key (str | None): The API key for authorization.
+        session (requests.Session | None): Pooled HTTP session to send requests with.
     """
 
-    def __init__(self, api_key: str | None) -> None:
+    def __init__(
+        self,
+        api_key: str | None,
+        session: requests.Session | None = None,
+        model: str = MODEL,
+        hedge_model: str | None = None,
+        hedge_percentile: float = HEDGE_PERCENTILE,
+        hedge_ratio: float = HEDGE_RATIO,
+        router: khc.services.openrouter.router.ModelRouter | None = None,
+        emit_metrics: bool = False,
+        breaker: khc.base.circuit_breaker.CircuitBreaker | None = None,
+        disk_cache: "khc.services.openrouter.disk_cache.DiskCache | None" = None,
+        url: str = OPENROUTER_URL,
+    ) -> None:
         """
         Initialize the OpenRouterClient.
 
         Args:
             api_key (str | None): The API key for the OpenRouter API.
+            session (requests.Session | None): Pooled HTTP session to reuse across
+                invocations. Defaults to a new session from create_session().
+            model (str): The model to ask unless a router is given.
+                Defaults to MODEL.
+            hedge_model (str | None): Alternate model for hedged and fallback
+                requests. Defaults to None, i.e. no hedging.
+            hedge_percentile (float): Latency percentile of the model after which
+                the hedge is sent. Defaults to HEDGE_PERCENTILE.
+            hedge_ratio (float): Maximum share of requests that are hedged.
+                Defaults to HEDGE_RATIO.
+            router (ModelRouter | None): Chooses the model per request from its
+                latency and error statistics. Defaults to a router that always
+                chooses model.
+            emit_metrics (bool): Whether to write latency and error metrics per
+                request in the CloudWatch Embedded Metric Format. Defaults to
+                False.
+            breaker (CircuitBreaker | None): Circuit breaker that rejects
+                requests while OpenRouter fails or is slow. Defaults to a new
+                CircuitBreaker.
+            disk_cache (DiskCache | None): Cache of responses on disk, consulted
+                before every non-streaming request. Defaults to None.
+            url (str): URL of the chat completions endpoint, e.g. of a local
+                stub for benchmarks. Defaults to OPENROUTER_URL.
         """
         self.api_key = api_key
+        self.session = session or khc.services.session.create_session()
+        self.router = router or khc.services.openrouter.router.ModelRouter([model])
+        self.emit_metrics = emit_metrics
+        self.breaker = breaker or khc.base.circuit_breaker.CircuitBreaker()
+        self.disk_cache = disk_cache
+        self.url = url
+        self.hedge_model = hedge_model
+        self.hedge_percentile = hedge_percentile
+        self.hedge_ratio = hedge_ratio
+        self._hedge_tokens = 1.0
+        self._lock = threading.Lock()
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
 
-    def chat_completion(self, prompt: str, max_tokens: int = 80) -> str:
+    def chat_completion(
+        self,
+        prompt: str,
+        max_tokens: int = 80,
+        deadline: khc.base.deadline.Deadline | None = None,
+        raise_transient: bool = False,
+        background: bool = False,
+    ) -> str:
         """
         Send a chat completion request to OpenRouter API with a prompt.
 
         Args:
             prompt (str): The user prompt for the chat completion.
             max_tokens (int, optional): Maximum tokens to generate. Defaults to 80.
+            deadline (Deadline | None, optional): Deadline of the request. The API
+                call gets the remaining time, but at most TIMEOUT_SECONDS.
+            raise_transient (bool, optional): Whether to raise TRANSIENT_ERRORS
+                instead of answering FALLBACK_MESSAGE, so callers can tell them
+                from a model that gave no answer. Defaults to False.
+            background (bool, optional): Whether the request only refreshes a
+                cache, e.g. after the invocation returned. Such requests run only
+                while the circuit is closed, are not hedged and are left out of
+                the circuit breaker, router statistics and metrics, since a
+                frozen Lambda container inflates their latency. Defaults to False.
 
         Returns:
             str: The content of the chat completion or an error message.
+
+        Raises:
+            DeadlineExceeded, CircuitOpenError, RequestException: With
+                raise_transient, if no answer could be obtained right now.
         """
         if not self.api_key:
             logger.error("API key is not set.")
-            return "Der Skill ist aktuell nicht richtig konfiguriert."
+            return NOT_CONFIGURED_MESSAGE
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+        request = khc.services.openrouter.models.OpenRouterRequest(
+            model=self.router.choose(),
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+        )
 
+        try:
+            openrouter_response = self._complete(
+                request, deadline, background=background
+            )
+            content = openrouter_response.get_message_content()
+            if content:
+                return content
+            else:
+                return FALLBACK_MESSAGE
+        except khc.base.deadline.DeadlineExceeded:
+            logger.error("No time left for the chat completion.")
+            if raise_transient:
+                raise
+            return FALLBACK_MESSAGE
+        except khc.base.circuit_breaker.CircuitOpenError:
+            logger.warning("Circuit open, not calling OpenRouter.")
+            if raise_transient:
+                raise
+            return FALLBACK_MESSAGE
+        except requests.RequestException as e:
+            logger.error(f"HTTP request error: {e}")
+            if raise_transient:
+                raise
+            return FALLBACK_MESSAGE
+        except ValueError as e:
+            logger.error(f"JSON decode error: {e}")
+            return FALLBACK_MESSAGE
+
+    def verdict_completion(
+        self,
+        prompt: str,
+        max_tokens: int = 30,
+        deadline: khc.base.deadline.Deadline | None = None,
+        include_place: bool = True,
+        raise_transient: bool = False,
+        background: bool = False,
+    ) -> khc.services.openrouter.models.ShortsVerdict | None:
+        """
+        Ask for a structured ShortsVerdict instead of free text.
+
+        The request uses a JSON schema response_format, so the model only has to
+        produce a few tokens.
+
+        Args:
+            prompt (str): The user prompt for the chat completion.
+            max_tokens (int, optional): Maximum tokens to generate. Defaults to 30.
+            deadline (Deadline | None, optional): Deadline of the request. The API
+                call gets the remaining time, but at most TIMEOUT_SECONDS.
+            include_place (bool, optional): Whether the model should name the
+                place. Defaults to True.
+            raise_transient (bool, optional): Whether to raise TRANSIENT_ERRORS
+                instead of returning None. Defaults to False.
+            background (bool, optional): Whether the request only refreshes a
+                cache, e.g. after the invocation returned. Such requests run only
+                while the circuit is closed, are not hedged and are left out of
+                the circuit breaker, router statistics and metrics, since a
+                frozen Lambda container inflates their latency. Defaults to False.
+
+        Returns:
+            ShortsVerdict | None: The parsed verdict, or None if it could not be
+                obtained.
+
+        Raises:
+            DeadlineExceeded, CircuitOpenError, RequestException: With
+                raise_transient, if no answer could be obtained right now.
+        """
+        if not self.api_key:
+            logger.error("API key is not set.")
+            return None
+
+        request = khc.services.openrouter.models.OpenRouterRequest(
+            model=self.router.choose(),
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            response_format=khc.services.openrouter.models.ShortsVerdict.response_format(
+                include_place=include_place
+            ),
+        )
+
+        try:
+            return self._complete(
+                request, deadline, background=background
+            ).get_verdict()
+        except khc.base.deadline.DeadlineExceeded:
+            logger.error("No time left for the chat completion.")
+            if raise_transient:
+                raise
+            return None
+        except khc.base.circuit_breaker.CircuitOpenError:
+            logger.warning("Circuit open, not calling OpenRouter.")
+            if raise_transient:
+                raise
+            return None
+        except requests.RequestException as e:
+            logger.error(f"HTTP request error: {e}")
+            if raise_transient:
+                raise
+            return None
+        except ValueError as e:
+            logger.error(f"JSON decode error: {e}")
+            return None
+
+    def batch_verdict_completion(
+        self,
+        prompt: str,
+        max_tokens: int,
+        deadline: khc.base.deadline.Deadline | None = None,
+    ) -> dict[str, khc.services.openrouter.models.ShortsVerdict] | None:
+        """
+        Ask for ShortsVerdicts for several postal codes in one completion.
+
+        Args:
+            prompt (str): The user prompt listing the postal codes.
+            max_tokens (int): Maximum tokens to generate, enough for all items.
+            deadline (Deadline | None, optional): Deadline of the request. The API
+                call gets the remaining time, but at most BATCH_TIMEOUT_SECONDS.
+
+        Returns:
+            dict[str, ShortsVerdict] | None: The verdicts per postal code the
+                model answered validly, or None if the request failed.
+        """
+        if not self.api_key:
+            logger.error("API key is not set.")
+            return None
+
+        request = khc.services.openrouter.models.OpenRouterRequest(
+            model=self.router.choose(),
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            response_format=khc.services.openrouter.models.ShortsVerdict.batch_response_format(),
+        )
+
+        try:
+            return self._complete(
+                request, deadline, cap=BATCH_TIMEOUT_SECONDS
+            ).get_batch_verdicts()
+        except khc.base.deadline.DeadlineExceeded:
+            logger.error("No time left for the chat completion.")
+            return None
+        except khc.base.circuit_breaker.CircuitOpenError:
+            logger.warning("Circuit open, not calling OpenRouter.")
+            return None
+        except requests.RequestException as e:
+            logger.error(f"HTTP request error: {e}")
+            return None
+        except ValueError as e:
+            logger.error(f"JSON decode error: {e}")
+            return None
+
+    def stream_chat_completion(
+        self,
+        prompt: str,
+        max_tokens: int = 80,
+        deadline: khc.base.deadline.Deadline | None = None,
+        stop_when: typing.Callable[[str], bool] | None = None,
+        raise_transient: bool = False,
+        background: bool = False,
+    ) -> str:
+        """
+        Stream a chat completion and stop as soon as the answer is complete.
+
+        The completion is requested as server-sent events. Content deltas are
+        collected until the stream ends or stop_when returns True for the text
+        received so far, in which case the connection is closed right away.
+        The time until then is recorded for the router, hedging and metrics
+        like the latency of a non-streaming request.
+
+        Args:
+            prompt (str): The user prompt for the chat completion.
+            max_tokens (int, optional): Maximum tokens to generate. Defaults to 80.
+            deadline (Deadline | None, optional): Deadline of the request. Each read
+                gets the remaining time, but at most TIMEOUT_SECONDS.
+            stop_when (Callable[[str], bool] | None, optional): Predicate on the
+                content received so far that ends the stream early.
+            raise_transient (bool, optional): Whether to raise TRANSIENT_ERRORS
+                instead of answering FALLBACK_MESSAGE. Defaults to False.
+            background (bool, optional): Whether the request only refreshes a
+                cache, e.g. after the invocation returned. Such requests run only
+                while the circuit is closed, are not hedged and are left out of
+                the circuit breaker, router statistics and metrics, since a
+                frozen Lambda container inflates their latency. Defaults to False.
+
+        Returns:
+            str: The content of the chat completion or an error message.
+
+        Raises:
+            DeadlineExceeded, CircuitOpenError, RequestException: With
+                raise_transient, if no answer could be obtained right now.
+        """
+        if not self.api_key:
+            logger.error("API key is not set.")
+            return NOT_CONFIGURED_MESSAGE
+
+        model = self.router.choose()
         request_body = khc.services.openrouter.models.OpenRouterRequest(
-            model="gpt-4o-mini",
+            model=model,
             messages=[{"role": "user", "content": prompt}],
             max_tokens=max_tokens,
+            stream=True,
         ).to_dict()
 
         try:
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=request_body,
-                timeout=5,
-            )
-            response.raise_for_status()
-            data = response.json()
-            openrouter_response = (
-                khc.services.openrouter.models.OpenRouterResponse.from_json(data)
-            )
-            content = openrouter_response.get_message_content()
+            timeout = deadline.timeout(TIMEOUT_SECONDS) if deadline else TIMEOUT_SECONDS
+            permit = self._allow(background)
+            started = time.monotonic()
+            try:
+                with self.session.post(
+                    self.url,
+                    headers=self._headers(),
+                    json=request_body,
+                    timeout=timeout,
+                    stream=True,
+                ) as response:
+                    response.raise_for_status()
+                    content = self._read_stream(response, deadline, stop_when)
+            except Exception as e:
+                self._record_failure(permit, model, e, timeout, TIMEOUT_SECONDS)
+                raise
+            # Time until the answer was complete, like the latency of _post().
+            self._record_success(permit, model, time.monotonic() - started)
             if content:
                 return content
             else:
-                return "Tut mir leid, ich konnte die Antwort gerade nicht erhalten."
+                return FALLBACK_MESSAGE
+        except khc.base.deadline.DeadlineExceeded:
+            logger.error("No time left for the chat completion.")
+            if raise_transient:
+                raise
+            return FALLBACK_MESSAGE
+        except khc.base.circuit_breaker.CircuitOpenError:
+            logger.warning("Circuit open, not calling OpenRouter.")
+            if raise_transient:
+                raise
+            return FALLBACK_MESSAGE
         except requests.RequestException as e:
             logger.error(f"HTTP request error: {e}")
-            return "Tut mir leid, ich konnte die Antwort gerade nicht erhalten."
+            if raise_transient:
+                raise
+            return FALLBACK_MESSAGE
         except ValueError as e:
             logger.error(f"JSON decode error: {e}")
-            return "Tut mir leid, ich konnte die Antwort gerade nicht erhalten."
+            return FALLBACK_MESSAGE
+
+    def available(self) -> bool:
+        """
+        Return whether requests are currently let through to OpenRouter.
+
+        Returns:
+            bool: False while the circuit breaker is open or the probe of the
+                half-open circuit is in flight, i.e. a request would be rejected.
+        """
+        return self.breaker.admits()
+
+    def _complete(
+        self,
+        request: khc.services.openrouter.models.OpenRouterRequest,
+        deadline: khc.base.deadline.Deadline | None,
+        cap: float = TIMEOUT_SECONDS,
+        background: bool = False,
+    ) -> khc.services.openrouter.models.OpenRouterResponse:
+        if background:
+            return self._post(request, deadline, cap, background=True)
+        if self.hedge_model is None or self.hedge_model == request.model:
+            return self._post(request, deadline, cap)
+
+        with self._lock:
+            # Every hedgeable request earns a fraction of a hedge.
+            self._hedge_tokens = min(self._hedge_tokens + self.hedge_ratio, HEDGE_BURST)
+        executor = self._get_executor()
+        primary = executor.submit(self._post, request, deadline, cap)
+        delay = self._hedge_delay(request.model)
+        if deadline is not None:
+            delay = min(delay, deadline.remaining())
+        concurrent.futures.wait([primary], timeout=delay)
+        if primary.done() and primary.exception() is None:
+            return primary.result()
+        if not self._may_hedge(deadline):
+            return primary.result()
+
+        logger.info(f"Hedging {request.model} with {self.hedge_model}.")
+        hedge_request = copy.copy(request)
+        hedge_request.model = self.hedge_model
+        pending = {primary, executor.submit(self._post, hedge_request, deadline, cap)}
+        errors: list[BaseException] = []
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                if future.exception() is None:
+                    # The loser cannot be interrupted mid-request; its answer is
+                    # discarded and its connection returned when it finishes.
+                    for loser in pending:
+                        loser.cancel()
+                    return future.result()
+                errors.append(typing.cast(BaseException, future.exception()))
+        raise errors[0]
+
+    def _post(
+        self,
+        request: khc.services.openrouter.models.OpenRouterRequest,
+        deadline: khc.base.deadline.Deadline | None,
+        cap: float,
+        background: bool = False,
+    ) -> khc.services.openrouter.models.OpenRouterResponse:
+        body = request.to_dict()
+        key = self.disk_cache.key(body) if self.disk_cache is not None else ""
+        if self.disk_cache is not None:
+            cached = self.disk_cache.get(key)
+            if cached is not None:
+                logger.info(f"Disk cache hit for {request.model}.")
+                return khc.services.openrouter.models.OpenRouterResponse.from_json(
+                    cached
+                )
+
+        timeout = deadline.timeout(cap) if deadline else cap
+        permit = self._allow(background)
+        started = time.monotonic()
+        try:
+            response = self.session.post(
+                self.url,
+                headers=self._headers(),
+                json=body,
+                timeout=timeout,
+            )
+            response.raise_for_status()
+            data = response.json()
+            openrouter_response = (
+                khc.services.openrouter.models.OpenRouterResponse.from_json(data)
+            )
+        except Exception as e:
+            self._record_failure(permit, request.model, e, timeout, cap)
+            raise
+        # Batches legitimately take up to their longer cap, so only their
+        # failures count against the circuit, not their latency.
+        self._record_success(
+            permit,
+            request.model,
+            time.monotonic() - started,
+            slow_seconds=None if cap <= TIMEOUT_SECONDS else math.inf,
+        )
+        if self.disk_cache is not None:
+            self.disk_cache.put(key, data)
+        return openrouter_response
+
+    @staticmethod
+    def _cut_short(error: Exception, timeout: float, cap: float) -> bool:
+        # A timeout shorter than the cap only left the time the invocation
+        # had; a healthy upstream may take longer, so it is no failure of it.
+        return isinstance(error, khc.base.deadline.DeadlineExceeded) or (
+            timeout < cap and isinstance(error, requests.Timeout)
+        )
+
+    def _allow(
+        self, background: bool = False
+    ) -> khc.base.circuit_breaker.CallPermit | None:
+        if background:
+            # Background requests are optional, they neither probe a half-open
+            # circuit nor get a permit, so their outcome is not recorded.
+            if self.breaker.state != khc.base.circuit_breaker.CLOSED:
+                raise khc.base.circuit_breaker.CircuitOpenError(
+                    "Circuit is not closed."
+                )
+            return None
+        permit = self.breaker.allow()
+        if permit is None:
+            raise khc.base.circuit_breaker.CircuitOpenError("Circuit is open.")
+        return permit
+
+    def _record_success(
+        self,
+        permit: khc.base.circuit_breaker.CallPermit | None,
+        model: str,
+        latency: float,
+        slow_seconds: float | None = None,
+    ) -> None:
+        if permit is None:
+            return
+        self.breaker.record_success(latency, slow_seconds=slow_seconds, permit=permit)
+        self.router.stats(model).record_success(latency)
+        self._emit_metrics(model, latency)
+
+    def _record_failure(
+        self,
+        permit: khc.base.circuit_breaker.CallPermit | None,
+        model: str,
+        error: Exception,
+        timeout: float,
+        cap: float,
+    ) -> None:
+        if permit is None:
+            return
+        if self._cut_short(error, timeout, cap):
+            logger.info(f"Request to {model} cut short by the deadline.")
+            self.breaker.release(permit)
+            return
+        self.breaker.record_failure(permit)
+        self.router.stats(model).record_failure()
+        self._emit_metrics(model, None)
+
+    def _emit_metrics(self, model: str, latency: float | None) -> None:
+        if not self.emit_metrics:
+            return
+        stats = self.router.stats(model)
+        metrics: dict[str, tuple[float, str]] = {
+            "Error": (0.0 if latency is not None else 1.0, "Count"),
+            "ErrorRate": (stats.error_rate, "None"),
+        }
+        if latency is not None:
+            metrics["Latency"] = (latency * 1000, "Milliseconds")
+        if stats.latency_ewma is not None:
+            metrics["LatencyEwma"] = (stats.latency_ewma * 1000, "Milliseconds")
+        khc.base.metrics.emit_metrics(metrics, {"Model": model})
+
+    def _hedge_delay(self, model: str) -> float:
+        delay = self.router.stats(model).latencies.percentile(self.hedge_percentile)
+        return HEDGE_DELAY_SECONDS if delay is None else delay
+
+    def _may_hedge(self, deadline: khc.base.deadline.Deadline | None) -> bool:
+        if deadline is not None and deadline.remaining() < HEDGE_MINIMUM_SECONDS:
+            logger.info("Not enough time left to hedge.")
+            return False
+        with self._lock:
+            if self._hedge_tokens < 1.0:
+                logger.info("Hedge rate cap reached.")
+                return False
+            self._hedge_tokens -= 1.0
+            return True
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=8, thread_name_prefix="openrouter"
+                )
+            return self._executor
+
+    def _headers(self) -> dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    @staticmethod
+    def _read_stream(
+        response: requests.Response,
+        deadline: khc.base.deadline.Deadline | None,
+        stop_when: typing.Callable[[str], bool] | None,
+    ) -> str:
+        content = ""
+        # text/event-stream is always UTF-8, but without a charset in the
+        # Content-Type requests would decode it as ISO-8859-1.
+        for raw_line in response.iter_lines():
+            line = typing.cast(bytes, raw_line).decode("utf-8")
+            # Blank lines separate events, lines starting with ":" are comments
+            # OpenRouter sends as keep-alive while the model is processing.
+            if not line or line.startswith(":") or not line.startswith("data:"):
+                continue
+            payload = line[len("data:") :].strip()
+            if payload == "[DONE]":
+                break
+            chunk = khc.services.openrouter.models.OpenRouterStreamChunk.from_json(
+                json.loads(payload)
+            )
+            content += chunk.get_delta_content()
+            if stop_when is not None and stop_when(content):
+                logger.info("Answer complete, closing the stream early.")
+                break
+            if deadline is not None and deadline.expired():
+                raise khc.base.deadline.DeadlineExceeded("Deadline exceeded in stream.")
+        return content
@@ -0,0 +1,219 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import typing
+import zoneinfo
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Serve cached responses and store new ones.
+READ_WRITE = "readwrite"
+# Always call OpenRouter and store every response, e.g. to capture a benchmark.
+RECORD = "record"
+# Only serve stored responses regardless of their age, never call OpenRouter.
+REPLAY = "replay"
+MODES = (READ_WRITE, RECORD, REPLAY)
+# The prompts ask about "heute", so answers are only valid on the local day.
+BERLIN = zoneinfo.ZoneInfo("Europe/Berlin")
+
+
+class ReplayMissError(requests.RequestException):
+    """Raised in replay mode when no response was recorded for a request."""
+
+
+def request_key(
+    request: typing.Mapping[str, object], day: datetime.date | None = None
+) -> str:
+    """
+    Compute the content address of a chat completion request.
+
+    Only the fields that determine the answer are hashed: the model, the
+    messages, max_tokens and the response format, plus the day if given.
+
+    Args:
+        request: The request body as sent to OpenRouter.
+        day: The local day the answer is valid on. Defaults to None, any day.
+
+    Returns:
+        str: Hex SHA-256 of the canonical JSON of those fields.
+    """
+    fields: dict[str, object] = {
+        name: request.get(name)
+        for name in ("model", "messages", "max_tokens", "response_format")
+    }
+    if day is not None:
+        fields["day"] = day.isoformat()
+    canonical = json.dumps(fields, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    Content-addressed cache of OpenRouter responses on disk.
+
+    Every response is stored as one JSON file named by the hash of its
+    request, written atomically, so several processes can share the directory,
+    e.g. /tmp of a Lambda host or a volume shared by containers. In READ_WRITE
+    mode the key includes the current day in Europe/Berlin, so answers about
+    "heute" are not served after midnight. Entries expire after ttl_seconds.
+    When the directory grows beyond max_bytes, the oldest entries are deleted.
+
+    Args:
+        directory: Directory holding the cache files.
+        ttl_seconds: Age after which an entry is no longer served. Since the
+            prompts ask about today, keep it well below a day. Defaults to 3600.
+        max_bytes: Size budget of the directory. Defaults to 50 MiB.
+        mode: READ_WRITE, RECORD or REPLAY. Defaults to READ_WRITE.
+        clock: Wall clock in seconds. Defaults to time.time.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ttl_seconds: float = 3600.0,
+        max_bytes: int = 50 * 1024 * 1024,
+        mode: str = READ_WRITE,
+        clock: typing.Callable[[], float] = time.time,
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown disk cache mode: {mode}")
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.clock = clock
+        self._bytes: int | None = None
+        self._lock = threading.Lock()
+
+    def key(self, request: typing.Mapping[str, object]) -> str:
+        """
+        Compute the key a request is stored under.
+
+        Recordings are keyed without the day, so they can be replayed on any
+        later day.
+
+        Args:
+            request: The request body as sent to OpenRouter.
+
+        Returns:
+            str: The request key for get() and put().
+        """
+        if self.mode != READ_WRITE:
+            return request_key(request)
+        day = datetime.datetime.fromtimestamp(self.clock(), BERLIN).date()
+        return request_key(request, day)
+
+    def get(self, key: str) -> dict[str, object] | None:
+        """
+        Look up the response stored for a request.
+
+        Args:
+            key: The request key from key().
+
+        Returns:
+            dict[str, object] | None: The stored response JSON, or None on a miss.
+                Always None in RECORD mode.
+
+        Raises:
+            ReplayMissError: In REPLAY mode, if nothing was recorded for the key.
+        """
+        if self.mode == RECORD:
+            return None
+        path = self._path(key)
+        try:
+            if (
+                self.mode != REPLAY
+                and self.clock() - os.path.getmtime(path) > self.ttl_seconds
+            ):
+                return None
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("Cached response is not a JSON object")
+            return data
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            logger.error(f"Invalid cached response {path}: {e}")
+        if self.mode == REPLAY:
+            raise ReplayMissError(f"No recorded response for {key}.")
+        return None
+
+    def put(self, key: str, data: dict[str, object]) -> None:
+        """
+        Atomically store the response for a request. Nothing is written in
+        REPLAY mode.
+
+        Args:
+            key: The request key from key().
+            data: The response JSON.
+        """
+        if self.mode == REPLAY:
+            return
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                size = os.path.getsize(temp_path)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            logger.error(f"Could not write cached response {path}: {e}")
+            return
+
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._scan_size()
+            else:
+                self._bytes += size
+            if self._bytes > self.max_bytes:
+                self._bytes = self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> int:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        # Shrink to 90 % of the budget, so not every write has to scan.
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except FileNotFoundError:
+                total -= size
+        logger.info(f"Disk cache trimmed to {total} bytes.")
+        return total
@@ -1,4 +1,6 @@
+import json
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
@@ -11,14 +13,24 @@ class OpenRouterRequest:
         model: Model name to use.
         messages: List of message dicts with roles and content.
         max_tokens: Maximum tokens to generate. Defaults to 80.
+        stream: Whether to stream the completion as server-sent events.
+            Defaults to False.
+        response_format: Optional response format, e.g. a JSON schema.
     """
 
     def __init__(
-        self, model: str, messages: list[dict[str, str]], max_tokens: int = 80
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        max_tokens: int = 80,
+        stream: bool = False,
+        response_format: dict[str, object] | None = None,
     ) -> None:
         self.model = model
         self.messages = messages
         self.max_tokens = max_tokens
+        self.stream = stream
+        self.response_format = response_format
 
     def to_dict(self) -> dict[str, object]:
         """
@@ -27,11 +39,16 @@ class OpenRouterRequest:
         Returns:
             Dictionary representation of the request.
         """
-        return {
+        data: dict[str, object] = {
             "model": self.model,
             "messages": self.messages,
             "max_tokens": self.max_tokens,
         }
+        if self.stream:
+            data["stream"] = True
+        if self.response_format is not None:
+            data["response_format"] = self.response_format
+        return data
 
 
 class OpenRouterResponse:
@@ -83,3 +100,244 @@ class OpenRouterResponse:
                     return content
         logger.error("Response JSON structure unexpected or empty.")
         return None
+
+    def get_verdict(self) -> "ShortsVerdict | None":
+        """
+        Parse the message content of the first choice as a ShortsVerdict.
+
+        Returns:
+            The verdict, or None if the content is missing or not a valid verdict.
+        """
+        content = self.get_message_content()
+        if content is None:
+            return None
+        try:
+            data = json.loads(content)
+            if not isinstance(data, dict):
+                raise ValueError("Verdict is not a JSON object")
+            return ShortsVerdict.from_json(data)
+        except ValueError as e:
+            logger.error(f"Invalid verdict in response: {e}")
+            return None
+
+    def get_batch_verdicts(self) -> dict[str, "ShortsVerdict"]:
+        """
+        Parse the message content of the first choice as a batch of verdicts.
+
+        Items are parsed one by one, so invalid items are skipped without losing
+        the others. If the content is cut off, e.g. because max_tokens was
+        reached, the complete items before the cut are still returned.
+
+        Returns:
+            The verdicts per postal code. Missing or invalid items are left out.
+        """
+        content = self.get_message_content()
+        if content is None:
+            return {}
+        try:
+            data = json.loads(content)
+            items = data.get("verdicts") if isinstance(data, dict) else None
+            if not isinstance(items, list):
+                raise ValueError("Missing 'verdicts' array")
+        except ValueError as e:
+            logger.warning(f"Incomplete batch in response, salvaging items: {e}")
+            items = []
+            for match in BATCH_ITEM_PATTERN.finditer(content):
+                try:
+                    items.append(json.loads(match.group()))
+                except ValueError:
+                    continue
+
+        verdicts: dict[str, ShortsVerdict] = {}
+        for item in items:
+            postal_code = item.get("plz") if isinstance(item, dict) else None
+            if not isinstance(postal_code, str):
+                logger.warning(f"Skipping batch item without postal code: {item}")
+                continue
+            try:
+                verdicts.setdefault(postal_code, ShortsVerdict.from_json(item))
+            except ValueError as e:
+                logger.warning(f"Skipping invalid batch item for {postal_code}: {e}")
+        return verdicts
+
+
+# One flat JSON object, i.e. one item of a batch of verdicts.
+BATCH_ITEM_PATTERN = re.compile(r"\{[^{}]*\}")
+
+
+class OpenRouterStreamChunk:
+    """
+    Data Transfer Object for one server-sent event of a streamed chat completion.
+
+    Args:
+        choices: List of choices from the event payload.
+    """
+
+    def __init__(self, choices: list[dict[str, object]]) -> None:
+        self.choices = choices
+
+    @classmethod
+    def from_json(cls, data: dict[str, object]) -> "OpenRouterStreamChunk":
+        """
+        Instantiate OpenRouterStreamChunk from JSON data.
+
+        Args:
+            data: Parsed JSON data of one event.
+
+        Returns:
+            Instance with parsed choices.
+        """
+        raw_choices = data.get("choices")
+        if isinstance(raw_choices, list) and all(
+            isinstance(c, dict) for c in raw_choices
+        ):
+            return cls(choices=raw_choices)
+        else:
+            raise ValueError("Invalid 'choices' structure in stream chunk")
+
+    def get_delta_content(self) -> str:
+        """
+        Extract the content delta of the first choice.
+
+        Returns:
+            The new content, or an empty string if the chunk carries none.
+        """
+        if len(self.choices) > 0:
+            delta = self.choices[0].get("delta")
+            if isinstance(delta, dict):
+                content = delta.get("content")
+                if isinstance(content, str):
+                    return content
+        return ""
+
+
+class ShortsVerdict:
+    """
+    Data Transfer Object for the structured answer of the model.
+
+    Args:
+        shorts: Whether shorts can be worn today.
+        place: Name of the place of the postal code, or None if unknown.
+    """
+
+    SCHEMA: dict[str, object] = {
+        "type": "object",
+        "properties": {
+            "shorts": {"type": "boolean"},
+            "place": {"type": "string"},
+        },
+        "required": ["shorts", "place"],
+        "additionalProperties": False,
+    }
+
+    BATCH_SCHEMA: dict[str, object] = {
+        "type": "object",
+        "properties": {
+            "verdicts": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "plz": {"type": "string"},
+                        "shorts": {"type": "boolean"},
+                    },
+                    "required": ["plz", "shorts"],
+                    "additionalProperties": False,
+                },
+            }
+        },
+        "required": ["verdicts"],
+        "additionalProperties": False,
+    }
+
+    def __init__(self, shorts: bool, place: str | None = None) -> None:
+        self.shorts = shorts
+        self.place = place
+
+    @classmethod
+    def response_format(cls, include_place: bool = True) -> dict[str, object]:
+        """
+        Build the response_format asking the model for a verdict.
+
+        Args:
+            include_place: Whether the model should name the place. Can be turned
+                off when the place is already known. Defaults to True.
+
+        Returns:
+            A JSON schema response format for OpenRouterRequest.
+        """
+        schema = cls.SCHEMA
+        if not include_place:
+            schema = {
+                "type": "object",
+                "properties": {"shorts": {"type": "boolean"}},
+                "required": ["shorts"],
+                "additionalProperties": False,
+            }
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "verdict", "strict": True, "schema": schema},
+        }
+
+    @classmethod
+    def batch_response_format(cls) -> dict[str, object]:
+        """
+        Build the response_format asking the model for verdicts for several
+        postal codes at once.
+
+        Returns:
+            A JSON schema response format for OpenRouterRequest.
+        """
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "verdicts",
+                "strict": True,
+                "schema": cls.BATCH_SCHEMA,
+            },
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, object]) -> "ShortsVerdict":
+        """
+        Instantiate ShortsVerdict from JSON data.
+
+        Args:
+            data: Parsed JSON object returned by the model.
+
+        Returns:
+            Instance with the parsed verdict.
+
+        Raises:
+            ValueError: If 'shorts' is not a boolean.
+        """
+        shorts = data.get("shorts")
+        place = data.get("place")
+        if not isinstance(shorts, bool):
+            raise ValueError("Invalid 'shorts' in verdict")
+        return cls(
+            shorts=shorts,
+            place=place.strip() or None if isinstance(place, str) else None,
+        )
+
+    def to_dict(self) -> dict[str, object]:
+        """
+        Convert the verdict to a dictionary, the inverse of from_json().
+
+        Returns:
+            Dictionary representation of the verdict.
+        """
+        data: dict[str, object] = {"shorts": self.shorts}
+        if self.place is not None:
+            data["place"] = self.place
+        return data
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, ShortsVerdict)
+            and self.shorts == other.shorts
+            and self.place == other.place
+        )
+
+    def __repr__(self) -> str:
+        return f"ShortsVerdict(shorts={self.shorts!r}, place={self.place!r})"
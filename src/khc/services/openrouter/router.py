@@ -0,0 +1,166 @@
+import logging
+import math
+import random
+import threading
+import typing
+
+import khc.base.latency
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest observation in the moving averages.
+EWMA_ALPHA = 0.2
+# Share of requests sent to another model than the fastest one.
+EXPLORATION = 0.05
+# Models whose error rate reaches this are skipped while others are healthy.
+ERROR_THRESHOLD = 0.5
+
+
+class ModelStats:
+    """
+    Rolling latency and error statistics of one model, updated safely from
+    hedged and parallel requests.
+
+    Args:
+        alpha: Weight of the newest observation in the moving averages.
+            Defaults to EWMA_ALPHA.
+    """
+
+    def __init__(self, alpha: float = EWMA_ALPHA) -> None:
+        self.alpha = alpha
+        self.latencies = khc.base.latency.LatencyTracker()
+        self.latency_ewma: float | None = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def record_success(self, seconds: float) -> None:
+        """
+        Record a successful request.
+
+        Args:
+            seconds: The latency of the request.
+        """
+        self.latencies.record(seconds)
+        with self._lock:
+            self.latency_ewma = (
+                seconds
+                if self.latency_ewma is None
+                else (1 - self.alpha) * self.latency_ewma + self.alpha * seconds
+            )
+            self.error_rate *= 1 - self.alpha
+            self.requests += 1
+
+    def record_failure(self) -> None:
+        """Record a failed request."""
+        with self._lock:
+            self.error_rate = (1 - self.alpha) * self.error_rate + self.alpha
+            self.requests += 1
+
+    def to_dict(self) -> dict[str, float | int | None]:
+        """
+        Convert the statistics to a dictionary, e.g. for logging.
+
+        Returns:
+            Dictionary representation of the statistics.
+        """
+        with self._lock:
+            data: dict[str, float | int | None] = {
+                "requests": self.requests,
+                "latency_ewma": self.latency_ewma,
+                "error_rate": self.error_rate,
+            }
+        data["latency_p50"] = self.latencies.percentile(0.5)
+        data["latency_p95"] = self.latencies.percentile(0.95)
+        return data
+
+
+def latency_rank(stats: ModelStats) -> float:
+    """
+    Rank of a model by its latency, for choosing the fastest.
+
+    Args:
+        stats: The statistics of the model.
+
+    Returns:
+        float: The latency average, or infinity without latency data.
+    """
+    return math.inf if stats.latency_ewma is None else stats.latency_ewma
+
+
+class ModelRouter:
+    """
+    Routes each request to the fastest healthy candidate model.
+
+    A model is healthy while its error rate stays below the error threshold.
+    Models without latency data rank after measured ones, so a model that
+    never succeeded is not taken for the fastest. A small share of requests
+    explores another candidate, which tries unmeasured models, keeps the
+    statistics of slower models current and lets the router follow shifts in
+    upstream performance. The router
+    lives as long as the process, so a warm Lambda container keeps its
+    statistics across invocations.
+
+    Args:
+        models: The candidate models. The first one wins ties.
+        exploration: Share of requests sent to a random other candidate.
+            Defaults to EXPLORATION.
+        error_threshold: Error rate from which a model counts as unhealthy.
+            Defaults to ERROR_THRESHOLD.
+        random_: Source of random numbers in [0, 1). Defaults to random.random.
+    """
+
+    def __init__(
+        self,
+        models: typing.Sequence[str],
+        exploration: float = EXPLORATION,
+        error_threshold: float = ERROR_THRESHOLD,
+        random_: typing.Callable[[], float] = random.random,
+    ) -> None:
+        if not models:
+            raise ValueError("At least one model is required")
+        self.models = list(models)
+        self.exploration = exploration
+        self.error_threshold = error_threshold
+        self.random = random_
+        self._stats: dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def stats(self, model: str) -> ModelStats:
+        """
+        Return the statistics of a model, creating them on first use.
+
+        Args:
+            model: The model name. Need not be a candidate, e.g. a hedge model.
+
+        Returns:
+            ModelStats: The statistics of the model.
+        """
+        with self._lock:
+            return self._stats.setdefault(model, ModelStats())
+
+    def choose(self) -> str:
+        """
+        Choose the model for the next request.
+
+        Returns:
+            str: The fastest healthy candidate, or with the exploration
+                probability another candidate.
+        """
+        if len(self.models) == 1:
+            return self.models[0]
+        stats = {model: self.stats(model) for model in self.models}
+        healthy = [
+            model
+            for model in self.models
+            if stats[model].error_rate < self.error_threshold
+        ]
+        if not healthy:
+            return min(self.models, key=lambda model: stats[model].error_rate)
+        best = min(healthy, key=lambda model: latency_rank(stats[model]))
+        if self.random() < self.exploration:
+            others = [model for model in self.models if model != best]
+            explored = others[int(self.random() * len(others)) % len(others)]
+            logger.info(f"Exploring model {explored}.")
+            return explored
+        return best
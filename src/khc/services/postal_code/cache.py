@@ -0,0 +1,240 @@
+import collections
+import logging
+import threading
+import time
+import typing
+import ask_sdk_core.attributes_manager
+import ask_sdk_core.exceptions
+import ask_sdk_model
+
+import khc.services.postal_code.persistence
+
+logger = logging.getLogger(__name__)
+
+ATTRIBUTE_KEY = "postal_code_cache"
+
+
+class PostalCodeCacheEntry:
+    """
+    Cached result of a Device Address API lookup.
+
+    Args:
+        postal_code: The postal code of the device, or None for a negative entry.
+        expires_at: Unix timestamp after which the entry is no longer valid.
+        error: Error message of a negative entry, or None.
+    """
+
+    def __init__(
+        self, postal_code: str | None, expires_at: float, error: str | None = None
+    ) -> None:
+        self.postal_code = postal_code
+        self.expires_at = expires_at
+        self.error = error
+
+    def to_attributes(self) -> dict[str, object]:
+        """
+        Convert the entry to attributes for a persistence adapter.
+
+        Returns:
+            Dictionary representation of the entry.
+        """
+        return {
+            ATTRIBUTE_KEY: {
+                "postal_code": self.postal_code,
+                "expires_at": self.expires_at,
+            }
+        }
+
+    @classmethod
+    def from_attributes(
+        cls, attributes: dict[str, object]
+    ) -> "PostalCodeCacheEntry | None":
+        """
+        Create an entry from attributes loaded by a persistence adapter.
+
+        Args:
+            attributes: Attributes as returned by the persistence adapter.
+
+        Returns:
+            The entry, or None if the attributes do not contain a valid one.
+        """
+        data = attributes.get(ATTRIBUTE_KEY)
+        if not isinstance(data, dict):
+            return None
+        postal_code = data.get("postal_code")
+        expires_at = data.get("expires_at")
+        if isinstance(postal_code, str) and isinstance(expires_at, (int, float)):
+            return cls(postal_code=postal_code, expires_at=float(expires_at))
+        return None
+
+
+class PostalCodeCache:
+    """
+    TTL cache mapping Alexa device ids to postal codes.
+
+    Lookups go to a bounded in-memory tier first and then, if configured, to a
+    durable tier built on an ask-sdk persistence adapter. Negative results
+    (missing permission, unknown device) are only kept in memory and expire
+    after a short negative_ttl.
+
+    Args:
+        ttl: Seconds a postal code stays valid. Defaults to one day.
+        negative_ttl: Seconds a negative result stays valid. Defaults to 60.
+        max_entries: Maximum number of devices kept in memory. Defaults to 10000.
+        persistence_adapter: Optional adapter for the durable tier.
+        clock: Callable returning the current Unix time. Defaults to time.time.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 24 * 60 * 60,
+        negative_ttl: float = 60,
+        max_entries: int = 10000,
+        persistence_adapter: ask_sdk_core.attributes_manager.AbstractPersistenceAdapter
+        | None = None,
+        clock: typing.Callable[[], float] = time.time,
+    ) -> None:
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.persistence_adapter = persistence_adapter
+        self.clock = clock
+        self._entries: collections.OrderedDict[str, PostalCodeCacheEntry] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(
+        self, request_envelope: ask_sdk_model.RequestEnvelope
+    ) -> PostalCodeCacheEntry | None:
+        """
+        Look up the cached entry for the device of the request.
+
+        Args:
+            request_envelope: The Alexa request envelope.
+
+        Returns:
+            The valid entry, or None if the device is not cached.
+        """
+        device_id = khc.services.postal_code.persistence.device_id_partition_keygen(
+            request_envelope
+        )
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry is not None:
+                if entry.expires_at > now:
+                    self._entries.move_to_end(device_id)
+                    return entry
+                if entry.postal_code is None:
+                    del self._entries[device_id]
+
+        entry = self._load(request_envelope)
+        if entry is not None:
+            # Expired entries are remembered as well, for last_known().
+            self._remember(device_id, entry)
+            if entry.expires_at > now:
+                return entry
+        return None
+
+    def last_known(self, request_envelope: ask_sdk_model.RequestEnvelope) -> str | None:
+        """
+        Look up the postal code the device had, even if its entry has expired.
+
+        The postal code may be outdated, but is usually still right. It is only
+        meant for work done speculatively while the address is looked up again.
+
+        Args:
+            request_envelope: The Alexa request envelope.
+
+        Returns:
+            str | None: The latest postal code of the device, or None if it never
+                had one.
+        """
+        device_id = khc.services.postal_code.persistence.device_id_partition_keygen(
+            request_envelope
+        )
+        with self._lock:
+            entry = self._entries.get(device_id)
+        if entry is None:
+            entry = self._load(request_envelope)
+            if entry is not None:
+                self._remember(device_id, entry)
+        return entry.postal_code if entry is not None else None
+
+    def put(
+        self, request_envelope: ask_sdk_model.RequestEnvelope, postal_code: str
+    ) -> None:
+        """
+        Store the postal code of the device in both tiers.
+
+        Args:
+            request_envelope: The Alexa request envelope.
+            postal_code: The postal code returned by the Device Address API.
+        """
+        entry = PostalCodeCacheEntry(
+            postal_code=postal_code, expires_at=self.clock() + self.ttl
+        )
+        self._remember(
+            khc.services.postal_code.persistence.device_id_partition_keygen(
+                request_envelope
+            ),
+            entry,
+        )
+        self._save(request_envelope, entry)
+
+    def put_negative(
+        self, request_envelope: ask_sdk_model.RequestEnvelope, error: str
+    ) -> None:
+        """
+        Remember for negative_ttl seconds that the lookup for the device failed.
+
+        Args:
+            request_envelope: The Alexa request envelope.
+            error: The error message to raise for cached lookups.
+        """
+        entry = PostalCodeCacheEntry(
+            postal_code=None, expires_at=self.clock() + self.negative_ttl, error=error
+        )
+        self._remember(
+            khc.services.postal_code.persistence.device_id_partition_keygen(
+                request_envelope
+            ),
+            entry,
+        )
+
+    def _remember(self, device_id: str, entry: PostalCodeCacheEntry) -> None:
+        with self._lock:
+            self._entries[device_id] = entry
+            self._entries.move_to_end(device_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(
+        self, request_envelope: ask_sdk_model.RequestEnvelope
+    ) -> PostalCodeCacheEntry | None:
+        if self.persistence_adapter is None:
+            return None
+        try:
+            attributes = typing.cast(
+                dict[str, object],
+                self.persistence_adapter.get_attributes(request_envelope),
+            )
+        except ask_sdk_core.exceptions.PersistenceException as e:
+            logger.warning(f"Failed to load cached postal code: {e}")
+            return None
+        return PostalCodeCacheEntry.from_attributes(attributes)
+
+    def _save(
+        self,
+        request_envelope: ask_sdk_model.RequestEnvelope,
+        entry: PostalCodeCacheEntry,
+    ) -> None:
+        if self.persistence_adapter is None:
+            return
+        try:
+            self.persistence_adapter.save_attributes(
+                request_envelope, entry.to_attributes()
+            )
+        except ask_sdk_core.exceptions.PersistenceException as e:
+            logger.warning(f"Failed to persist postal code: {e}")
@@ -0,0 +1,139 @@
+import json
+import sqlite3
+import threading
+import ask_sdk_core.attributes_manager
+import ask_sdk_core.exceptions
+import ask_sdk_model
+
+
+def device_id_partition_keygen(request_envelope: ask_sdk_model.RequestEnvelope) -> str:
+    """
+    Get the device id of a request to partition persisted attributes by.
+
+    Args:
+        request_envelope: The Alexa request envelope.
+
+    Returns:
+        str: The device id.
+
+    Raises:
+        PersistenceException: If the request envelope contains no device id.
+    """
+    context = request_envelope.context
+    if (
+        context is None
+        or context.system is None
+        or context.system.device is None
+        or not context.system.device.device_id
+    ):
+        raise ask_sdk_core.exceptions.PersistenceException(
+            "Request envelope does not contain a device id."
+        )
+    return context.system.device.device_id
+
+
+class SQLitePersistenceAdapter(
+    ask_sdk_core.attributes_manager.AbstractPersistenceAdapter
+):
+    """
+    Persistence adapter storing attributes per Alexa device in a SQLite file.
+
+    Meant for local development and tests, or a file on a shared volume. In
+    Lambda, an adapter for a shared store such as DynamoDB should be used.
+
+    Args:
+        path: Path of the database file. Defaults to an in-memory database.
+        table_name: Name of the table to store attributes in. Defaults to "attributes".
+    """
+
+    def __init__(self, path: str = ":memory:", table_name: str = "attributes") -> None:
+        self.table_name = table_name
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table_name} "
+                "(id TEXT PRIMARY KEY, attributes TEXT NOT NULL)"
+            )
+
+    # type: ignore[override] The SDK base class has no annotations, its return type is inferred as None.
+    def get_attributes(
+        self, request_envelope: ask_sdk_model.RequestEnvelope
+    ) -> dict[str, object]:
+        """
+        Get the attributes stored for the device of the request.
+
+        Args:
+            request_envelope: The Alexa request envelope.
+
+        Returns:
+            The stored attributes, or an empty dictionary.
+
+        Raises:
+            PersistenceException: If the database cannot be read.
+        """
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    f"SELECT attributes FROM {self.table_name} WHERE id = ?",
+                    (self._key(request_envelope),),
+                ).fetchone()
+            return json.loads(row[0]) if row else {}
+        except (sqlite3.Error, ValueError) as e:
+            raise ask_sdk_core.exceptions.PersistenceException(
+                f"Failed to read attributes: {e}"
+            ) from e
+
+    def save_attributes(
+        self,
+        request_envelope: ask_sdk_model.RequestEnvelope,
+        attributes: dict[str, object],
+    ) -> None:
+        """
+        Store the attributes for the device of the request.
+
+        Args:
+            request_envelope: The Alexa request envelope.
+            attributes: The attributes to store.
+
+        Raises:
+            PersistenceException: If the database cannot be written.
+        """
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    f"INSERT OR REPLACE INTO {self.table_name} (id, attributes) "
+                    "VALUES (?, ?)",
+                    (self._key(request_envelope), json.dumps(attributes)),
+                )
+        except (sqlite3.Error, TypeError) as e:
+            raise ask_sdk_core.exceptions.PersistenceException(
+                f"Failed to save attributes: {e}"
+            ) from e
+
+    def delete_attributes(
+        self, request_envelope: ask_sdk_model.RequestEnvelope
+    ) -> None:
+        """
+        Delete the attributes stored for the device of the request.
+
+        Args:
+            request_envelope: The Alexa request envelope.
+
+        Raises:
+            PersistenceException: If the database cannot be written.
+        """
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    f"DELETE FROM {self.table_name} WHERE id = ?",
+                    (self._key(request_envelope),),
+                )
+        except sqlite3.Error as e:
+            raise ask_sdk_core.exceptions.PersistenceException(
+                f"Failed to delete attributes: {e}"
+            ) from e
+
+    @staticmethod
+    def _key(request_envelope: ask_sdk_model.RequestEnvelope) -> str:
+        return device_id_partition_keygen(request_envelope)
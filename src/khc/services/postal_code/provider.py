@@ -1,28 +1,161 @@
+import hashlib
 import logging
 import requests
+import ask_sdk_core.exceptions
 import ask_sdk_core.handler_input
+import ask_sdk_model
 
+import khc.base.deadline
+import khc.base.singleflight
+import khc.services.postal_code.cache
 import khc.services.postal_code.model
+import khc.services.session
 
 logger = logging.getLogger(__name__)
 
+TIMEOUT_SECONDS = 3.0
+# Logged for every resolved postal code, so captures of real traffic can join
+# it to the request envelopes by the hashed device id, see bench/replay.py.
+RESOLVED_MESSAGE = "Resolved postal code {postal_code} for device {device}."
+
+
+def device_key(device_id: str) -> str:
+    """
+    Hash a device id for logs, so they do not contain the id itself.
+
+    Args:
+        device_id: The Alexa device id.
+
+    Returns:
+        str: The first 16 hex digits of its SHA-256.
+    """
+    return hashlib.sha256(device_id.encode("utf-8")).hexdigest()[:16]
+
+
+def has_address_consent(request_envelope: ask_sdk_model.RequestEnvelope) -> bool:
+    """
+    Check whether the user granted the skill access to the device address.
+
+    Alexa only includes a consent token in the request envelope if the
+    permission was granted, so no API call is needed to find out.
+
+    Args:
+        request_envelope: The Alexa request envelope.
+
+    Returns:
+        bool: True if the envelope contains a consent token.
+    """
+    context = request_envelope.context
+    system = context.system if context else None
+    user = system.user if system else None
+    permissions = user.permissions if user else None
+    return bool(permissions and permissions.consent_token)
+
 
 class PostalCodeProvider:
-    @staticmethod
-    def get_postal_code(handler_input: ask_sdk_core.handler_input.HandlerInput) -> str:
+    """
+    Provider for the postal code of an Alexa device.
+
+    Args:
+        session: Pooled HTTP session to reuse across invocations. Defaults to a
+            new session from create_session().
+        cache: Cache of postal codes per device. Defaults to an in-memory
+            PostalCodeCache.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session | None = None,
+        cache: khc.services.postal_code.cache.PostalCodeCache | None = None,
+    ) -> None:
+        self.session = session or khc.services.session.create_session()
+        self.cache = cache or khc.services.postal_code.cache.PostalCodeCache()
+        self._flights: khc.base.singleflight.SingleFlight[str] = (
+            khc.base.singleflight.SingleFlight()
+        )
+
+    def get_postal_code(
+        self,
+        handler_input: ask_sdk_core.handler_input.HandlerInput,
+        deadline: khc.base.deadline.Deadline | None = None,
+    ) -> str:
         """
         Retrieve the postal code from Alexa Device Address API.
 
+        Results are cached per device. Missing permissions (403) and unknown
+        devices (404) are cached for a short time as well. Concurrent cache
+        misses for the same device share one API call. If the request envelope
+        carries no consent token, the permission is missing and no call is made.
+        Every resolved postal code is logged as RESOLVED_MESSAGE.
+
         Args:
             handler_input: The Alexa SDK handler input containing the request envelope and context.
+            deadline: Deadline of the request. The API call gets the remaining time,
+                but at most TIMEOUT_SECONDS.
 
         Returns:
             str: The postal code of the Alexa device.
 
         Raises:
             PermissionError: If permissions are missing or postal code is not available.
+            DeadlineExceeded: If the deadline has passed, the API call timed out or
+                waiting for the call in flight for the device timed out.
         """
+        if not has_address_consent(handler_input.request_envelope):
+            logger.info("No consent token, skipping the device address API.")
+            raise PermissionError("Missing permissions for device address.")
+
         device_id: str = handler_input.request_envelope.context.system.device.device_id
+        cached = self.cache.get(handler_input.request_envelope)
+        if cached is not None:
+            if cached.postal_code:
+                logger.info(f"Postal code cache hit: {cached.postal_code}")
+                postal_code = cached.postal_code
+            else:
+                logger.info("Negative postal code cache hit.")
+                raise PermissionError(cached.error)
+        else:
+            postal_code = self._flights.do(
+                device_id,
+                lambda: self._fetch_postal_code(handler_input, device_id, deadline),
+                timeout=deadline.remaining() if deadline else None,
+            )
+        logger.info(
+            RESOLVED_MESSAGE.format(
+                postal_code=postal_code, device=device_key(device_id)
+            )
+        )
+        return postal_code
+
+    def last_known_postal_code(
+        self, handler_input: ask_sdk_core.handler_input.HandlerInput
+    ) -> str | None:
+        """
+        Return the postal code the device had on an earlier invocation, without
+        calling the Device Address API.
+
+        It may be outdated; get_postal_code() tells the current one.
+
+        Args:
+            handler_input: The Alexa SDK handler input containing the request envelope.
+
+        Returns:
+            str | None: The remembered postal code, or None if there is none or
+                the permission was withdrawn.
+        """
+        if not has_address_consent(handler_input.request_envelope):
+            return None
+        try:
+            return self.cache.last_known(handler_input.request_envelope)
+        except ask_sdk_core.exceptions.PersistenceException:
+            return None
+
+    def _fetch_postal_code(
+        self,
+        handler_input: ask_sdk_core.handler_input.HandlerInput,
+        device_id: str,
+        deadline: khc.base.deadline.Deadline | None,
+    ) -> str:
         api_endpoint: str = handler_input.request_envelope.context.system.api_endpoint
         api_access_token: str = (
             handler_input.request_envelope.context.system.api_access_token
@@ -31,7 +164,14 @@ class PostalCodeProvider:
         url = f"{api_endpoint}/v1/devices/{device_id}/settings/address/countryAndPostalCode"
         headers = {"Authorization": f"Bearer {api_access_token}"}
 
-        response: requests.Response = requests.get(url, headers=headers, timeout=3)
+        timeout = deadline.timeout(TIMEOUT_SECONDS) if deadline else TIMEOUT_SECONDS
+        try:
+            response: requests.Response = self.session.get(
+                url, headers=headers, timeout=timeout
+            )
+        except requests.Timeout as e:
+            logger.error(f"Device address API timed out after {timeout:.2f}s.")
+            raise khc.base.deadline.DeadlineExceeded(str(e)) from e
 
         if response.status_code == 200:
             data: dict[str, object] = response.json()
@@ -40,15 +180,23 @@ class PostalCodeProvider:
             )
             if postal_response.postal_code:
                 logger.info(f"Postal code retrieved: {postal_response.postal_code}")
+                self.cache.put(
+                    handler_input.request_envelope, postal_response.postal_code
+                )
                 return postal_response.postal_code
             else:
                 logger.error("Postal code not found in response JSON.")
                 raise PermissionError("Postal code not available.")
         elif response.status_code == 403:
             logger.error("Permission denied for device address API.")
-            raise PermissionError("Missing permissions for device address.")
+            error = "Missing permissions for device address."
+            self.cache.put_negative(handler_input.request_envelope, error)
+            raise PermissionError(error)
         else:
             logger.error(
                 f"Failed to get postal code: {response.status_code} - {response.text}"
             )
-            raise PermissionError(f"Failed to get postal code: {response.status_code}")
+            error = f"Failed to get postal code: {response.status_code}"
+            if response.status_code == 404:
+                self.cache.put_negative(handler_input.request_envelope, error)
+            raise PermissionError(error)
@@ -0,0 +1,63 @@
+import logging
+import typing
+import requests
+import requests.adapters
+
+logger = logging.getLogger(__name__)
+
+
+def create_session(
+    pool_connections: int = 2,
+    pool_maxsize: int = 10,
+    max_retries: int = 0,
+    prime_urls: typing.Iterable[str] = (),
+    prime_timeout: float = 1.0,
+) -> requests.Session:
+    """
+    Create a long-lived HTTP session with a keep-alive connection pool.
+
+    The session is meant to be created once per process, e.g. in create_skill(),
+    so that TCP and TLS connections are reused across warm Lambda invocations.
+
+    Args:
+        pool_connections: Number of per-host connection pools to keep. Defaults to 2.
+        pool_maxsize: Maximum number of connections kept per host. Defaults to 10.
+        max_retries: Retries for failed connection attempts. Defaults to 0.
+        prime_urls: URLs to open a connection to right away. Defaults to none.
+        prime_timeout: Timeout in seconds for each priming request. Defaults to 1.0.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=max_retries,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    prime_session(session, prime_urls, timeout=prime_timeout)
+    return session
+
+
+def prime_session(
+    session: requests.Session, urls: typing.Iterable[str], timeout: float = 1.0
+) -> None:
+    """
+    Establish pooled connections by sending a HEAD request to each URL.
+
+    Failures are logged and otherwise ignored, priming is best effort only.
+
+    Args:
+        session: The session whose pool should be primed.
+        urls: URLs of the hosts to connect to.
+        timeout: Timeout in seconds for each request. Defaults to 1.0.
+    """
+    for url in urls:
+        try:
+            session.head(url, timeout=timeout)
+            logger.info(f"Primed connection to {url}.")
+        except requests.RequestException as e:
+            logger.warning(f"Failed to prime connection to {url}: {e}")
@@ -0,0 +1,150 @@
+import datetime
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import types
+import typing
+
+import khc.services.weather.cache
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks whether the nightly precompute replaced the file.
+CHECK_INTERVAL_SECONDS = 60.0
+
+
+class AnswerStore:
+    """
+    Read-only store of precomputed shorts verdicts for one day.
+
+    The store is written by the nightly precompute (khc.precompute) and maps
+    each key (e.g. a postal code) to whether shorts can be worn. It is loaded
+    lazily on first use and only answers lookups on the day it was computed for.
+    A warm container reloads the file when its modification time changes,
+    checking at most every check_interval seconds, and on every lookup while
+    the loaded store is not for today.
+
+    Args:
+        path: Path of the store file written by write_answer_store().
+        clock: Callable returning the current timezone-aware datetime.
+            Defaults to the current time.
+        check_interval: Seconds between checks whether the file changed.
+            Defaults to CHECK_INTERVAL_SECONDS.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        clock: typing.Callable[[], datetime.datetime] | None = None,
+        check_interval: float = CHECK_INTERVAL_SECONDS,
+    ) -> None:
+        self.path = path
+        self.clock = clock or (
+            lambda: datetime.datetime.now(tz=khc.services.weather.cache.BERLIN)
+        )
+        self.check_interval = check_interval
+        self._day: datetime.date | None = None
+        self._verdicts: typing.Mapping[str, bool] = types.MappingProxyType({})
+        self._mtime: int | None = None
+        self._next_check = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def day(self) -> datetime.date | None:
+        """The day the store was computed for, or None if it is not available."""
+        self._ensure_loaded(self._today())
+        return self._day
+
+    def get(self, key: str) -> bool | None:
+        """
+        Look up the precomputed verdict for today.
+
+        Args:
+            key: The key the verdict was computed for, e.g. a postal code.
+
+        Returns:
+            bool | None: Whether shorts can be worn, or None if the store has no
+                verdict for the key or was computed for another day.
+        """
+        today = self._today()
+        self._ensure_loaded(today)
+        if self._day != today:
+            return None
+        return self._verdicts.get(key)
+
+    def __len__(self) -> int:
+        self._ensure_loaded(self._today())
+        return len(self._verdicts)
+
+    def _today(self) -> datetime.date:
+        return self.clock().astimezone(khc.services.weather.cache.BERLIN).date()
+
+    def _ensure_loaded(self, today: datetime.date) -> None:
+        if self._loaded and self._day == today and time.monotonic() < self._next_check:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self._loaded and self._day == today and now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            try:
+                mtime: int | None = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if self._loaded and mtime == self._mtime:
+                return
+            self._load()
+            self._mtime = mtime
+            self._loaded = True
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._day = datetime.date.fromisoformat(data["day"])
+            self._verdicts = types.MappingProxyType(
+                {key: bool(shorts) for key, shorts in data["verdicts"].items()}
+            )
+            logger.info(
+                f"Loaded {len(self._verdicts)} precomputed verdicts for {self._day}."
+            )
+        except FileNotFoundError:
+            logger.warning(f"Answer store {self.path} not found.")
+            self._day = None
+            self._verdicts = types.MappingProxyType({})
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.error(f"Invalid answer store {self.path}: {e}")
+
+
+def write_answer_store(
+    path: str, day: datetime.date, verdicts: typing.Mapping[str, bool]
+) -> None:
+    """
+    Atomically write precomputed verdicts to a store file.
+
+    Args:
+        path: Path of the file to write.
+        day: The day the verdicts are valid for.
+        verdicts: Whether shorts can be worn, per key.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "day": day.isoformat(),
+                    "verdicts": {key: int(verdicts[key]) for key in sorted(verdicts)},
+                },
+                f,
+                separators=(",", ":"),
+            )
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
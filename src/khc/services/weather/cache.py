@@ -0,0 +1,307 @@
+import collections
+import datetime
+import logging
+import sys
+import threading
+import typing
+import zoneinfo
+
+logger = logging.getLogger(__name__)
+
+BERLIN = zoneinfo.ZoneInfo("Europe/Berlin")
+
+V = typing.TypeVar("V")
+
+
+class CacheStats:
+    """
+    Counters describing the effectiveness of an AnswerCache.
+
+    Args:
+        hits: Number of lookups answered from the cache.
+        misses: Number of lookups that found no valid entry.
+        evictions: Number of entries dropped to stay within the size limits.
+        expirations: Number of entries dropped because their day has passed.
+        shared_hits: Number of lookups missing the process but answered from a
+            shared cache, see TieredCache.
+    """
+
+    def __init__(
+        self,
+        hits: int = 0,
+        misses: int = 0,
+        evictions: int = 0,
+        expirations: int = 0,
+        shared_hits: int = 0,
+    ) -> None:
+        self.hits = hits
+        self.misses = misses
+        self.evictions = evictions
+        self.expirations = expirations
+        self.shared_hits = shared_hits
+
+    def to_dict(self) -> dict[str, int]:
+        """
+        Convert the counters to a dictionary, e.g. for logging.
+
+        Returns:
+            Dictionary representation of the counters.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "shared_hits": self.shared_hits,
+        }
+
+
+class AnswerCache(typing.Generic[V]):
+    """
+    Bounded in-memory LRU cache for answers that are valid for one calendar day.
+
+    Entries are stored per key (e.g. a postal code or a weather region) and
+    belong to the local calendar day in Europe/Berlin on which they were
+    written. Once that day has passed, they are no longer returned by get(),
+    but the last answer per key is kept for get_stale(), up to max_entries
+    keys. The cache lives as long as the process, so a warm Lambda container
+    keeps its answers across invocations.
+
+    Args:
+        max_entries: Maximum number of entries kept. Defaults to 2048.
+        max_bytes: Maximum approximate memory footprint of keys and values in
+            bytes. Defaults to 1 MiB.
+        clock: Callable returning the current timezone-aware datetime.
+            Defaults to the current time.
+        refresh_after: Age after which an entry of today is still returned, but
+            needs_refresh() reports it for revalidation. Defaults to None, i.e.
+            entries never need a refresh during their day.
+        negative_ttl: Time for which put_negative() marks a key as failed, so
+            is_negative() reports it. Defaults to None, i.e. failures are not
+            cached.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        max_bytes: int = 1024 * 1024,
+        clock: typing.Callable[[], datetime.datetime] | None = None,
+        refresh_after: datetime.timedelta | None = None,
+        negative_ttl: datetime.timedelta | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock or (lambda: datetime.datetime.now(tz=BERLIN))
+        self.refresh_after = refresh_after
+        self.negative_ttl = negative_ttl
+        self.stats = CacheStats()
+        self._entries: collections.OrderedDict[
+            str, tuple[datetime.date, V, int, datetime.datetime]
+        ] = collections.OrderedDict()
+        self._bytes = 0
+        self._stale: collections.OrderedDict[str, V] = collections.OrderedDict()
+        self._negative: collections.OrderedDict[str, datetime.datetime] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def today(self) -> datetime.date:
+        """
+        Return the current calendar day in Europe/Berlin.
+
+        Returns:
+            The local date entries are currently written for.
+        """
+        return self.clock().astimezone(BERLIN).date()
+
+    def get(self, key: str) -> V | None:
+        """
+        Look up the answer stored for today under the given key.
+
+        Args:
+            key: The cache key, e.g. a postal code.
+
+        Returns:
+            The cached answer, or None if there is no entry for today.
+        """
+        today = self.today()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            day, value, _, _ = entry
+            if day != today:
+                self._remove(key, today)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def get_stale(self, key: str) -> V | None:
+        """
+        Look up the latest answer stored under the given key, even from an
+        earlier day. Used as a degraded answer when no fresh one can be had.
+
+        Args:
+            key: The cache key, e.g. a postal code.
+
+        Returns:
+            The latest answer, or None if there is none.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry[1]
+            return self._stale.get(key)
+
+    def needs_refresh(self, key: str) -> bool:
+        """
+        Return whether today's entry for the key is older than refresh_after.
+
+        Args:
+            key: The cache key, e.g. a postal code.
+
+        Returns:
+            bool: True if the entry should be revalidated in the background.
+        """
+        if self.refresh_after is None:
+            return False
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return False
+        day, _, _, written_at = entry
+        return day == now.astimezone(BERLIN).date() and (
+            now - written_at >= self.refresh_after
+        )
+
+    def put(self, key: str, value: V) -> None:
+        """
+        Store an answer for today under the given key.
+
+        Least recently used entries are evicted until the cache fits into
+        max_entries and max_bytes again. Values that are larger than max_bytes
+        on their own are not stored.
+
+        Args:
+            key: The cache key, e.g. a postal code.
+            value: The answer to store.
+        """
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if size > self.max_bytes:
+            logger.warning(f"Answer for {key} too large to cache ({size} bytes).")
+            return
+
+        now = self.clock()
+        today = now.astimezone(BERLIN).date()
+        with self._lock:
+            self._negative.pop(key, None)
+            if key in self._entries:
+                self._remove(key, today)
+            self._entries[key] = (today, value, size, now)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                expired = self._entries[oldest][0] != today
+                self._remove(oldest, today)
+                if expired:
+                    self.stats.expirations += 1
+                else:
+                    self.stats.evictions += 1
+
+    def get_many(self, keys: typing.Iterable[str]) -> dict[str, V]:
+        """
+        Look up the answers stored for today under several keys.
+
+        Args:
+            keys: The cache keys, e.g. weather regions.
+
+        Returns:
+            dict[str, V]: The cached answers per key. Keys without an entry for
+                today are left out.
+        """
+        answers: dict[str, V] = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                answers[key] = value
+        return answers
+
+    def put_many(self, values: typing.Mapping[str, V]) -> None:
+        """
+        Store answers for today under several keys.
+
+        Args:
+            values: The answers per key.
+        """
+        for key, value in values.items():
+            self.put(key, value)
+
+    def put_negative(self, key: str) -> None:
+        """
+        Remember that no answer could be obtained for the key, for negative_ttl.
+
+        Callers check is_negative() before asking the upstream service again,
+        so a failing key is not retried on every request. Does nothing if
+        negative_ttl is None.
+
+        Args:
+            key: The cache key, e.g. a postal code.
+        """
+        if self.negative_ttl is None:
+            return
+        expires_at = self.clock() + self.negative_ttl
+        with self._lock:
+            self._negative.pop(key, None)
+            self._negative[key] = expires_at
+            while len(self._negative) > self.max_entries:
+                self._negative.popitem(last=False)
+
+    def is_negative(self, key: str) -> bool:
+        """
+        Return whether put_negative() marked the key as failed recently.
+
+        Args:
+            key: The cache key, e.g. a postal code.
+
+        Returns:
+            bool: True if no answer should be requested for the key right now.
+        """
+        now = self.clock()
+        with self._lock:
+            expires_at = self._negative.get(key)
+            if expires_at is None:
+                return False
+            if now >= expires_at:
+                del self._negative[key]
+                return False
+            return True
+
+    def clear(self) -> None:
+        """Remove all entries. The counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._stale.clear()
+            self._negative.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Approximate memory footprint of all stored keys and values."""
+        return self._bytes
+
+    def _remove(self, key: str, today: datetime.date) -> None:
+        day, value, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        if day != today:
+            self._stale[key] = value
+            self._stale.move_to_end(key)
+            while len(self._stale) > self.max_entries:
+                self._stale.popitem(last=False)
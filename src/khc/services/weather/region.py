@@ -0,0 +1,105 @@
+import abc
+import math
+
+import khc.services.gazetteer.index
+
+
+class RegionMapper(abc.ABC):
+    """Maps postal codes to the weather region whose verdict they share."""
+
+    @abc.abstractmethod
+    def region_of(self, postal_code: str) -> str:
+        """
+        Return the region key of a postal code.
+
+        Args:
+            postal_code: The 5-digit postal code.
+
+        Returns:
+            str: The region key, used for caching and precomputing verdicts.
+        """
+
+
+class PostalCodeRegionMapper(RegionMapper):
+    """Every postal code is a region of its own."""
+
+    def region_of(self, postal_code: str) -> str:
+        return postal_code
+
+
+class PrefixRegionMapper(RegionMapper):
+    """
+    Postal codes sharing their first digits form a region, e.g. 70xxx.
+
+    Args:
+        digits: Number of leading digits that form the region. Defaults to 3.
+    """
+
+    def __init__(self, digits: int = 3) -> None:
+        if not 1 <= digits <= 5:
+            raise ValueError("digits must be between 1 and 5")
+        self.digits = digits
+
+    def region_of(self, postal_code: str) -> str:
+        return f"prefix{self.digits}:{postal_code[: self.digits]}"
+
+
+class GridRegionMapper(RegionMapper):
+    """
+    Postal codes whose centroids lie in the same grid cell form a region.
+
+    Postal codes the gazetteer does not know are regions of their own.
+
+    Args:
+        gazetteer: Index providing the centroid of each postal code.
+        cell_degrees: Edge length of a grid cell in degrees. Defaults to 0.25,
+            roughly 28 x 18 km in Germany.
+    """
+
+    def __init__(
+        self,
+        gazetteer: khc.services.gazetteer.index.GazetteerIndex,
+        cell_degrees: float = 0.25,
+    ) -> None:
+        if cell_degrees <= 0:
+            raise ValueError("cell_degrees must be positive")
+        self.gazetteer = gazetteer
+        self.cell_degrees = cell_degrees
+
+    def region_of(self, postal_code: str) -> str:
+        place = self.gazetteer.lookup(postal_code)
+        if place is None:
+            return postal_code
+        row = math.floor(place.latitude / self.cell_degrees)
+        column = math.floor(place.longitude / self.cell_degrees)
+        return f"grid{self.cell_degrees:g}:{row}:{column}"
+
+
+def create_region_mapper(
+    spec: str, gazetteer: khc.services.gazetteer.index.GazetteerIndex | None = None
+) -> RegionMapper:
+    """
+    Create a region mapper from a configuration string.
+
+    Supported are "postal_code", "prefix:<digits>" and "grid:<cell degrees>".
+
+    Args:
+        spec: The configuration string, e.g. from KHC_REGION.
+        gazetteer: Index of postal codes, required for "grid".
+
+    Returns:
+        RegionMapper: The configured mapper.
+
+    Raises:
+        ValueError: If the configuration string is invalid.
+    """
+    kind, _, argument = spec.partition(":")
+    if kind == "postal_code" and not argument:
+        return PostalCodeRegionMapper()
+    if kind == "prefix":
+        return PrefixRegionMapper(int(argument) if argument else 3)
+    if kind == "grid":
+        if gazetteer is None:
+            raise ValueError("Grid regions need a gazetteer")
+        return GridRegionMapper(gazetteer, float(argument) if argument else 0.25)
+    raise ValueError(f"Unknown region mapping: {spec}")
@@ -0,0 +1,37 @@
+import datetime
+
+import khc.services.gazetteer.index
+import khc.services.openrouter.models
+
+# Months in which the daily maximum usually reaches 20 °C all over Germany.
+SUMMER_MONTHS = frozenset({6, 7, 8})
+# Months in which it usually does only in the warmer south.
+SHOULDER_MONTHS = frozenset({5, 9})
+# Places south of this latitude count as south.
+SOUTH_LATITUDE = 50.0
+
+
+def seasonal_verdict(
+    day: datetime.date, place: khc.services.gazetteer.index.Place | None = None
+) -> khc.services.openrouter.models.ShortsVerdict:
+    """
+    Guess the verdict from the season, without any weather data.
+
+    Used as the last resort when OpenRouter is unavailable and there is no
+    cached or precomputed verdict.
+
+    Args:
+        day: The day to give the verdict for.
+        place: The place, if known. Its latitude decides the shoulder months.
+
+    Returns:
+        ShortsVerdict: The guessed verdict.
+    """
+    shorts = day.month in SUMMER_MONTHS or (
+        day.month in SHOULDER_MONTHS
+        and place is not None
+        and place.latitude < SOUTH_LATITUDE
+    )
+    return khc.services.openrouter.models.ShortsVerdict(
+        shorts=shorts, place=place.name if place else None
+    )
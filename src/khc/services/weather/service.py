@@ -1,4 +1,53 @@
+import logging
+import re
+import typing
+import khc.base.deadline
+import khc.base.rate_limiter
+import khc.base.refresher
+import khc.base.singleflight
+import khc.services.gazetteer.index
 import khc.services.openrouter.client
+import khc.services.openrouter.models
+import khc.services.weather.cache
+import khc.services.weather.region
+import khc.services.weather.rules
+import khc.services.weather.speech
+
+if typing.TYPE_CHECKING:
+    # Only created by create_skill() if KHC_ANSWER_STORE_PATH is set.
+    import khc.services.weather.answer_store
+
+logger = logging.getLogger(__name__)
+
+# Postal codes asked for in one batched completion, adapted to the answers.
+BATCH_SIZE = 50
+MAX_BATCH_SIZE = 200
+# Tokens of one batch item like {"plz":"89073","shorts":true}, and the wrapper.
+BATCH_TOKENS_PER_ITEM = 14
+BATCH_TOKENS_OVERHEAD = 10
+# Attempts of a batch request that failed outright, e.g. with a 5xx.
+BATCH_ATTEMPTS = 2
+# Time a background refresh may take from when it starts. It outlives the
+# invocation, so it must not hang on after a Lambda freeze.
+REFRESH_SECONDS = 5.0
+
+# The answer is complete after the sentence following "... kurze Hose tragen."
+COMPLETE_ANSWER_PATTERN = re.compile(r"tragen[.!]\s+[^.!?]+[.!?]")
+
+
+def trim_complete_answer(text: str) -> str | None:
+    """
+    Cut a (partial) model answer after its second sentence.
+
+    Args:
+        text: The answer text received so far.
+
+    Returns:
+        str | None: The answer up to the end of the second sentence, or None if
+            the answer is not complete yet.
+    """
+    match = COMPLETE_ANSWER_PATTERN.search(text)
+    return text[: match.end()] if match else None
 
 
 class WeatherService:
@@ -7,26 +56,457 @@ class WeatherService:
 
     Args:
         openrouter_client: Client instance to communicate with OpenRouter API.
+        answer_cache: Cache for today's free-text answers per postal code.
+            Defaults to a new AnswerCache. A TieredCache shares the answers
+            between processes.
+        stream: Whether to stream the completion and stop once the answer is
+            complete. Defaults to False.
+        structured: Whether to ask the model for a compact ShortsVerdict and
+            render the answer locally. Takes precedence over stream.
+            Defaults to False.
+        gazetteer: Index of postal codes. If it knows the place, the prompt names
+            it and structured answers are rendered with it. Defaults to None.
+        answer_store: Precomputed verdicts per region, consulted before
+            OpenRouter. Defaults to None.
+        region_mapper: Maps postal codes to the weather region whose verdict they
+            share. Defaults to one region per postal code.
+        verdict_cache: Cache for today's structured verdicts per region.
+            Defaults to a new AnswerCache.
+        refresher: Worker revalidating cache entries that need a refresh in the
+            background. Defaults to a new BackgroundRefresher.
     """
 
     def __init__(
-        self, openrouter_client: khc.services.openrouter.client.OpenRouterClient
+        self,
+        openrouter_client: khc.services.openrouter.client.OpenRouterClient,
+        answer_cache: khc.services.weather.cache.AnswerCache[str] | None = None,
+        stream: bool = False,
+        structured: bool = False,
+        gazetteer: khc.services.gazetteer.index.GazetteerIndex | None = None,
+        answer_store: "khc.services.weather.answer_store.AnswerStore | None" = None,
+        region_mapper: khc.services.weather.region.RegionMapper | None = None,
+        verdict_cache: khc.services.weather.cache.AnswerCache[
+            khc.services.openrouter.models.ShortsVerdict
+        ]
+        | None = None,
+        refresher: khc.base.refresher.BackgroundRefresher | None = None,
     ) -> None:
         self.openrouter_client = openrouter_client
+        self.answer_cache: khc.services.weather.cache.AnswerCache[str] = (
+            answer_cache
+            if answer_cache is not None
+            else khc.services.weather.cache.AnswerCache()
+        )
+        self.stream = stream
+        self.structured = structured
+        self.gazetteer = gazetteer
+        self.answer_store = answer_store
+        self.region_mapper = (
+            region_mapper or khc.services.weather.region.PostalCodeRegionMapper()
+        )
+        self.verdict_cache: khc.services.weather.cache.AnswerCache[
+            khc.services.openrouter.models.ShortsVerdict
+        ] = (
+            verdict_cache
+            if verdict_cache is not None
+            else khc.services.weather.cache.AnswerCache()
+        )
+        self.refresher = refresher or khc.base.refresher.BackgroundRefresher()
+        self.batch_size: int = BATCH_SIZE
+        self._answer_flights: khc.base.singleflight.SingleFlight[str] = (
+            khc.base.singleflight.SingleFlight()
+        )
+        self._verdict_flights: khc.base.singleflight.SingleFlight[
+            tuple[str, khc.services.openrouter.models.ShortsVerdict | None]
+        ] = khc.base.singleflight.SingleFlight()
 
-    def get_short_answer(self, postal_code: str) -> str:
+    def get_short_answer(
+        self, postal_code: str, deadline: khc.base.deadline.Deadline | None = None
+    ) -> str:
         """
         Generate a short answer about wearing shorts today for the given postal code.
 
+        Answers are cached for the current day in Europe/Berlin: free-text answers
+        per postal code, structured verdicts per region. On a cache miss, today's
+        precomputed verdict for the region is used if there is one. If the
+        model gave no usable answer, nothing is cached, but the key is marked
+        with put_negative(), so caches with a negative_ttl answer it with the
+        fallback message for a while instead of asking again. Transient
+        failures, i.e. a rejection by the circuit breaker, the deadline or an
+        HTTP error, are not marked. Concurrent misses for
+        the same postal code (or region, for structured verdicts) share one
+        OpenRouter call. Cache entries older than the refresh_after of their
+        cache are still answered from, but revalidated in the background
+        (stale-while-revalidate), within REFRESH_SECONDS and without affecting
+        the circuit breaker or the model statistics. While the circuit breaker of the client is
+        open, the answer is degraded to the latest cached one from an earlier
+        day or a seasonal guess, without waiting for OpenRouter. The same
+        applies while the circuit is half-open and another request is its probe.
+
         Args:
             postal_code (str): The postal code to query weather information for.
+            deadline (Deadline | None): Deadline of the request, passed on to the
+                OpenRouter client.
 
         Returns:
             str: A brief response indicating whether shorts are appropriate.
         """
+        place = self.gazetteer.lookup(postal_code) if self.gazetteer else None
+        region = self.region_mapper.region_of(postal_code)
+        if not self.openrouter_client.available():
+            return self._get_degraded_answer(postal_code, region, place)
+        if self.structured:
+            return self._get_structured_answer(postal_code, region, place, deadline)
+
+        cached = self.answer_cache.get(postal_code)
+        if cached is not None:
+            logger.info(f"Answer cache hit for postal code {postal_code}.")
+            if self.answer_cache.needs_refresh(postal_code):
+                self._refresh(
+                    postal_code,
+                    lambda: self._fetch_text_answer(
+                        postal_code,
+                        place,
+                        khc.base.deadline.Deadline.after(REFRESH_SECONDS),
+                        background=True,
+                    ),
+                )
+            return cached
+
+        shorts = self.answer_store.get(region) if self.answer_store else None
+        if shorts is not None:
+            logger.info(f"Answer store hit for region {region}.")
+            answer = khc.services.weather.speech.render_answer(
+                khc.services.openrouter.models.ShortsVerdict(shorts=shorts),
+                place.name if place else None,
+            )
+            self.answer_cache.put(postal_code, answer)
+            return answer
+
+        if self.answer_cache.is_negative(postal_code):
+            logger.info(f"Answer for {postal_code} failed recently, not retrying.")
+            return khc.services.openrouter.client.FALLBACK_MESSAGE
+        try:
+            answer = self._answer_flights.do(
+                postal_code,
+                lambda: self._fetch_text_answer(postal_code, place, deadline),
+                timeout=deadline.remaining() if deadline else None,
+            )
+        except khc.base.deadline.DeadlineExceeded:
+            logger.error(f"Gave up waiting for the answer for {postal_code}.")
+            return khc.services.openrouter.client.FALLBACK_MESSAGE
+        except khc.services.openrouter.client.TRANSIENT_ERRORS:
+            return self._get_unavailable_answer(postal_code, region, place)
+        return answer
+
+    def _fetch_text_answer(
+        self,
+        postal_code: str,
+        place: khc.services.gazetteer.index.Place | None,
+        deadline: khc.base.deadline.Deadline | None,
+        background: bool = False,
+    ) -> str:
+        answer = self._get_text_answer(postal_code, place, deadline, background)
+        if answer == khc.services.openrouter.client.FALLBACK_MESSAGE:
+            self.answer_cache.put_negative(postal_code)
+        elif answer not in khc.services.openrouter.client.ERROR_MESSAGES:
+            self.answer_cache.put(postal_code, answer)
+        logger.info(f"Answer cache stats: {self.answer_cache.stats.to_dict()}")
+        return answer
+
+    def _refresh(self, key: str, fn: typing.Callable[[], object]) -> None:
+        if self.refresher.submit(key, fn):
+            logger.info(f"Refreshing {key} in the background.")
+
+    def _get_unavailable_answer(
+        self,
+        postal_code: str,
+        region: str,
+        place: khc.services.gazetteer.index.Place | None,
+    ) -> str:
+        if not self.openrouter_client.available():
+            # Rejected by the circuit, e.g. while another request is its probe.
+            return self._get_degraded_answer(postal_code, region, place)
+        return khc.services.openrouter.client.FALLBACK_MESSAGE
+
+    def _get_degraded_answer(
+        self,
+        postal_code: str,
+        region: str,
+        place: khc.services.gazetteer.index.Place | None,
+    ) -> str:
+        answer = self.answer_cache.get(postal_code)
+        if answer is not None:
+            return answer
+        verdict = self.verdict_cache.get(region)
+        if verdict is None and self.answer_store:
+            shorts = self.answer_store.get(region)
+            if shorts is not None:
+                verdict = khc.services.openrouter.models.ShortsVerdict(shorts=shorts)
+        if verdict is None:
+            answer = self.answer_cache.get_stale(postal_code)
+            if answer is not None:
+                logger.warning(f"Circuit open, stale answer for {postal_code}.")
+                return answer
+            verdict = self.verdict_cache.get_stale(region)
+        if verdict is None:
+            logger.warning(f"Circuit open, seasonal verdict for {postal_code}.")
+            verdict = khc.services.weather.rules.seasonal_verdict(
+                self.verdict_cache.today(), place
+            )
+        return khc.services.weather.speech.render_answer(
+            verdict, place.name if place else None
+        )
+
+    def _get_text_answer(
+        self,
+        postal_code: str,
+        place: khc.services.gazetteer.index.Place | None,
+        deadline: khc.base.deadline.Deadline | None,
+        background: bool,
+    ) -> str:
+        location = f"der Postleitzahl {postal_code}"
+        if place is not None:
+            location += f" ({place.name}, {place.state})"
         prompt = (
-            f"Ich bin ein Alexa-Skill. Kann man heute in der Postleitzahl {postal_code} eine kurze Hose tragen? "
+            f"Ich bin ein Alexa-Skill. Kann man heute in {location} eine kurze Hose tragen? "
             "Antworte nach folgendem Schema: 'Ja/Nein, in [Ort] kann man heute (k)eine kurze Hose tragen. "
             "[Lass baumeln/Versteck die Waden.]'"
         )
-        return self.openrouter_client.chat_completion(prompt)
+        if self.stream:
+            answer = self.openrouter_client.stream_chat_completion(
+                prompt,
+                deadline=deadline,
+                stop_when=lambda text: trim_complete_answer(text) is not None,
+                raise_transient=True,
+                background=background,
+            )
+            return trim_complete_answer(answer) or answer
+        return self.openrouter_client.chat_completion(
+            prompt, deadline=deadline, raise_transient=True, background=background
+        )
+
+    def _get_structured_answer(
+        self,
+        postal_code: str,
+        region: str,
+        place: khc.services.gazetteer.index.Place | None,
+        deadline: khc.base.deadline.Deadline | None,
+    ) -> str:
+        verdict = self.verdict_cache.get(region)
+        if verdict is not None:
+            logger.info(f"Verdict cache hit for region {region}.")
+            if self.verdict_cache.needs_refresh(region):
+                self._refresh(
+                    region,
+                    lambda: self._fetch_verdict(
+                        postal_code,
+                        region,
+                        place,
+                        khc.base.deadline.Deadline.after(REFRESH_SECONDS),
+                        background=True,
+                    ),
+                )
+        elif (
+            self.answer_store and (shorts := self.answer_store.get(region)) is not None
+        ):
+            logger.info(f"Answer store hit for region {region}.")
+            verdict = khc.services.openrouter.models.ShortsVerdict(shorts=shorts)
+            self.verdict_cache.put(region, verdict)
+        elif self.verdict_cache.is_negative(region):
+            logger.info(f"Verdict for region {region} failed recently, not retrying.")
+            return khc.services.openrouter.client.FALLBACK_MESSAGE
+        else:
+            try:
+                requested_for, verdict = self._verdict_flights.do(
+                    region,
+                    lambda: self._fetch_verdict(postal_code, region, place, deadline),
+                    timeout=deadline.remaining() if deadline else None,
+                )
+            except khc.base.deadline.DeadlineExceeded:
+                logger.error(f"Gave up waiting for the verdict for {region}.")
+                return khc.services.openrouter.client.FALLBACK_MESSAGE
+            except khc.services.openrouter.client.TRANSIENT_ERRORS:
+                return self._get_unavailable_answer(postal_code, region, place)
+            if verdict is None:
+                return khc.services.openrouter.client.FALLBACK_MESSAGE
+            if requested_for != postal_code:
+                verdict = khc.services.openrouter.models.ShortsVerdict(verdict.shorts)
+        logger.info(f"Verdict cache stats: {self.verdict_cache.stats.to_dict()}")
+        return khc.services.weather.speech.render_answer(
+            verdict, place.name if place else None
+        )
+
+    def _fetch_verdict(
+        self,
+        postal_code: str,
+        region: str,
+        place: khc.services.gazetteer.index.Place | None,
+        deadline: khc.base.deadline.Deadline | None,
+        background: bool = False,
+    ) -> tuple[str, khc.services.openrouter.models.ShortsVerdict | None]:
+        verdict = self._request_verdict(
+            postal_code, place, deadline, raise_transient=True, background=background
+        )
+        if verdict is None:
+            self.verdict_cache.put_negative(region)
+        else:
+            # The place named by the model only belongs to this postal code.
+            self.verdict_cache.put(
+                region,
+                verdict
+                if region == postal_code
+                else khc.services.openrouter.models.ShortsVerdict(verdict.shorts),
+            )
+        return postal_code, verdict
+
+    def get_verdict(
+        self, postal_code: str, deadline: khc.base.deadline.Deadline | None = None
+    ) -> khc.services.openrouter.models.ShortsVerdict | None:
+        """
+        Ask the model for today's structured verdict for a postal code.
+
+        The answer cache and the answer store are not consulted, this is what the
+        precompute uses to fill the store.
+
+        Args:
+            postal_code (str): The postal code to query weather information for.
+            deadline (Deadline | None): Deadline of the request, passed on to the
+                OpenRouter client.
+
+        Returns:
+            ShortsVerdict | None: The verdict, or None if it could not be obtained.
+        """
+        place = self.gazetteer.lookup(postal_code) if self.gazetteer else None
+        return self._request_verdict(postal_code, place, deadline)
+
+    def get_verdicts(
+        self,
+        postal_codes: typing.Iterable[str],
+        deadline: khc.base.deadline.Deadline | None = None,
+        rate_limiter: khc.base.rate_limiter.RateLimiter | None = None,
+    ) -> dict[str, khc.services.openrouter.models.ShortsVerdict]:
+        """
+        Ask the model for today's verdicts for many postal codes, several per
+        completion.
+
+        The postal codes are sent in chunks of batch_size. When the model leaves
+        out items of a chunk, e.g. because the answer was cut off, the missing
+        postal codes are retried in chunks of half the size. A request that
+        fails outright, e.g. with a 5xx or a timeout, is retried once with the
+        same chunk and then given up on, without shrinking the chunks. Complete chunks let
+        the size grow again, up to MAX_BATCH_SIZE. The adapted size only applies
+        to this call, so concurrent calls, e.g. of precompute workers, chunk
+        independently. Like get_verdict(), the caches and the answer store are
+        not consulted.
+
+        Args:
+            postal_codes (Iterable[str]): The postal codes to query.
+            deadline (Deadline | None): Deadline for all requests, passed on to
+                the OpenRouter client.
+            rate_limiter (RateLimiter | None): Limit acquired before every
+                completion request, including retries and split chunks.
+
+        Returns:
+            dict[str, ShortsVerdict]: The verdicts per postal code. Postal codes
+                the model did not answer for, even on their own, are left out.
+        """
+        pending = list(dict.fromkeys(postal_codes))
+        verdicts: dict[str, khc.services.openrouter.models.ShortsVerdict] = {}
+        size = self.batch_size
+        while pending:
+            chunk, pending = pending[:size], pending[size:]
+            answered = self._request_verdicts(chunk, deadline, rate_limiter)
+            for _ in range(BATCH_ATTEMPTS - 1):
+                if answered is not None:
+                    break
+                logger.warning(f"Batch of {len(chunk)} verdicts failed, retrying.")
+                answered = self._request_verdicts(chunk, deadline, rate_limiter)
+            if answered is None:
+                logger.error(f"Giving up on a batch of {len(chunk)} verdicts.")
+                continue
+            missing = [code for code in chunk if code not in answered]
+            verdicts.update(answered)
+            if not missing:
+                size = min(size * 2, MAX_BATCH_SIZE)
+            elif len(chunk) > 1:
+                size = max(len(chunk) // 2, 1)
+                logger.warning(
+                    f"{len(missing)} of {len(chunk)} verdicts missing, retrying "
+                    f"in chunks of {size}."
+                )
+                pending = missing + pending
+            else:
+                logger.error(f"No verdict for postal code {chunk[0]}.")
+        return verdicts
+
+    def _request_verdicts(
+        self,
+        postal_codes: list[str],
+        deadline: khc.base.deadline.Deadline | None,
+        rate_limiter: khc.base.rate_limiter.RateLimiter | None = None,
+    ) -> dict[str, khc.services.openrouter.models.ShortsVerdict] | None:
+        lines = []
+        for postal_code in postal_codes:
+            place = self.gazetteer.lookup(postal_code) if self.gazetteer else None
+            lines.append(
+                f"{postal_code} ({place.name}, {place.state})" if place else postal_code
+            )
+        prompt = (
+            "Kann man heute an diesen Postleitzahlen eine kurze Hose tragen? "
+            'Antworte nur mit JSON: {"verdicts": [{"plz": "<PLZ>", "shorts": '
+            "true/false}, ...]} mit einem Eintrag je Postleitzahl.\n" + "\n".join(lines)
+        )
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        answered = self.openrouter_client.batch_verdict_completion(
+            prompt,
+            max_tokens=BATCH_TOKENS_OVERHEAD
+            + BATCH_TOKENS_PER_ITEM * len(postal_codes),
+            deadline=deadline,
+        )
+        if answered is None:
+            return None
+        requested = set(postal_codes)
+        return {
+            code: verdict for code, verdict in answered.items() if code in requested
+        }
+
+    def _request_verdict(
+        self,
+        postal_code: str,
+        place: khc.services.gazetteer.index.Place | None,
+        deadline: khc.base.deadline.Deadline | None,
+        raise_transient: bool = False,
+        background: bool = False,
+    ) -> khc.services.openrouter.models.ShortsVerdict | None:
+        if place is not None:
+            prompt = (
+                f"Kann man heute in {place.name} ({place.state}, "
+                f"{place.latitude:.2f}° N, {place.longitude:.2f}° O) eine kurze Hose "
+                'tragen? Antworte nur mit JSON: {"shorts": true/false}'
+            )
+            verdict = self.openrouter_client.verdict_completion(
+                prompt,
+                max_tokens=15,
+                deadline=deadline,
+                include_place=False,
+                raise_transient=raise_transient,
+                background=background,
+            )
+            if verdict is None:
+                return None
+            return khc.services.openrouter.models.ShortsVerdict(
+                shorts=verdict.shorts, place=place.name
+            )
+
+        prompt = (
+            f"Kann man heute in der Postleitzahl {postal_code} eine kurze Hose tragen? "
+            'Antworte nur mit JSON: {"shorts": true/false, "place": "<Ort>"}'
+        )
+        return self.openrouter_client.verdict_completion(
+            prompt,
+            deadline=deadline,
+            raise_transient=raise_transient,
+            background=background,
+        )
@@ -0,0 +1,520 @@
+import abc
+import datetime
+import io
+import json
+import logging
+import socket
+import threading
+import time
+import typing
+import urllib.parse
+
+import khc.services.openrouter.models
+import khc.services.weather.cache
+
+logger = logging.getLogger(__name__)
+
+# Stored in the shared cache by earlier versions for keys for which no answer
+# could be obtained. Failures are no longer shared, such entries are skipped.
+NEGATIVE = ""
+
+# Item limits of the DynamoDB batch operations.
+DYNAMODB_GET_BATCH = 100
+DYNAMODB_WRITE_BATCH = 25
+DYNAMODB_ATTEMPTS = 3
+
+V = typing.TypeVar("V")
+
+
+class CacheBackend(abc.ABC):
+    """
+    Shared key-value store behind a TieredCache, e.g. Redis or DynamoDB.
+
+    Values are strings and expire after the TTL given when they were written.
+    """
+
+    @abc.abstractmethod
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        """
+        Look up several keys in one round trip.
+
+        Args:
+            keys: The keys to look up.
+
+        Returns:
+            dict[str, str]: The values per key. Missing or expired keys are left
+                out.
+        """
+
+    @abc.abstractmethod
+    def set_many(self, values: typing.Mapping[str, str], ttl_seconds: float) -> None:
+        """
+        Store several values in one round trip.
+
+        Args:
+            values: The values per key.
+            ttl_seconds: Time after which the values expire.
+        """
+
+
+class InMemoryBackend(CacheBackend):
+    """
+    Backend keeping the values in a dictionary of the process, for tests and
+    local development.
+
+    Args:
+        clock: Wall clock in seconds. Defaults to time.time.
+    """
+
+    def __init__(self, clock: typing.Callable[[], float] = time.time) -> None:
+        self.clock = clock
+        self._values: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        now = self.clock()
+        with self._lock:
+            found = {key: self._values.get(key) for key in keys}
+        return {
+            key: entry[0]
+            for key, entry in found.items()
+            if entry is not None and entry[1] > now
+        }
+
+    def set_many(self, values: typing.Mapping[str, str], ttl_seconds: float) -> None:
+        expires_at = self.clock() + ttl_seconds
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = (value, expires_at)
+
+
+class RedisError(Exception):
+    """Raised when Redis answers a command with an error."""
+
+
+def encode_command(*args: str) -> bytes:
+    """
+    Encode a command in the Redis serialization protocol (RESP).
+
+    Args:
+        args: The command and its arguments.
+
+    Returns:
+        bytes: The command as an array of bulk strings.
+    """
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg.encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Backend for Redis or a compatible server such as Valkey or ElastiCache.
+
+    Speaks the Redis protocol over one lazily opened connection, so no client
+    library is needed. Lookups use MGET, writes are pipelined SET commands.
+    After a failure the connection is closed and reopened on the next call.
+
+    Args:
+        host: Host name of the server.
+        port: Port of the server. Defaults to 6379.
+        db: Number of the database to select. Defaults to 0.
+        timeout: Timeout of connecting and of every read in seconds. Keep it
+            short, a slow shared cache must not delay the answer.
+            Defaults to 0.2.
+    """
+
+    def __init__(
+        self, host: str, port: int = 6379, db: int = 0, timeout: float = 0.2
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.db = db
+        self.timeout = timeout
+        self._socket: socket.socket | None = None
+        self._reader: io.BufferedReader | None = None
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        if not keys:
+            return {}
+        (reply,) = self._execute([("MGET", *keys)])
+        if not isinstance(reply, list):
+            raise RedisError(f"Unexpected reply to MGET: {reply!r}")
+        return {
+            key: value.decode("utf-8")
+            for key, value in zip(keys, reply)
+            if isinstance(value, bytes)
+        }
+
+    def set_many(self, values: typing.Mapping[str, str], ttl_seconds: float) -> None:
+        ttl = str(max(int(ttl_seconds), 1))
+        self._execute([("SET", key, value, "EX", ttl) for key, value in values.items()])
+
+    def close(self) -> None:
+        """Close the connection. It is reopened on the next call."""
+        with self._lock:
+            self._close()
+
+    def _execute(self, commands: list[tuple[str, ...]]) -> list[object]:
+        if not commands:
+            return []
+        with self._lock:
+            try:
+                reader = self._connect()
+                assert self._socket is not None
+                self._socket.sendall(
+                    b"".join(encode_command(*command) for command in commands)
+                )
+                replies = [self._read_reply(reader) for _ in commands]
+            except (OSError, ValueError):
+                self._close()
+                raise
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def _connect(self) -> io.BufferedReader:
+        if self._reader is not None:
+            return self._reader
+        self._socket = socket.create_connection((self.host, self.port), self.timeout)
+        self._reader = self._socket.makefile("rb")
+        if self.db:
+            self._socket.sendall(encode_command("SELECT", str(self.db)))
+            reply = self._read_reply(self._reader)
+            if isinstance(reply, RedisError):
+                raise ValueError(f"Could not select database {self.db}: {reply}")
+        return self._reader
+
+    def _close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+        self._socket = None
+        self._reader = None
+
+    def _read_reply(self, reader: io.BufferedReader) -> object:
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by Redis")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            return RedisError(payload.decode("utf-8"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by Redis")
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply(reader) for _ in range(length)]
+        raise ValueError(f"Invalid reply from Redis: {line!r}")
+
+
+class DynamoDBClient(typing.Protocol):
+    """The part of the boto3 DynamoDB client used by DynamoDBBackend."""
+
+    def batch_get_item(self, **kwargs: typing.Any) -> dict[str, typing.Any]: ...
+
+    def batch_write_item(self, **kwargs: typing.Any) -> dict[str, typing.Any]: ...
+
+
+class DynamoDBBackend(CacheBackend):
+    """
+    Backend for a DynamoDB table.
+
+    The table needs the string partition key "key". Values are stored in the
+    attribute "value" and the expiry time in "expires_at", which should be
+    configured as the TTL attribute of the table. Since DynamoDB deletes
+    expired items only eventually, they are also filtered out on lookup.
+
+    Args:
+        table_name: Name of the table.
+        client: DynamoDB client. Defaults to a new boto3 client, boto3 is
+            only imported then and is part of the Lambda runtime.
+        clock: Wall clock in seconds. Defaults to time.time.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        client: DynamoDBClient | None = None,
+        clock: typing.Callable[[], float] = time.time,
+    ) -> None:
+        if client is None:
+            import boto3  # type: ignore[import-not-found]
+
+            client = typing.cast(DynamoDBClient, boto3.client("dynamodb"))
+        self.table_name = table_name
+        self.client = client
+        self.clock = clock
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        now = self.clock()
+        values: dict[str, str] = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), DYNAMODB_GET_BATCH):
+            request: dict[str, typing.Any] = {
+                self.table_name: {
+                    "Keys": [
+                        {"key": {"S": key}}
+                        for key in unique[start : start + DYNAMODB_GET_BATCH]
+                    ],
+                    "ConsistentRead": False,
+                }
+            }
+            for _ in range(DYNAMODB_ATTEMPTS):
+                response = self.client.batch_get_item(RequestItems=request)
+                for item in response.get("Responses", {}).get(self.table_name, []):
+                    if float(item["expires_at"]["N"]) > now:
+                        values[item["key"]["S"]] = item["value"]["S"]
+                request = response.get("UnprocessedKeys") or {}
+                if not request:
+                    break
+            else:
+                logger.warning("DynamoDB left keys unprocessed, treating as misses.")
+        return values
+
+    def set_many(self, values: typing.Mapping[str, str], ttl_seconds: float) -> None:
+        expires_at = str(int(self.clock() + ttl_seconds))
+        items = list(values.items())
+        for start in range(0, len(items), DYNAMODB_WRITE_BATCH):
+            request: dict[str, typing.Any] = {
+                self.table_name: [
+                    {
+                        "PutRequest": {
+                            "Item": {
+                                "key": {"S": key},
+                                "value": {"S": value},
+                                "expires_at": {"N": expires_at},
+                            }
+                        }
+                    }
+                    for key, value in items[start : start + DYNAMODB_WRITE_BATCH]
+                ]
+            }
+            for _ in range(DYNAMODB_ATTEMPTS):
+                response = self.client.batch_write_item(RequestItems=request)
+                request = response.get("UnprocessedItems") or {}
+                if not request:
+                    break
+            else:
+                logger.warning("DynamoDB left items unwritten.")
+
+
+def create_backend(url: str) -> CacheBackend:
+    """
+    Create a cache backend from a URL.
+
+    Args:
+        url: "redis://host[:port][/db]", "dynamodb://table" or "memory://".
+
+    Returns:
+        CacheBackend: The backend.
+
+    Raises:
+        ValueError: If the scheme is not supported.
+    """
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme == "redis" and parsed.hostname:
+        return RedisBackend(
+            parsed.hostname,
+            port=parsed.port or 6379,
+            db=int(parsed.path.strip("/") or 0),
+        )
+    if parsed.scheme == "dynamodb" and parsed.netloc:
+        return DynamoDBBackend(parsed.netloc)
+    if parsed.scheme == "memory":
+        return InMemoryBackend()
+    raise ValueError(f"Unknown shared cache: {url}")
+
+
+def encode_verdict(verdict: khc.services.openrouter.models.ShortsVerdict) -> str:
+    """
+    Encode a verdict for a TieredCache.
+
+    Args:
+        verdict: The verdict.
+
+    Returns:
+        str: The verdict as compact JSON.
+    """
+    return json.dumps(verdict.to_dict(), separators=(",", ":"))
+
+
+def decode_verdict(data: str) -> khc.services.openrouter.models.ShortsVerdict:
+    """
+    Decode a verdict stored by encode_verdict().
+
+    Args:
+        data: The stored JSON.
+
+    Returns:
+        ShortsVerdict: The verdict.
+
+    Raises:
+        ValueError: If the data is not a valid verdict.
+    """
+    parsed = json.loads(data)
+    if not isinstance(parsed, dict):
+        raise ValueError("Verdict is not a JSON object")
+    return khc.services.openrouter.models.ShortsVerdict.from_json(parsed)
+
+
+class TieredCache(khc.services.weather.cache.AnswerCache[V]):
+    """
+    AnswerCache backed by a cache shared between processes.
+
+    The in-process cache (L1) is looked up first. On a miss, the shared
+    backend (L2) is asked and its answer is kept in L1. Answers are written
+    through to L2 and expire there at midnight in Europe/Berlin, like in L1,
+    so a new Lambda container starts with the answers other containers have
+    already obtained. Keys marked by put_negative() stay in L1, so one
+    process's failures do not keep the others from asking.
+    Failures of the backend are logged and treated as misses.
+
+    Args:
+        backend: The shared backend.
+        namespace: Prefix of the keys in the backend, e.g. "verdict". Caches
+            holding different kinds of values must use different namespaces.
+        encode: Converts a value to the string stored in the backend.
+            Defaults to str, for text answers.
+        decode: Converts a stored string back to a value, raising ValueError
+            for invalid data. Defaults to returning the string.
+        **kwargs: Passed on to AnswerCache.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        namespace: str,
+        encode: typing.Callable[[V], str] = str,
+        decode: typing.Callable[[str], V] = lambda data: typing.cast(V, data),
+        **kwargs: typing.Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.backend = backend
+        self.namespace = namespace
+        self.encode = encode
+        self.decode = decode
+
+    def get(self, key: str) -> V | None:
+        value = super().get(key)
+        if value is not None or super().is_negative(key):
+            return value
+        return self._load([key]).get(key)
+
+    def get_many(self, keys: typing.Iterable[str]) -> dict[str, V]:
+        answers: dict[str, V] = {}
+        missing: list[str] = []
+        for key in keys:
+            value = super().get(key)
+            if value is not None:
+                answers[key] = value
+            elif not super().is_negative(key):
+                missing.append(key)
+        answers.update(self._load(missing))
+        return answers
+
+    def put(self, key: str, value: V) -> None:
+        super().put(key, value)
+        self._store({key: self.encode(value)}, self._seconds_until_midnight())
+
+    def put_many(self, values: typing.Mapping[str, V]) -> None:
+        for key, value in values.items():
+            super().put(key, value)
+        self._store(
+            {key: self.encode(value) for key, value in values.items()},
+            self._seconds_until_midnight(),
+        )
+
+    def _load(self, keys: list[str]) -> dict[str, V]:
+        if not keys:
+            return {}
+        today = self.today()
+        try:
+            stored = self.backend.get_many([self._shared_key(today, k) for k in keys])
+        except Exception as e:
+            logger.error(f"Shared cache lookup failed: {e}")
+            return {}
+        answers: dict[str, V] = {}
+        for key in keys:
+            data = stored.get(self._shared_key(today, key))
+            if data is None:
+                continue
+            if data == NEGATIVE:
+                # Marker of a failure shared by earlier versions.
+                continue
+            try:
+                value = self.decode(data)
+            except ValueError as e:
+                logger.error(f"Invalid shared cache entry for {key}: {e}")
+                continue
+            super().put(key, value)
+            answers[key] = value
+        with self._lock:
+            self.stats.shared_hits += len(answers)
+        return answers
+
+    def _store(self, values: dict[str, str], ttl_seconds: float) -> None:
+        if not values:
+            return
+        today = self.today()
+        try:
+            self.backend.set_many(
+                {self._shared_key(today, key): data for key, data in values.items()},
+                ttl_seconds,
+            )
+        except Exception as e:
+            logger.error(f"Shared cache write failed: {e}")
+
+    def _shared_key(self, day: datetime.date, key: str) -> str:
+        return f"{self.namespace}:{day.isoformat()}:{key}"
+
+    def _seconds_until_midnight(self) -> float:
+        now = self.clock().astimezone(khc.services.weather.cache.BERLIN)
+        midnight = datetime.datetime.combine(
+            now.date() + datetime.timedelta(days=1),
+            datetime.time(),
+            tzinfo=khc.services.weather.cache.BERLIN,
+        )
+        # Subtract in UTC, so days with a DST change are not off by an hour.
+        return max(
+            (
+                midnight.astimezone(datetime.timezone.utc)
+                - now.astimezone(datetime.timezone.utc)
+            ).total_seconds(),
+            1.0,
+        )
+
+
+def create_verdict_cache(
+    backend: CacheBackend, region: str, **kwargs: typing.Any
+) -> TieredCache[khc.services.openrouter.models.ShortsVerdict]:
+    """
+    Create the shared cache of verdicts per region.
+
+    Args:
+        backend: The shared backend.
+        region: The region mapping spec, e.g. "prefix:3". It is part of the
+            namespace, since region keys of different mappings differ in
+            meaning.
+        **kwargs: Passed on to AnswerCache.
+
+    Returns:
+        TieredCache[ShortsVerdict]: The verdict cache.
+    """
+    return TieredCache(
+        backend, f"verdict:{region}", encode_verdict, decode_verdict, **kwargs
+    )
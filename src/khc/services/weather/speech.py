@@ -0,0 +1,24 @@
+import khc.services.openrouter.models
+
+YES_TEMPLATE = "Ja, in {place} kann man heute eine kurze Hose tragen. Lass baumeln."
+NO_TEMPLATE = (
+    "Nein, in {place} kann man heute keine kurze Hose tragen. Versteck die Waden."
+)
+UNKNOWN_PLACE = "deiner Gegend"
+
+
+def render_answer(
+    verdict: khc.services.openrouter.models.ShortsVerdict, place: str | None = None
+) -> str:
+    """
+    Render the spoken answer for a verdict.
+
+    Args:
+        verdict: The structured verdict of the model.
+        place: Name of the place to mention. Defaults to the place of the verdict.
+
+    Returns:
+        str: The answer in the 'Ja/Nein, in [Ort] ...' format.
+    """
+    template = YES_TEMPLATE if verdict.shorts else NO_TEMPLATE
+    return template.format(place=place or verdict.place or UNKNOWN_PLACE)
@@ -0,0 +1,138 @@
+import khc.base.circuit_breaker
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_breaker(clock):
+    return khc.base.circuit_breaker.CircuitBreaker(
+        failure_ratio=0.5, slow_seconds=1.0, window=4, min_calls=4, clock=clock
+    )
+
+
+class TestCircuitBreaker:
+    def test_stays_closed_while_healthy(self):
+        breaker = make_breaker(FakeClock())
+        for _ in range(3):
+            breaker.record_success(0.2)
+        breaker.record_failure()
+
+        assert breaker.state == khc.base.circuit_breaker.CLOSED
+        assert breaker.allow()
+
+    def test_opens_on_failures_and_slow_calls(self):
+        breaker = make_breaker(FakeClock())
+        breaker.record_success(0.2)
+        breaker.record_success(0.2)
+        breaker.record_failure()
+        breaker.record_success(2.0)
+
+        assert breaker.state == khc.base.circuit_breaker.OPEN
+        assert not breaker.allow()
+
+    def test_slow_threshold_per_call(self):
+        breaker = make_breaker(FakeClock())
+        for _ in range(4):
+            breaker.record_success(20.0, slow_seconds=30.0)
+
+        assert breaker.state == khc.base.circuit_breaker.CLOSED
+
+    def test_half_open_allows_one_probe(self):
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+
+        clock.now = 30.0
+        assert breaker.state == khc.base.circuit_breaker.HALF_OPEN
+        probe = breaker.allow()
+        assert probe is not None and probe.probe
+        assert not breaker.allow()
+
+        breaker.record_success(0.2, permit=probe)
+        assert breaker.state == khc.base.circuit_breaker.CLOSED
+        assert breaker.allow()
+
+    def test_failed_probe_opens_again(self):
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+
+        clock.now = 30.0
+        probe = breaker.allow()
+        breaker.record_failure(probe)
+
+        assert breaker.state == khc.base.circuit_breaker.OPEN
+        clock.now = 59.0
+        assert not breaker.allow()
+
+    def test_straggler_does_not_resolve_probe(self):
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        straggler = breaker.allow()
+        for _ in range(4):
+            breaker.record_failure(breaker.allow())
+
+        clock.now = 30.0
+        probe = breaker.allow()
+        breaker.record_success(0.2, permit=straggler)
+        assert breaker.state == khc.base.circuit_breaker.HALF_OPEN
+        assert not breaker.allow()
+
+        breaker.record_failure(straggler)
+        assert breaker.state == khc.base.circuit_breaker.HALF_OPEN
+
+        breaker.record_success(0.2, permit=probe)
+        assert breaker.state == khc.base.circuit_breaker.CLOSED
+
+    def test_ignores_calls_admitted_before_opening(self):
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        stragglers = [breaker.allow() for _ in range(4)]
+        for _ in range(4):
+            breaker.record_failure(breaker.allow())
+        clock.now = 30.0
+        breaker.record_success(0.2, permit=breaker.allow())
+
+        for straggler in stragglers:
+            breaker.record_failure(straggler)
+
+        assert breaker.state == khc.base.circuit_breaker.CLOSED
+
+    def test_admits_without_taking_the_probe(self):
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        assert breaker.admits()
+        for _ in range(4):
+            breaker.record_failure(breaker.allow())
+        assert not breaker.admits()
+
+        clock.now = 30.0
+        assert breaker.admits()
+        assert breaker.admits()
+        probe = breaker.allow()
+        assert not breaker.admits()
+
+        breaker.record_success(0.2, permit=probe)
+        assert breaker.admits()
+
+    def test_released_probe_lets_next_call_probe(self):
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        for _ in range(4):
+            breaker.record_failure(breaker.allow())
+
+        clock.now = 30.0
+        probe = breaker.allow()
+        assert probe is not None
+        breaker.release(probe)
+
+        assert breaker.state == khc.base.circuit_breaker.HALF_OPEN
+        next_probe = breaker.allow()
+        assert next_probe is not None and next_probe.probe
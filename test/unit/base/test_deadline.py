@@ -0,0 +1,77 @@
+import unittest.mock
+import pytest
+import khc.base.deadline
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestDeadline:
+    def test_remaining_counts_down(self):
+        clock = FakeClock()
+        deadline = khc.base.deadline.Deadline.after(2.0, clock=clock)
+        assert deadline.remaining() == 2.0
+        clock.now += 1.5
+        assert deadline.remaining() == 0.5
+        clock.now += 1.0
+        assert deadline.remaining() == 0.0
+        assert deadline.expired()
+
+    def test_timeout_is_capped(self):
+        clock = FakeClock()
+        deadline = khc.base.deadline.Deadline.after(2.0, clock=clock)
+        assert deadline.timeout(5.0) == 2.0
+        assert deadline.timeout(1.0) == 1.0
+
+    def test_timeout_raises_when_expired(self):
+        clock = FakeClock()
+        deadline = khc.base.deadline.Deadline.after(0.01, clock=clock)
+        with pytest.raises(khc.base.deadline.DeadlineExceeded):
+            deadline.timeout(1.0)
+
+    def test_from_lambda_context_uses_remaining_time(self):
+        context = unittest.mock.Mock()
+        context.get_remaining_time_in_millis.return_value = 3000
+        deadline = khc.base.deadline.Deadline.from_lambda_context(
+            context, budget=7.5, reserve=0.5
+        )
+        assert 2.4 < deadline.remaining() <= 2.5
+
+    def test_from_lambda_context_is_capped_by_budget(self):
+        context = unittest.mock.Mock()
+        context.get_remaining_time_in_millis.return_value = 60000
+        deadline = khc.base.deadline.Deadline.from_lambda_context(
+            context, budget=7.5, reserve=0.5
+        )
+        assert 6.9 < deadline.remaining() <= 7.0
+
+    def test_from_lambda_context_without_context(self):
+        deadline = khc.base.deadline.Deadline.from_lambda_context(
+            None, budget=2.0, reserve=0.0
+        )
+        assert 1.9 < deadline.remaining() <= 2.0
+
+    def test_from_lambda_context_counts_budget_from_start(self):
+        clock = FakeClock()
+        context = unittest.mock.Mock()
+        context.get_remaining_time_in_millis.return_value = 60000
+        deadline = khc.base.deadline.Deadline.from_lambda_context(
+            context, budget=7.5, reserve=0.5, started=clock.now - 2.0, clock=clock
+        )
+        assert deadline.remaining() == 5.0
+
+    def test_from_lambda_context_uses_invocation_start(self):
+        clock = FakeClock()
+        token = khc.base.deadline.INVOCATION_STARTED.set(clock.now - 8.0)
+        try:
+            deadline = khc.base.deadline.Deadline.from_lambda_context(
+                None, budget=7.5, reserve=0.5, clock=clock
+            )
+        finally:
+            khc.base.deadline.INVOCATION_STARTED.reset(token)
+        assert deadline.expired()
@@ -0,0 +1,28 @@
+import khc.base.latency
+
+
+class TestLatencyTracker:
+    def test_no_percentile_before_min_samples(self):
+        tracker = khc.base.latency.LatencyTracker(min_samples=3)
+        tracker.record(0.1)
+        tracker.record(0.2)
+
+        assert tracker.percentile(0.5) is None
+
+    def test_percentile_nearest_rank(self):
+        tracker = khc.base.latency.LatencyTracker(min_samples=1)
+        for sample in range(1, 101):
+            tracker.record(sample / 100)
+
+        assert tracker.percentile(0.5) == 0.5
+        assert tracker.percentile(0.95) == 0.95
+        assert tracker.percentile(1.0) == 1.0
+        assert tracker.percentile(0.0) == 0.01
+
+    def test_window_drops_old_samples(self):
+        tracker = khc.base.latency.LatencyTracker(window=2, min_samples=1)
+        for sample in (5.0, 0.1, 0.2):
+            tracker.record(sample)
+
+        assert len(tracker) == 2
+        assert tracker.percentile(1.0) == 0.2
@@ -0,0 +1,32 @@
+import io
+import json
+import khc.base.metrics
+
+
+def test_emit_metrics_writes_embedded_metric_format():
+    stream = io.StringIO()
+
+    khc.base.metrics.emit_metrics(
+        {"Latency": (120.0, "Milliseconds"), "Error": (0.0, "Count")},
+        {"Model": "gpt-4o-mini"},
+        stream=stream,
+        clock=lambda: 1751328000.5,
+    )
+
+    record = json.loads(stream.getvalue())
+    assert record["_aws"] == {
+        "Timestamp": 1751328000500,
+        "CloudWatchMetrics": [
+            {
+                "Namespace": "KurzeHoseChecker",
+                "Dimensions": [["Model"]],
+                "Metrics": [
+                    {"Name": "Latency", "Unit": "Milliseconds"},
+                    {"Name": "Error", "Unit": "Count"},
+                ],
+            }
+        ],
+    }
+    assert record["Model"] == "gpt-4o-mini"
+    assert record["Latency"] == 120.0
+    assert record["Error"] == 0.0
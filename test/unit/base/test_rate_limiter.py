@@ -0,0 +1,44 @@
+import khc.base.rate_limiter
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class TestRateLimiter:
+    def test_burst_then_limited(self):
+        clock = FakeClock()
+        limiter = khc.base.rate_limiter.RateLimiter(
+            rate=2.0, burst=2, clock=clock, sleep=clock.sleep
+        )
+        assert limiter.try_acquire()
+        assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+
+        clock.now += 0.5
+        assert limiter.try_acquire()
+
+    def test_acquire_waits_for_token(self):
+        clock = FakeClock()
+        limiter = khc.base.rate_limiter.RateLimiter(
+            rate=4.0, clock=clock, sleep=clock.sleep
+        )
+        for _ in range(5):
+            limiter.acquire()
+        assert clock.now == 1.0
+
+    def test_tokens_do_not_exceed_burst(self):
+        clock = FakeClock()
+        limiter = khc.base.rate_limiter.RateLimiter(
+            rate=1.0, burst=1, clock=clock, sleep=clock.sleep
+        )
+        clock.now += 100
+        assert limiter.try_acquire()
+        assert not limiter.try_acquire()
@@ -0,0 +1,65 @@
+import threading
+import khc.base.refresher
+
+
+class TestBackgroundRefresher:
+    def test_runs_job_in_background(self):
+        refresher = khc.base.refresher.BackgroundRefresher()
+        done = []
+
+        assert refresher.submit("89073", lambda: done.append("89073"))
+        assert refresher.join(5)
+        assert done == ["89073"]
+        assert refresher.pending() == 0
+
+    def test_deduplicates_and_bounds_jobs(self):
+        refresher = khc.base.refresher.BackgroundRefresher(max_pending=1)
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking():
+            started.set()
+            release.wait(5)
+
+        try:
+            assert refresher.submit("89073", blocking)
+            started.wait(5)
+            assert not refresher.submit("89073", lambda: None)
+            assert refresher.submit("24103", lambda: None)
+            assert not refresher.submit("01067", lambda: None)
+        finally:
+            release.set()
+        assert refresher.join(5)
+
+    def test_drops_outdated_jobs(self):
+        now = [1000.0]
+        refresher = khc.base.refresher.BackgroundRefresher(
+            max_age_seconds=10.0, clock=lambda: now[0]
+        )
+        release = threading.Event()
+        started = threading.Event()
+        done = []
+
+        def blocking():
+            started.set()
+            release.wait(5)
+
+        refresher.submit("89073", blocking)
+        started.wait(5)
+        refresher.submit("24103", lambda: done.append("24103"))
+        # The container was frozen for a minute.
+        now[0] += 60.0
+        release.set()
+
+        assert refresher.join(5)
+        assert done == []
+
+    def test_failing_job_does_not_stop_worker(self):
+        refresher = khc.base.refresher.BackgroundRefresher()
+        done = []
+
+        refresher.submit("89073", lambda: 1 / 0)
+        refresher.submit("24103", lambda: done.append("24103"))
+
+        assert refresher.join(5)
+        assert done == ["24103"]
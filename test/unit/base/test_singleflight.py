@@ -0,0 +1,82 @@
+import threading
+import time
+import pytest
+import khc.base.deadline
+import khc.base.singleflight
+
+
+def run_in_thread(fn):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(fn()))
+    thread.start()
+    return thread, results
+
+
+class TestSingleFlight:
+    def test_runs_function(self):
+        flights = khc.base.singleflight.SingleFlight()
+
+        assert flights.do("89073", lambda: "Ja.") == "Ja."
+        assert flights.in_flight() == 0
+
+    def test_concurrent_callers_share_one_call(self):
+        flights = khc.base.singleflight.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def leader_fn():
+            calls.append("leader")
+            started.set()
+            release.wait(5)
+            return "Ja."
+
+        leader, leader_results = run_in_thread(lambda: flights.do("89073", leader_fn))
+        started.wait(5)
+        follower, follower_results = run_in_thread(
+            lambda: flights.do("89073", lambda: calls.append("follower") or "Nein.")
+        )
+        time.sleep(0.05)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        assert calls == ["leader"]
+        assert leader_results == follower_results == ["Ja."]
+        assert flights.in_flight() == 0
+
+    def test_different_keys_run_separately(self):
+        flights = khc.base.singleflight.SingleFlight()
+
+        assert flights.do("89073", lambda: flights.do("24103", lambda: "Ja.")) == "Ja."
+
+    def test_exception_is_shared_and_not_kept(self):
+        flights: khc.base.singleflight.SingleFlight[str] = (
+            khc.base.singleflight.SingleFlight()
+        )
+
+        def fail() -> str:
+            raise PermissionError("Missing permissions.")
+
+        with pytest.raises(PermissionError):
+            flights.do("device123", fail)
+        assert flights.do("device123", lambda: "12345") == "12345"
+
+    def test_waiter_times_out(self):
+        flights = khc.base.singleflight.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return "Ja."
+
+        leader, _ = run_in_thread(lambda: flights.do("89073", slow))
+        started.wait(5)
+        try:
+            with pytest.raises(khc.base.deadline.DeadlineExceeded):
+                flights.do("89073", lambda: "Nein.", timeout=0.01)
+        finally:
+            release.set()
+            leader.join(5)
@@ -1,5 +1,7 @@
+import threading
 import pytest
 import unittest.mock
+import khc.base.deadline
 import khc.handler.launch_request_handler
 
 
@@ -20,6 +22,7 @@ class TestLaunchRequestHandler:
     def handler_input_mock(self):
         mock = unittest.mock.Mock()
         mock.request_envelope.request.object_type = "LaunchRequest"
+        mock.context = None
         mock.response_builder.speak.return_value = mock.response_builder
         mock.response_builder.set_should_end_session.return_value = (
             mock.response_builder
@@ -44,8 +47,12 @@ class TestLaunchRequestHandler:
 
         response = handler.handle(handler_input_mock)
 
-        postal_provider_mock.get_postal_code.assert_called_once_with(handler_input_mock)
-        weather_service_mock.get_short_answer.assert_called_once_with("12345")
+        postal_provider_mock.get_postal_code.assert_called_once_with(
+            handler_input_mock, deadline=unittest.mock.ANY
+        )
+        weather_service_mock.get_short_answer.assert_called_once_with(
+            "12345", deadline=unittest.mock.ANY
+        )
         handler_input_mock.response_builder.speak.assert_called_once_with(
             "Das Wetter ist schön."
         )
@@ -60,9 +67,168 @@ class TestLaunchRequestHandler:
 
         response = handler.handle(handler_input_mock)
 
-        postal_provider_mock.get_postal_code.assert_called_once_with(handler_input_mock)
+        postal_provider_mock.get_postal_code.assert_called_once_with(
+            handler_input_mock, deadline=unittest.mock.ANY
+        )
         handler_input_mock.response_builder.speak.assert_called_once()
         handler_input_mock.response_builder.set_should_end_session.assert_called_once_with(
             True
         )
         assert response == handler_input_mock.response_builder.response
+
+    def test_handle_passes_deadline_from_lambda_context(
+        self, weather_service_mock, postal_provider_mock, handler_input_mock
+    ):
+        handler_input_mock.context = unittest.mock.Mock()
+        handler_input_mock.context.get_remaining_time_in_millis.return_value = 2000
+        handler = khc.handler.launch_request_handler.LaunchRequestHandler(
+            weather_service=weather_service_mock,
+            postal_provider=postal_provider_mock,
+        )
+
+        handler.handle(handler_input_mock)
+
+        deadline = postal_provider_mock.get_postal_code.call_args.kwargs["deadline"]
+        assert isinstance(deadline, khc.base.deadline.Deadline)
+        assert 1.5 < deadline.remaining() <= 2.0
+        assert (
+            weather_service_mock.get_short_answer.call_args.kwargs["deadline"]
+            is deadline
+        )
+
+    def test_handle_deadline_exceeded(self, postal_provider_mock, handler_input_mock):
+        postal_provider_mock.get_postal_code.side_effect = (
+            khc.base.deadline.DeadlineExceeded
+        )
+        weather_service_mock = unittest.mock.Mock()
+        handler = khc.handler.launch_request_handler.LaunchRequestHandler(
+            weather_service=weather_service_mock,
+            postal_provider=postal_provider_mock,
+        )
+
+        response = handler.handle(handler_input_mock)
+
+        weather_service_mock.get_short_answer.assert_not_called()
+        handler_input_mock.response_builder.speak.assert_called_once_with(
+            khc.handler.launch_request_handler.TIMEOUT_MESSAGE
+        )
+        assert response == handler_input_mock.response_builder.response
+
+    def test_handle_finishes_progressive_response(
+        self, weather_service_mock, postal_provider_mock, handler_input_mock
+    ):
+        progressive_response_mock = unittest.mock.Mock()
+        handler = khc.handler.launch_request_handler.LaunchRequestHandler(
+            weather_service=weather_service_mock,
+            postal_provider=postal_provider_mock,
+            progressive_response=progressive_response_mock,
+        )
+
+        handler.handle(handler_input_mock)
+
+        progressive_response_mock.start.assert_called_once_with(
+            handler_input_mock, unittest.mock.ANY
+        )
+        progressive_response_mock.start.return_value.finish.assert_called_once()
+
+    def test_handle_finishes_progressive_response_on_error(
+        self, postal_provider_mock, handler_input_mock
+    ):
+        postal_provider_mock.get_postal_code.side_effect = PermissionError
+        progressive_response_mock = unittest.mock.Mock()
+        handler = khc.handler.launch_request_handler.LaunchRequestHandler(
+            weather_service=unittest.mock.Mock(),
+            postal_provider=postal_provider_mock,
+            progressive_response=progressive_response_mock,
+        )
+
+        handler.handle(handler_input_mock)
+
+        progressive_response_mock.start.return_value.finish.assert_called_once()
+
+    def test_handle_uses_speculative_answer(
+        self, weather_service_mock, postal_provider_mock, handler_input_mock
+    ):
+        postal_provider_mock.last_known_postal_code.return_value = "12345"
+        handler = khc.handler.launch_request_handler.LaunchRequestHandler(
+            weather_service=weather_service_mock,
+            postal_provider=postal_provider_mock,
+            speculate=True,
+        )
+
+        handler.handle(handler_input_mock)
+
+        weather_service_mock.get_short_answer.assert_called_once_with(
+            "12345", deadline=unittest.mock.ANY
+        )
+        handler_input_mock.response_builder.speak.assert_called_once_with(
+            "Das Wetter ist schön."
+        )
+
+    def test_handle_reruns_when_postal_code_changed(
+        self, weather_service_mock, postal_provider_mock, handler_input_mock
+    ):
+        postal_provider_mock.last_known_postal_code.return_value = "54321"
+        weather_service_mock.get_short_answer.side_effect = lambda code, deadline: (
+            f"Antwort für {code}"
+        )
+        handler = khc.handler.launch_request_handler.LaunchRequestHandler(
+            weather_service=weather_service_mock,
+            postal_provider=postal_provider_mock,
+            speculate=True,
+        )
+
+        handler.handle(handler_input_mock)
+
+        handler_input_mock.response_builder.speak.assert_called_once_with(
+            "Antwort für 12345"
+        )
+
+    def test_handle_speculation_runs_concurrently(
+        self, weather_service_mock, postal_provider_mock, handler_input_mock
+    ):
+        started = threading.Event()
+        postal_provider_mock.last_known_postal_code.return_value = "12345"
+        weather_service_mock.get_short_answer.side_effect = lambda code, deadline: (
+            started.set() or "Ja."
+        )
+        postal_provider_mock.get_postal_code.side_effect = (
+            lambda handler_input, deadline: ("12345" if started.wait(5) else "timeout")
+        )
+        handler = khc.handler.launch_request_handler.LaunchRequestHandler(
+            weather_service=weather_service_mock,
+            postal_provider=postal_provider_mock,
+            speculate=True,
+        )
+
+        handler.handle(handler_input_mock)
+
+        handler_input_mock.response_builder.speak.assert_called_once_with("Ja.")
+
+    def test_handle_speculation_bounded_by_deadline(
+        self, weather_service_mock, postal_provider_mock, handler_input_mock
+    ):
+        release = threading.Event()
+        postal_provider_mock.last_known_postal_code.return_value = "12345"
+        weather_service_mock.get_short_answer.side_effect = lambda code, deadline: (
+            release.wait(5) and "Ja."
+        )
+        handler_input_mock.context = unittest.mock.Mock()
+        handler_input_mock.context.get_remaining_time_in_millis.return_value = 500
+        handler = khc.handler.launch_request_handler.LaunchRequestHandler(
+            weather_service=weather_service_mock,
+            postal_provider=postal_provider_mock,
+            speculate=True,
+        )
+
+        try:
+            handler.handle(handler_input_mock)
+        finally:
+            release.set()
+
+        handler_input_mock.response_builder.speak.assert_called_once_with(
+            khc.handler.launch_request_handler.TIMEOUT_MESSAGE
+        )
+        handler_input_mock.response_builder.set_should_end_session.assert_called_once_with(
+            True
+        )
@@ -3,6 +3,7 @@ import pytest
 import aws_lambda_typing.context as context_
 import khc.events.khc
 import khc.lambdas.khc
+import khc.services.gazetteer.index
 
 
 class TestKHCLambda:
@@ -77,3 +78,40 @@ class TestKHCLambda:
 
         assert response["statusCode"] == 400
         assert "Invalid postal code" in response["message"]
+
+    def test_rejects_unknown_postal_code(self, mock_context, tmp_path):
+        """Test rejection of postal codes missing from the gazetteer."""
+        path = str(tmp_path / "postal_codes.bin")
+        khc.services.gazetteer.index.write_index(
+            [
+                khc.services.gazetteer.index.Place(
+                    "12345", "Berlin", "Berlin", 52.5, 13.4
+                )
+            ],
+            path,
+        )
+        lambda_function = khc.lambdas.khc.KHCLambda(
+            gazetteer=khc.services.gazetteer.index.GazetteerIndex(path)
+        )
+        event = typing.cast(
+            khc.events.khc.KHCEvent,
+            {
+                "version": "1.0",
+                "requestContext": {"requestId": "test-id"},
+                "routeKey": "ANY /khc",
+                "rawPath": "/khc",
+                "rawQueryString": "",
+                "headers": {},
+                "isBase64Encoded": False,
+                "postal_code": "00001",
+                "use_ai": True,
+            },
+        )
+
+        response = lambda_function.handler(event, mock_context)
+        assert response["statusCode"] == 400
+        assert response["message"] == "Unknown postal code."
+
+        event["postal_code"] = "12345"
+        response = lambda_function.handler(event, mock_context)
+        assert response["statusCode"] == 200
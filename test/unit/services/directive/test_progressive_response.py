@@ -0,0 +1,100 @@
+import http.server
+import json
+import threading
+import time
+import unittest.mock
+import pytest
+import khc.services.directive.progressive_response
+
+
+class DirectiveStubHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        server = self.server
+        length = int(self.headers["Content-Length"])
+        server.requests.append(  # type: ignore[attr-defined]
+            (
+                self.path,
+                self.headers["Authorization"],
+                json.loads(self.rfile.read(length)),
+            )
+        )
+        self.send_response(server.status)  # type: ignore[attr-defined]
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class TestProgressiveResponseSender:
+    @pytest.fixture
+    def server(self):
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), DirectiveStubHandler)
+        server.requests = []  # type: ignore[attr-defined]
+        server.status = 204  # type: ignore[attr-defined]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    @pytest.fixture
+    def handler_input(self, server):
+        mock = unittest.mock.Mock()
+        mock.request_envelope.context.system.api_endpoint = (
+            f"http://127.0.0.1:{server.server_address[1]}"
+        )
+        mock.request_envelope.context.system.api_access_token = "token"
+        mock.request_envelope.request.request_id = "amzn1.echo-api.request.1"
+        return mock
+
+    def test_send_posts_speak_directive(self, server, handler_input):
+        sender = khc.services.directive.progressive_response.ProgressiveResponseSender()
+
+        assert sender.send(handler_input)
+
+        assert server.requests == [
+            (
+                "/v1/directives",
+                "Bearer token",
+                {
+                    "header": {"requestId": "amzn1.echo-api.request.1"},
+                    "directive": {
+                        "type": "VoicePlayer.Speak",
+                        "speech": khc.services.directive.progressive_response.SPEECH,
+                    },
+                },
+            )
+        ]
+
+    def test_send_reports_rejection(self, server, handler_input):
+        server.status = 400
+        sender = khc.services.directive.progressive_response.ProgressiveResponseSender()
+
+        assert not sender.send(handler_input)
+
+    def test_send_without_api_endpoint(self, handler_input):
+        handler_input.request_envelope.context.system.api_endpoint = None
+        sender = khc.services.directive.progressive_response.ProgressiveResponseSender()
+
+        assert not sender.send(handler_input)
+
+    def test_slow_answer_gets_progressive_response(self, server, handler_input):
+        sender = khc.services.directive.progressive_response.ProgressiveResponseSender(
+            delay_seconds=0.01
+        )
+
+        pending = sender.start(handler_input)
+        time.sleep(0.2)
+
+        assert pending.finish()
+        assert len(server.requests) == 1
+
+    def test_fast_answer_skips_progressive_response(self, server, handler_input):
+        sender = khc.services.directive.progressive_response.ProgressiveResponseSender(
+            delay_seconds=5
+        )
+
+        pending = sender.start(handler_input)
+
+        assert not pending.finish()
+        assert server.requests == []
@@ -0,0 +1,53 @@
+import khc.services.gazetteer.build
+import khc.services.gazetteer.index
+
+GEONAMES_LINES = [
+    "DE\t70173\tStuttgart\tBaden-Württemberg\tBW\tRegierungsbezirk Stuttgart\t081"
+    "\tStuttgart, Stadtkreis\t08111\t48.7784\t9.18\t4\n",
+    "DE\t01067\tDresden\tSachsen\tSN\t\t00\tKreisfreie Stadt Dresden\t14612"
+    "\t51.0574\t13.7\t4\n",
+    "AT\t1010\tWien\tWien\t09\t\t\t\t\t48.2\t16.37\t4\n",
+    "DE\tbroken\n",
+]
+
+
+class TestReadGeonames:
+    def test_parses_german_postal_codes(self):
+        places = list(khc.services.gazetteer.build.read_geonames(GEONAMES_LINES))
+
+        assert [place.postal_code for place in places] == ["70173", "01067"]
+        assert places[0].name == "Stuttgart"
+        assert places[0].state == "Baden-Württemberg"
+        assert places[1].latitude == 51.0574
+
+
+class TestMain:
+    def test_writes_index(self, tmp_path, capsys):
+        source = tmp_path / "DE.txt"
+        source.write_text("".join(GEONAMES_LINES), encoding="utf-8")
+        target = tmp_path / "postal_codes.bin"
+
+        exit_code = khc.services.gazetteer.build.main([str(source), str(target)])
+
+        assert exit_code == 0
+
+        gazetteer = khc.services.gazetteer.index.GazetteerIndex(str(target))
+        assert len(gazetteer) == 2
+        assert "Wrote 2 postal codes" in capsys.readouterr().out
+
+    def test_check_fails_without_index(self, tmp_path, capsys):
+        exit_code = khc.services.gazetteer.build.main(
+            ["--check", str(tmp_path / "missing.bin")]
+        )
+
+        assert exit_code == 1
+        assert "missing" in capsys.readouterr().err
+
+    def test_check_fails_for_incomplete_index(self, tmp_path):
+        target = str(tmp_path / "postal_codes.bin")
+        khc.services.gazetteer.index.write_index(
+            khc.services.gazetteer.build.read_geonames(GEONAMES_LINES), target
+        )
+
+        assert khc.services.gazetteer.build.main(["--check", target]) == 1
+        assert khc.services.gazetteer.build.check_index(target, minimum=2) is None
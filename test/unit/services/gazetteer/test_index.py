@@ -0,0 +1,65 @@
+import pytest
+import khc.services.gazetteer.index
+
+PLACES = [
+    khc.services.gazetteer.index.Place(
+        "70173", "Stuttgart", "Baden-Württemberg", 48.7784, 9.18
+    ),
+    khc.services.gazetteer.index.Place("01067", "Dresden", "Sachsen", 51.0574, 13.7),
+    khc.services.gazetteer.index.Place(
+        "70174", "Stuttgart", "Baden-Württemberg", 48.7823, 9.1727
+    ),
+    khc.services.gazetteer.index.Place("01067", "Doppelt", "Sachsen", 0.0, 0.0),
+]
+
+
+class TestGazetteerIndex:
+    @pytest.fixture
+    def index_path(self, tmp_path):
+        path = str(tmp_path / "data" / "postal_codes.bin")
+        khc.services.gazetteer.index.write_index(PLACES, path)
+        return path
+
+    @pytest.fixture
+    def gazetteer(self, index_path):
+        return khc.services.gazetteer.index.GazetteerIndex(index_path)
+
+    def test_lookup(self, gazetteer):
+        place = gazetteer.lookup("70173")
+        assert place == PLACES[0]
+        assert place is not None
+        assert place.state == "Baden-Württemberg"
+
+    def test_lookup_keeps_first_duplicate_and_leading_zero(self, gazetteer):
+        assert gazetteer.lookup("01067") == PLACES[1]
+
+    @pytest.mark.parametrize(
+        "postal_code", ["70175", "00000", "99999", "7017", "abcde"]
+    )
+    def test_lookup_unknown(self, gazetteer, postal_code):
+        assert gazetteer.lookup(postal_code) is None
+        assert postal_code not in gazetteer
+
+    def test_postal_codes_sorted(self, gazetteer):
+        assert list(gazetteer.postal_codes()) == ["01067", "70173", "70174"]
+        assert len(gazetteer) == 3
+
+    def test_is_loaded_lazily(self, index_path):
+        gazetteer = khc.services.gazetteer.index.GazetteerIndex(index_path)
+        assert not gazetteer._loaded
+        assert "70174" in gazetteer
+        assert gazetteer._loaded
+
+    def test_missing_file_is_unavailable(self, tmp_path):
+        gazetteer = khc.services.gazetteer.index.GazetteerIndex(
+            str(tmp_path / "missing.bin")
+        )
+        assert not gazetteer.available()
+        assert gazetteer.lookup("70173") is None
+        assert len(gazetteer) == 0
+
+    def test_invalid_file_is_unavailable(self, tmp_path):
+        path = tmp_path / "invalid.bin"
+        path.write_bytes(b"not an index")
+        gazetteer = khc.services.gazetteer.index.GazetteerIndex(str(path))
+        assert not gazetteer.available()
@@ -1,8 +1,15 @@
+import threading
+import types
+import json
 import pytest
 import unittest.mock
 import requests
+import khc.base.circuit_breaker
+import khc.base.deadline
 import khc.services.openrouter.client
+import khc.services.openrouter.disk_cache
 import khc.services.openrouter.models
+import khc.services.openrouter.router
 
 
 class TestOpenRouterClient:
@@ -20,9 +27,7 @@ class TestOpenRouterClient:
 
     def test_chat_completion_success(self, client_with_key):
         with (
-            unittest.mock.patch(
-                "khc.services.openrouter.client.requests.post"
-            ) as mock_post,
+            unittest.mock.patch.object(client_with_key.session, "post") as mock_post,
             unittest.mock.patch(
                 "khc.services.openrouter.models.OpenRouterResponse.from_json"
             ) as mock_from_json,
@@ -43,14 +48,29 @@ class TestOpenRouterClient:
             result = client_with_key.chat_completion("Hallo")
 
             mock_post.assert_called_once()
+            assert (
+                mock_post.call_args.args[0]
+                == khc.services.openrouter.client.OPENROUTER_URL
+            )
             mock_from_json.assert_called_once()
             assert result == "Hallo, wie kann ich helfen?"
 
+    def test_chat_completion_uses_configured_url(self):
+        client = khc.services.openrouter.client.OpenRouterClient(
+            api_key="test_api_key", url="http://127.0.0.1:8080/chat"
+        )
+        with unittest.mock.patch.object(client.session, "post") as mock_post:
+            mock_post.return_value.json.return_value = {
+                "choices": [{"message": {"content": "Ja."}}]
+            }
+
+            assert client.chat_completion("Hallo") == "Ja."
+
+        assert mock_post.call_args.args[0] == "http://127.0.0.1:8080/chat"
+
     def test_chat_completion_no_content(self, client_with_key):
         with (
-            unittest.mock.patch(
-                "khc.services.openrouter.client.requests.post"
-            ) as mock_post,
+            unittest.mock.patch.object(client_with_key.session, "post") as mock_post,
             unittest.mock.patch(
                 "khc.services.openrouter.models.OpenRouterResponse.from_json"
             ) as mock_from_json,
@@ -71,9 +91,7 @@ class TestOpenRouterClient:
             )
 
     def test_chat_completion_request_exception(self, client_with_key):
-        with unittest.mock.patch(
-            "khc.services.openrouter.client.requests.post"
-        ) as mock_post:
+        with unittest.mock.patch.object(client_with_key.session, "post") as mock_post:
             mock_post.side_effect = requests.RequestException("Connection error")
 
             result = client_with_key.chat_completion("Hallo")
@@ -82,10 +100,15 @@ class TestOpenRouterClient:
                 result == "Tut mir leid, ich konnte die Antwort gerade nicht erhalten."
             )
 
+    def test_chat_completion_raises_transient_errors(self, client_with_key):
+        with unittest.mock.patch.object(client_with_key.session, "post") as mock_post:
+            mock_post.side_effect = requests.ConnectionError("Connection error")
+
+            with pytest.raises(requests.ConnectionError):
+                client_with_key.chat_completion("Hallo", raise_transient=True)
+
     def test_chat_completion_value_error(self, client_with_key):
-        with unittest.mock.patch(
-            "khc.services.openrouter.client.requests.post"
-        ) as mock_post:
+        with unittest.mock.patch.object(client_with_key.session, "post") as mock_post:
             mock_response = unittest.mock.Mock()
             mock_response.raise_for_status.return_value = None
             mock_response.json.side_effect = ValueError("JSON error")
@@ -96,3 +119,453 @@ class TestOpenRouterClient:
             assert (
                 result == "Tut mir leid, ich konnte die Antwort gerade nicht erhalten."
             )
+
+    def test_uses_given_session(self):
+        session = unittest.mock.Mock(spec=requests.Session)
+        client = khc.services.openrouter.client.OpenRouterClient(
+            api_key="test_api_key", session=session
+        )
+        assert client.session is session
+
+    def test_chat_completion_uses_remaining_time_as_timeout(self, client_with_key):
+        deadline = khc.base.deadline.Deadline(expires_at=2.0, clock=lambda: 0.0)
+        with unittest.mock.patch.object(client_with_key.session, "post") as mock_post:
+            mock_post.return_value.json.return_value = {
+                "choices": [{"message": {"content": "Ja"}}]
+            }
+
+            result = client_with_key.chat_completion("Hallo", deadline=deadline)
+
+            assert mock_post.call_args.kwargs["timeout"] == 2.0
+            assert result == "Ja"
+
+    def test_chat_completion_deadline_exceeded(self, client_with_key):
+        deadline = khc.base.deadline.Deadline(expires_at=0.0, clock=lambda: 0.0)
+        with unittest.mock.patch.object(client_with_key.session, "post") as mock_post:
+            result = client_with_key.chat_completion("Hallo", deadline=deadline)
+
+            mock_post.assert_not_called()
+            assert result == khc.services.openrouter.client.FALLBACK_MESSAGE
+
+
+def sse_lines(*contents: str) -> list[bytes]:
+    lines = [": OPENROUTER PROCESSING", ""]
+    for content in contents:
+        chunk = {"choices": [{"delta": {"content": content}}]}
+        lines += [f"data: {json.dumps(chunk, ensure_ascii=False)}", ""]
+    return [line.encode("utf-8") for line in lines + ["data: [DONE]", ""]]
+
+
+class TestOpenRouterClientStreaming:
+    @pytest.fixture
+    def client(self):
+        return khc.services.openrouter.client.OpenRouterClient(
+            api_key="test_api_key",
+            session=unittest.mock.Mock(spec=requests.Session),
+        )
+
+    @pytest.fixture
+    def stream_response(self, client):
+        response = unittest.mock.MagicMock(spec=requests.Response)
+        response.__enter__.return_value = response
+        client.session.post.return_value = response
+        return response
+
+    def test_stream_collects_deltas(self, client, stream_response):
+        stream_response.iter_lines.return_value = iter(sse_lines("Ja, ", "klar."))
+
+        result = client.stream_chat_completion("Hallo")
+
+        assert result == "Ja, klar."
+        assert client.session.post.call_args.kwargs["stream"] is True
+        assert client.session.post.call_args.kwargs["json"]["stream"] is True
+        stream_response.__exit__.assert_called_once()
+
+    def test_stream_records_stats_and_metrics(self, client, stream_response, capsys):
+        client.emit_metrics = True
+        stream_response.iter_lines.return_value = iter(sse_lines("Ja."))
+
+        client.stream_chat_completion("Hallo")
+
+        stats = client.router.stats(khc.services.openrouter.client.MODEL)
+        assert stats.requests == 1
+        assert stats.latency_ewma is not None
+        assert len(stats.latencies) == 1
+        assert json.loads(capsys.readouterr().out)["Error"] == 0.0
+
+    def test_stream_records_failures(self, client, capsys):
+        client.emit_metrics = True
+        client.session.post.side_effect = requests.ConnectionError("refused")
+
+        client.stream_chat_completion("Hallo")
+
+        stats = client.router.stats(khc.services.openrouter.client.MODEL)
+        assert stats.requests == 1
+        assert stats.error_rate > 0
+        assert json.loads(capsys.readouterr().out)["Error"] == 1.0
+
+    def test_stream_decodes_utf8_without_charset(self, client, stream_response):
+        stream_response.headers = {"Content-Type": "text/event-stream"}
+        stream_response.encoding = "ISO-8859-1"
+        stream_response.iter_lines.return_value = iter(sse_lines("Ja, in München."))
+
+        result = client.stream_chat_completion("Hallo")
+
+        assert result == "Ja, in München."
+        assert not stream_response.iter_lines.call_args.kwargs.get("decode_unicode")
+
+    def test_stream_stops_early(self, client, stream_response):
+        lines = sse_lines("Ja.", " Lass baumeln.", " Noch mehr Text.")
+        stream_response.iter_lines.return_value = iter(lines)
+
+        result = client.stream_chat_completion(
+            "Hallo", stop_when=lambda text: text.count(".") >= 2
+        )
+
+        assert result == "Ja. Lass baumeln."
+
+    def test_stream_without_api_key(self):
+        client = khc.services.openrouter.client.OpenRouterClient(api_key=None)
+        assert (
+            client.stream_chat_completion("Hallo")
+            == khc.services.openrouter.client.NOT_CONFIGURED_MESSAGE
+        )
+
+    def test_stream_invalid_chunk(self, client, stream_response):
+        stream_response.iter_lines.return_value = iter([b"data: {not json"])
+
+        result = client.stream_chat_completion("Hallo")
+
+        assert result == khc.services.openrouter.client.FALLBACK_MESSAGE
+
+    def test_stream_request_exception(self, client):
+        client.session.post.side_effect = requests.ConnectionError("refused")
+
+        result = client.stream_chat_completion("Hallo")
+
+        assert result == khc.services.openrouter.client.FALLBACK_MESSAGE
+
+    def test_stream_deadline_exceeded_mid_stream(self, client, stream_response):
+        clock_values = iter([0.0, 0.0, 10.0])
+        deadline = khc.base.deadline.Deadline(
+            expires_at=1.0, clock=lambda: next(clock_values)
+        )
+        stream_response.iter_lines.return_value = iter(sse_lines("Ja", ", in"))
+
+        result = client.stream_chat_completion("Hallo", deadline=deadline)
+
+        assert result == khc.services.openrouter.client.FALLBACK_MESSAGE
+
+
+class TestOpenRouterClientVerdict:
+    @pytest.fixture
+    def client(self):
+        return khc.services.openrouter.client.OpenRouterClient(
+            api_key="test_api_key",
+            session=unittest.mock.Mock(spec=requests.Session),
+        )
+
+    def test_verdict_completion(self, client):
+        client.session.post.return_value.json.return_value = {
+            "choices": [{"message": {"content": '{"shorts": false, "place": "Kiel"}'}}]
+        }
+
+        verdict = client.verdict_completion("Hallo")
+
+        assert verdict == khc.services.openrouter.models.ShortsVerdict(
+            shorts=False, place="Kiel"
+        )
+        request_body = client.session.post.call_args.kwargs["json"]
+        assert request_body["max_tokens"] == 30
+        assert request_body["response_format"]["type"] == "json_schema"
+
+    def test_verdict_completion_without_api_key(self):
+        client = khc.services.openrouter.client.OpenRouterClient(api_key=None)
+        assert client.verdict_completion("Hallo") is None
+
+    def test_verdict_completion_request_exception(self, client):
+        client.session.post.side_effect = requests.ConnectionError("refused")
+        assert client.verdict_completion("Hallo") is None
+
+    def test_batch_verdict_completion(self, client):
+        client.session.post.return_value.json.return_value = {
+            "choices": [
+                {
+                    "message": {
+                        "content": '{"verdicts": [{"plz": "24103", "shorts": false}]}'
+                    }
+                }
+            ]
+        }
+
+        verdicts = client.batch_verdict_completion("Hallo", max_tokens=24)
+
+        assert verdicts == {
+            "24103": khc.services.openrouter.models.ShortsVerdict(shorts=False)
+        }
+        call = client.session.post.call_args
+        assert call.kwargs["json"]["max_tokens"] == 24
+        assert call.kwargs["timeout"] == (
+            khc.services.openrouter.client.BATCH_TIMEOUT_SECONDS
+        )
+
+    def test_batch_verdict_completion_request_exception(self, client):
+        client.session.post.side_effect = requests.ConnectionError("refused")
+        assert client.batch_verdict_completion("Hallo", max_tokens=24) is None
+
+
+class TestOpenRouterClientHedging:
+    @pytest.fixture
+    def release(self):
+        release = threading.Event()
+        yield release
+        release.set()
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(khc.services.openrouter.client, "HEDGE_DELAY_SECONDS", 0.01)
+        return khc.services.openrouter.client.OpenRouterClient(
+            api_key="test_api_key",
+            session=unittest.mock.Mock(spec=requests.Session),
+            hedge_model="fast-model",
+            hedge_ratio=0.0,
+        )
+
+    @staticmethod
+    def respond(content):
+        response = unittest.mock.Mock(spec=requests.Response)
+        response.json.return_value = {"choices": [{"message": {"content": content}}]}
+        return response
+
+    def test_hedge_answers_when_primary_is_slow(self, client, release):
+        def post(url, headers, json, timeout):
+            if json["model"] == "fast-model":
+                return self.respond("Ja, vom Hedge.")
+            release.wait(5)
+            return self.respond("Ja, vom Primary.")
+
+        client.session.post.side_effect = post
+
+        assert client.chat_completion("Hallo") == "Ja, vom Hedge."
+        assert client.router.stats("fast-model").requests == 1
+
+    def test_fast_primary_is_not_hedged(self, client):
+        client.session.post.return_value = self.respond("Ja.")
+
+        assert client.chat_completion("Hallo") == "Ja."
+        client.session.post.assert_called_once()
+
+    def test_falls_back_to_hedge_model_on_error(self, client):
+        def post(url, headers, json, timeout):
+            if json["model"] == "fast-model":
+                return self.respond("Ja, vom Hedge.")
+            raise requests.ConnectionError("refused")
+
+        client.session.post.side_effect = post
+
+        assert client.chat_completion("Hallo") == "Ja, vom Hedge."
+
+    def test_hedge_rate_is_capped(self, client):
+        client.session.post.side_effect = requests.ConnectionError("refused")
+
+        client.chat_completion("Hallo")
+        client.chat_completion("Hallo")
+
+        # The first request is hedged, the second one exceeds the cap.
+        assert client.session.post.call_count == 3
+
+    def test_no_hedge_without_time_left(self, client):
+        client.session.post.side_effect = requests.ConnectionError("refused")
+
+        result = client.chat_completion(
+            "Hallo", deadline=khc.base.deadline.Deadline.after(0.2)
+        )
+
+        assert result == khc.services.openrouter.client.FALLBACK_MESSAGE
+        client.session.post.assert_called_once()
+
+
+class TestOpenRouterClientRouting:
+    @pytest.fixture
+    def client(self):
+        router = khc.services.openrouter.router.ModelRouter(
+            ["slow-model", "fast-model"], random_=lambda: 0.99
+        )
+        router.stats("slow-model").record_success(2.0)
+        router.stats("fast-model").record_success(0.5)
+        return khc.services.openrouter.client.OpenRouterClient(
+            api_key="test_api_key",
+            session=unittest.mock.Mock(spec=requests.Session),
+            router=router,
+            emit_metrics=True,
+        )
+
+    def test_routes_to_fastest_model(self, client, capsys):
+        client.session.post.return_value.json.return_value = {
+            "choices": [{"message": {"content": "Ja."}}]
+        }
+
+        assert client.chat_completion("Hallo") == "Ja."
+
+        assert client.session.post.call_args.kwargs["json"]["model"] == "fast-model"
+        assert client.router.stats("fast-model").requests == 2
+        record = json.loads(capsys.readouterr().out)
+        assert record["Model"] == "fast-model"
+        assert record["Error"] == 0.0
+
+    def test_records_failures(self, client, capsys):
+        client.session.post.side_effect = requests.ConnectionError("refused")
+
+        client.chat_completion("Hallo")
+
+        assert client.router.stats("fast-model").error_rate > 0
+        assert json.loads(capsys.readouterr().out)["Error"] == 1.0
+
+
+class TestOpenRouterClientCircuitBreaker:
+    @pytest.fixture
+    def client(self):
+        return khc.services.openrouter.client.OpenRouterClient(
+            api_key="test_api_key",
+            session=unittest.mock.Mock(spec=requests.Session),
+            breaker=khc.base.circuit_breaker.CircuitBreaker(min_calls=2, window=2),
+        )
+
+    def test_open_circuit_fails_fast(self, client):
+        client.session.post.side_effect = requests.ConnectionError("refused")
+        client.chat_completion("Hallo")
+        client.chat_completion("Hallo")
+
+        assert not client.available()
+        assert (
+            client.chat_completion("Hallo")
+            == khc.services.openrouter.client.FALLBACK_MESSAGE
+        )
+        assert client.verdict_completion("Hallo") is None
+        assert client.session.post.call_count == 2
+
+    def test_deadline_timeouts_are_not_failures(self, client):
+        client.session.post.side_effect = requests.ReadTimeout("Read timed out.")
+        deadline = khc.base.deadline.Deadline(expires_at=1.0, clock=lambda: 0.0)
+        for _ in range(3):
+            client.chat_completion("Hallo", deadline=deadline)
+
+        assert client.available()
+        assert client.session.post.call_count == 3
+        stats = client.router.stats(khc.services.openrouter.client.MODEL)
+        assert stats.requests == 0
+
+    def test_deadline_timeouts_of_streams_are_not_failures(self, client):
+        client.session.post.side_effect = requests.ReadTimeout("Read timed out.")
+        deadline = khc.base.deadline.Deadline(expires_at=1.0, clock=lambda: 0.0)
+        for _ in range(3):
+            client.stream_chat_completion("Hallo", deadline=deadline)
+
+        assert client.available()
+
+    def test_background_requests_are_not_recorded(self, client):
+        client.session.post.side_effect = requests.ConnectionError("refused")
+        for _ in range(3):
+            client.chat_completion("Hallo", background=True)
+
+        assert client.available()
+        assert client.session.post.call_count == 3
+        stats = client.router.stats(khc.services.openrouter.client.MODEL)
+        assert stats.requests == 0
+
+    def test_background_requests_wait_for_closed_circuit(self, client):
+        client.session.post.side_effect = requests.ConnectionError("refused")
+        client.chat_completion("Hallo")
+        client.chat_completion("Hallo")
+        client.breaker.open_seconds = 0.0
+
+        assert client.available()
+        assert client.verdict_completion("Hallo", background=True) is None
+        assert client.session.post.call_count == 2
+        # The probe is left to a request of an invocation.
+        assert client.available()
+
+    def test_timeouts_at_cap_are_failures(self, client):
+        client.session.post.side_effect = requests.ReadTimeout("Read timed out.")
+        for _ in range(2):
+            client.chat_completion("Hallo")
+
+        assert not client.available()
+        stats = client.router.stats(khc.services.openrouter.client.MODEL)
+        assert stats.requests == 2
+
+    def test_slow_batches_leave_circuit_closed(self, monkeypatch):
+        session = unittest.mock.Mock(spec=requests.Session)
+        client = khc.services.openrouter.client.OpenRouterClient(
+            api_key="test_api_key", session=session
+        )
+        clock = [0.0]
+        monkeypatch.setattr(
+            khc.services.openrouter.client,
+            "time",
+            types.SimpleNamespace(monotonic=lambda: clock[0]),
+        )
+        latencies = iter([10.0 + batch for batch in range(10)] + [20.0])
+
+        def post(*args, **kwargs):
+            clock[0] += next(latencies)
+            response = unittest.mock.Mock()
+            response.json.return_value = {
+                "choices": [{"message": {"content": '{"verdicts": []}'}}]
+            }
+            return response
+
+        session.post.side_effect = post
+
+        for _ in range(11):
+            assert client.batch_verdict_completion("01067", max_tokens=20) == {}
+
+        assert client.breaker.state == khc.base.circuit_breaker.CLOSED
+        assert session.post.call_count == 11
+
+
+class TestOpenRouterClientDiskCache:
+    @staticmethod
+    def make_client(tmp_path, session, mode):
+        return khc.services.openrouter.client.OpenRouterClient(
+            api_key="test_api_key",
+            session=session,
+            disk_cache=khc.services.openrouter.disk_cache.DiskCache(
+                str(tmp_path), mode=mode
+            ),
+        )
+
+    @pytest.fixture
+    def session(self):
+        session = unittest.mock.Mock(spec=requests.Session)
+        session.post.return_value.json.return_value = {
+            "choices": [{"message": {"content": "Ja."}}]
+        }
+        return session
+
+    def test_replays_recorded_completion(self, tmp_path, session):
+        recorder = self.make_client(
+            tmp_path, session, khc.services.openrouter.disk_cache.RECORD
+        )
+        assert recorder.chat_completion("Hallo") == "Ja."
+
+        offline_session = unittest.mock.Mock(spec=requests.Session)
+        player = self.make_client(
+            tmp_path, offline_session, khc.services.openrouter.disk_cache.REPLAY
+        )
+
+        assert player.chat_completion("Hallo") == "Ja."
+        assert (
+            player.chat_completion("Tschüss")
+            == khc.services.openrouter.client.FALLBACK_MESSAGE
+        )
+        offline_session.post.assert_not_called()
+
+    def test_cache_hit_skips_request(self, tmp_path, session):
+        client = self.make_client(
+            tmp_path, session, khc.services.openrouter.disk_cache.READ_WRITE
+        )
+
+        assert client.chat_completion("Hallo") == "Ja."
+        assert client.chat_completion("Hallo") == "Ja."
+        session.post.assert_called_once()
@@ -0,0 +1,142 @@
+import datetime
+import os
+import pytest
+import khc.services.openrouter.disk_cache
+
+RESPONSE: dict[str, object] = {"choices": [{"message": {"content": "Ja."}}]}
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(tmp_path, clock, **kwargs):
+    return khc.services.openrouter.disk_cache.DiskCache(
+        str(tmp_path / "cache"), clock=clock, **kwargs
+    )
+
+
+class TestRequestKey:
+    def test_depends_on_answer_fields_only(self):
+        request = {
+            "model": "gpt-4o-mini",
+            "messages": [{"role": "user", "content": "Hallo"}],
+            "max_tokens": 80,
+        }
+        key = khc.services.openrouter.disk_cache.request_key(request)
+
+        assert key == khc.services.openrouter.disk_cache.request_key(
+            {**request, "stream": False}
+        )
+        assert key != khc.services.openrouter.disk_cache.request_key(
+            {**request, "max_tokens": 30}
+        )
+        assert len(key) == 64
+
+    def test_depends_on_day(self):
+        request = {"model": "gpt-4o-mini", "messages": []}
+        key = khc.services.openrouter.disk_cache.request_key(
+            request, datetime.date(2025, 6, 1)
+        )
+
+        assert key == khc.services.openrouter.disk_cache.request_key(
+            request, datetime.date(2025, 6, 1)
+        )
+        assert key != khc.services.openrouter.disk_cache.request_key(
+            request, datetime.date(2025, 6, 2)
+        )
+        assert key != khc.services.openrouter.disk_cache.request_key(request)
+
+
+class TestDiskCache:
+    def test_round_trip(self, tmp_path):
+        cache = make_cache(tmp_path, FakeClock())
+        cache.put("ab12", RESPONSE)
+
+        assert cache.get("ab12") == RESPONSE
+        assert cache.get("cd34") is None
+        assert not [
+            name
+            for _, _, files in os.walk(tmp_path)
+            for name in files
+            if name.endswith(".tmp")
+        ]
+
+    def test_entries_expire(self, tmp_path):
+        clock = FakeClock()
+        cache = make_cache(tmp_path, clock, ttl_seconds=60)
+        cache.put("ab12", RESPONSE)
+        os.utime(cache._path("ab12"), (clock.now, clock.now))
+
+        clock.now += 61
+        assert cache.get("ab12") is None
+
+    def test_trims_to_size_budget(self, tmp_path):
+        clock = FakeClock()
+        cache = make_cache(tmp_path, clock, max_bytes=200)
+        for index in range(10):
+            key = f"{index:02d}"
+            cache.put(key, RESPONSE)
+            os.utime(cache._path(key), (clock.now + index, clock.now + index))
+
+        sizes = [
+            os.path.getsize(os.path.join(root, name))
+            for root, _, files in os.walk(tmp_path)
+            for name in files
+        ]
+        assert sum(sizes) <= 200
+        assert cache.get("09") == RESPONSE
+
+    def test_record_mode_does_not_serve(self, tmp_path):
+        cache = make_cache(
+            tmp_path, FakeClock(), mode=khc.services.openrouter.disk_cache.RECORD
+        )
+        cache.put("ab12", RESPONSE)
+
+        assert cache.get("ab12") is None
+        assert os.path.exists(cache._path("ab12"))
+
+    def test_replay_mode_ignores_age_and_raises_on_miss(self, tmp_path):
+        clock = FakeClock()
+        make_cache(tmp_path, clock).put("ab12", RESPONSE)
+        cache = make_cache(
+            tmp_path, clock, mode=khc.services.openrouter.disk_cache.REPLAY
+        )
+        clock.now += 10 * 86400
+
+        assert cache.get("ab12") == RESPONSE
+        with pytest.raises(khc.services.openrouter.disk_cache.ReplayMissError):
+            cache.get("cd34")
+
+    def test_rejects_unknown_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            make_cache(tmp_path, FakeClock(), mode="offline")
+
+    def test_key_changes_at_midnight_in_berlin(self, tmp_path):
+        clock = FakeClock()
+        # 2025-06-01 23:59 in Berlin (CEST), still 21:59 in UTC.
+        clock.now = datetime.datetime(
+            2025, 6, 1, 21, 59, tzinfo=datetime.UTC
+        ).timestamp()
+        cache = make_cache(tmp_path, clock, ttl_seconds=24 * 60 * 60)
+        request = {"model": "gpt-4o-mini", "messages": []}
+        cache.put(cache.key(request), RESPONSE)
+        assert cache.get(cache.key(request)) == RESPONSE
+
+        clock.now += 2 * 60
+        assert cache.get(cache.key(request)) is None
+
+    def test_recorded_key_has_no_day(self, tmp_path):
+        request = {"model": "gpt-4o-mini", "messages": []}
+        for mode in (
+            khc.services.openrouter.disk_cache.RECORD,
+            khc.services.openrouter.disk_cache.REPLAY,
+        ):
+            cache = make_cache(tmp_path, FakeClock(), mode=mode)
+            assert cache.key(request) == khc.services.openrouter.disk_cache.request_key(
+                request
+            )
@@ -60,3 +60,101 @@ class TestOpenRouterModels:
         response = khc.services.openrouter.models.OpenRouterResponse(choices=[])
         content = response.get_message_content()
         assert content is None
+
+    def test_openrouter_request_to_dict_stream(self):
+        request = khc.services.openrouter.models.OpenRouterRequest(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": "Hallo"}],
+            stream=True,
+        )
+        assert request.to_dict()["stream"] is True
+
+    def test_stream_chunk_get_delta_content(self):
+        data = typing.cast(
+            dict[str, object], {"choices": [{"delta": {"content": "Ja, in"}}]}
+        )
+        chunk = khc.services.openrouter.models.OpenRouterStreamChunk.from_json(data)
+        assert chunk.get_delta_content() == "Ja, in"
+
+    def test_stream_chunk_without_content(self):
+        data = typing.cast(
+            dict[str, object], {"choices": [{"delta": {"role": "assistant"}}]}
+        )
+        chunk = khc.services.openrouter.models.OpenRouterStreamChunk.from_json(data)
+        assert chunk.get_delta_content() == ""
+
+    def test_stream_chunk_from_json_invalid_raises(self):
+        data = typing.cast(dict[str, object], {"choices": None})
+        with pytest.raises(ValueError):
+            khc.services.openrouter.models.OpenRouterStreamChunk.from_json(data)
+
+    def test_openrouter_request_to_dict_response_format(self):
+        response_format = khc.services.openrouter.models.ShortsVerdict.response_format()
+        request = khc.services.openrouter.models.OpenRouterRequest(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": "Hallo"}],
+            response_format=response_format,
+        )
+        assert request.to_dict()["response_format"] == response_format
+
+    def test_get_verdict(self):
+        choices = typing.cast(
+            list[dict[str, object]],
+            [{"message": {"content": '{"shorts": true, "place": "Stuttgart"}'}}],
+        )
+        response = khc.services.openrouter.models.OpenRouterResponse(choices=choices)
+        assert response.get_verdict() == khc.services.openrouter.models.ShortsVerdict(
+            shorts=True, place="Stuttgart"
+        )
+
+    @pytest.mark.parametrize(
+        "content", ["Ja, klar.", "[true]", '{"shorts": "yes", "place": "X"}']
+    )
+    def test_get_verdict_invalid_content(self, content):
+        choices = typing.cast(
+            list[dict[str, object]], [{"message": {"content": content}}]
+        )
+        response = khc.services.openrouter.models.OpenRouterResponse(choices=choices)
+        assert response.get_verdict() is None
+
+    def test_verdict_from_json_blank_place(self):
+        data = typing.cast(dict[str, object], {"shorts": False, "place": " "})
+        verdict = khc.services.openrouter.models.ShortsVerdict.from_json(data)
+        assert verdict.shorts is False
+        assert verdict.place is None
+
+    def test_verdict_response_format_without_place(self):
+        response_format = khc.services.openrouter.models.ShortsVerdict.response_format(
+            include_place=False
+        )
+        schema = typing.cast(
+            dict[str, object],
+            typing.cast(dict[str, object], response_format["json_schema"])["schema"],
+        )
+        assert schema["required"] == ["shorts"]
+
+    def test_get_batch_verdicts(self):
+        content = (
+            '{"verdicts": [{"plz": "89073", "shorts": true},'
+            ' {"plz": "24103", "shorts": "no"}, {"shorts": false},'
+            ' {"plz": "01067", "shorts": false}]}'
+        )
+        choices = typing.cast(
+            list[dict[str, object]], [{"message": {"content": content}}]
+        )
+        response = khc.services.openrouter.models.OpenRouterResponse(choices=choices)
+        assert response.get_batch_verdicts() == {
+            "89073": khc.services.openrouter.models.ShortsVerdict(True),
+            "01067": khc.services.openrouter.models.ShortsVerdict(False),
+        }
+
+    def test_get_batch_verdicts_salvages_truncated_content(self):
+        content = (
+            '{"verdicts": [{"plz": "89073", "shorts": true},'
+            ' {"plz": "24103", "shorts": false}, {"plz": "010'
+        )
+        choices = typing.cast(
+            list[dict[str, object]], [{"message": {"content": content}}]
+        )
+        response = khc.services.openrouter.models.OpenRouterResponse(choices=choices)
+        assert set(response.get_batch_verdicts()) == {"89073", "24103"}
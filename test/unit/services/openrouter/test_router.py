@@ -0,0 +1,85 @@
+import threading
+import pytest
+import khc.services.openrouter.router
+
+
+class TestModelStats:
+    def test_moving_averages(self):
+        stats = khc.services.openrouter.router.ModelStats(alpha=0.5)
+        stats.record_success(1.0)
+        stats.record_success(2.0)
+        stats.record_failure()
+
+        assert stats.latency_ewma == 1.5
+        assert stats.error_rate == 0.5
+        assert stats.requests == 3
+
+    def test_concurrent_updates(self):
+        stats = khc.services.openrouter.router.ModelStats()
+
+        def record():
+            for _ in range(1000):
+                stats.record_success(0.1)
+                stats.record_failure()
+
+        threads = [threading.Thread(target=record) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert stats.requests == 16000
+        assert stats.latency_ewma == pytest.approx(0.1)
+
+
+class TestModelRouter:
+    def test_requires_models(self):
+        with pytest.raises(ValueError):
+            khc.services.openrouter.router.ModelRouter([])
+
+    def test_ranks_unmeasured_models_after_measured_ones(self):
+        router = khc.services.openrouter.router.ModelRouter(
+            ["a", "b", "c"], random_=lambda: 0.99
+        )
+        router.stats("b").record_success(0.5)
+        router.stats("c").record_failure()
+
+        assert router.choose() == "b"
+
+    def test_without_data_chooses_first_model(self):
+        router = khc.services.openrouter.router.ModelRouter(
+            ["a", "b"], random_=lambda: 0.99
+        )
+
+        assert router.choose() == "a"
+
+    def test_chooses_fastest_healthy_model(self):
+        router = khc.services.openrouter.router.ModelRouter(
+            ["a", "b", "c"], random_=lambda: 0.99
+        )
+        router.stats("a").record_success(0.9)
+        router.stats("b").record_success(0.3)
+        router.stats("c").record_success(0.1)
+        for _ in range(5):
+            router.stats("c").record_failure()
+
+        assert router.choose() == "b"
+
+    def test_all_unhealthy_chooses_lowest_error_rate(self):
+        router = khc.services.openrouter.router.ModelRouter(
+            ["a", "b"], error_threshold=0.1, random_=lambda: 0.99
+        )
+        router.stats("a").record_failure()
+        router.stats("a").record_failure()
+        router.stats("b").record_failure()
+
+        assert router.choose() == "b"
+
+    def test_explores_other_model(self):
+        router = khc.services.openrouter.router.ModelRouter(
+            ["a", "b"], exploration=0.1, random_=lambda: 0.05
+        )
+        router.stats("a").record_success(0.1)
+        router.stats("b").record_success(0.5)
+
+        assert router.choose() == "b"
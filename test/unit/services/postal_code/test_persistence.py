@@ -0,0 +1,46 @@
+import unittest.mock
+import pytest
+import ask_sdk_core.exceptions
+import khc.services.postal_code.persistence
+
+
+def make_envelope(device_id: str) -> unittest.mock.Mock:
+    envelope = unittest.mock.Mock()
+    envelope.context.system.device.device_id = device_id
+    return envelope
+
+
+class TestSQLitePersistenceAdapter:
+    @pytest.fixture
+    def adapter(self, tmp_path):
+        return khc.services.postal_code.persistence.SQLitePersistenceAdapter(
+            str(tmp_path / "attributes.db")
+        )
+
+    def test_get_attributes_empty(self, adapter):
+        assert adapter.get_attributes(make_envelope("device1")) == {}
+
+    def test_save_and_get_attributes(self, adapter):
+        adapter.save_attributes(make_envelope("device1"), {"a": 1})
+        assert adapter.get_attributes(make_envelope("device1")) == {"a": 1}
+
+    def test_save_replaces_attributes(self, adapter):
+        adapter.save_attributes(make_envelope("device1"), {"a": 1})
+        adapter.save_attributes(make_envelope("device1"), {"b": 2})
+        assert adapter.get_attributes(make_envelope("device1")) == {"b": 2}
+
+    def test_delete_attributes(self, adapter):
+        adapter.save_attributes(make_envelope("device1"), {"a": 1})
+        adapter.delete_attributes(make_envelope("device1"))
+        assert adapter.get_attributes(make_envelope("device1")) == {}
+
+    def test_attributes_persist_in_file(self, adapter, tmp_path):
+        adapter.save_attributes(make_envelope("device1"), {"a": 1})
+        reopened = khc.services.postal_code.persistence.SQLitePersistenceAdapter(
+            str(tmp_path / "attributes.db")
+        )
+        assert reopened.get_attributes(make_envelope("device1")) == {"a": 1}
+
+    def test_unserializable_attributes_raise_persistence_exception(self, adapter):
+        with pytest.raises(ask_sdk_core.exceptions.PersistenceException):
+            adapter.save_attributes(make_envelope("device1"), {"a": object()})
@@ -0,0 +1,135 @@
+import unittest.mock
+import pytest
+import ask_sdk_core.exceptions
+import khc.services.postal_code.cache
+import khc.services.postal_code.persistence
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_envelope(device_id: str) -> unittest.mock.Mock:
+    envelope = unittest.mock.Mock()
+    envelope.context.system.device.device_id = device_id
+    return envelope
+
+
+class TestPostalCodeCache:
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def adapter(self):
+        return khc.services.postal_code.persistence.SQLitePersistenceAdapter()
+
+    @pytest.fixture
+    def cache(self, clock, adapter):
+        return khc.services.postal_code.cache.PostalCodeCache(
+            ttl=100, negative_ttl=10, persistence_adapter=adapter, clock=clock
+        )
+
+    def test_get_returns_none_for_unknown_device(self, cache):
+        assert cache.get(make_envelope("device1")) is None
+
+    def test_put_and_get(self, cache):
+        cache.put(make_envelope("device1"), "12345")
+        entry = cache.get(make_envelope("device1"))
+        assert entry is not None
+        assert entry.postal_code == "12345"
+        assert cache.get(make_envelope("device2")) is None
+
+    def test_entries_expire(self, cache, clock):
+        cache.put(make_envelope("device1"), "12345")
+        clock.now += 101
+        assert cache.get(make_envelope("device1")) is None
+
+    def test_last_known_survives_expiry(self, cache, clock):
+        cache.put(make_envelope("device1"), "12345")
+        clock.now += 101
+        assert cache.get(make_envelope("device1")) is None
+        assert cache.last_known(make_envelope("device1")) == "12345"
+        assert cache.last_known(make_envelope("device2")) is None
+
+    def test_last_known_from_durable_tier(self, cache, clock, adapter):
+        cache.put(make_envelope("device1"), "12345")
+        clock.now += 101
+        other = khc.services.postal_code.cache.PostalCodeCache(
+            ttl=100, persistence_adapter=adapter, clock=clock
+        )
+        assert other.last_known(make_envelope("device1")) == "12345"
+
+    def test_negative_entries_expire_after_negative_ttl(self, cache, clock):
+        cache.put_negative(make_envelope("device1"), "Missing permissions")
+        entry = cache.get(make_envelope("device1"))
+        assert entry is not None
+        assert entry.postal_code is None
+        assert entry.error == "Missing permissions"
+
+        clock.now += 11
+        assert cache.get(make_envelope("device1")) is None
+
+    def test_durable_tier_survives_new_cache_instance(self, cache, clock, adapter):
+        cache.put(make_envelope("device1"), "12345")
+
+        fresh_cache = khc.services.postal_code.cache.PostalCodeCache(
+            ttl=100, persistence_adapter=adapter, clock=clock
+        )
+        entry = fresh_cache.get(make_envelope("device1"))
+        assert entry is not None
+        assert entry.postal_code == "12345"
+
+    def test_negative_entries_are_not_persisted(self, cache, clock, adapter):
+        cache.put_negative(make_envelope("device1"), "Missing permissions")
+        assert adapter.get_attributes(make_envelope("device1")) == {}
+
+    def test_memory_tier_is_bounded(self, clock):
+        cache = khc.services.postal_code.cache.PostalCodeCache(
+            max_entries=2, clock=clock
+        )
+        for device_id in ("a", "b", "c"):
+            cache.put(make_envelope(device_id), "12345")
+
+        assert cache.get(make_envelope("a")) is None
+        assert cache.get(make_envelope("c")) is not None
+
+    def test_persistence_errors_are_ignored(self, clock):
+        adapter = unittest.mock.Mock()
+        adapter.get_attributes.side_effect = (
+            ask_sdk_core.exceptions.PersistenceException("down")
+        )
+        adapter.save_attributes.side_effect = (
+            ask_sdk_core.exceptions.PersistenceException("down")
+        )
+        cache = khc.services.postal_code.cache.PostalCodeCache(
+            persistence_adapter=adapter, clock=clock
+        )
+
+        assert cache.get(make_envelope("device1")) is None
+        cache.put(make_envelope("device1"), "12345")
+        entry = cache.get(make_envelope("device1"))
+        assert entry is not None
+        assert entry.postal_code == "12345"
+
+
+class TestPostalCodeCacheEntry:
+    def test_round_trip_attributes(self):
+        entry = khc.services.postal_code.cache.PostalCodeCacheEntry("12345", 42.0)
+        restored = khc.services.postal_code.cache.PostalCodeCacheEntry.from_attributes(
+            entry.to_attributes()
+        )
+        assert restored is not None
+        assert restored.postal_code == "12345"
+        assert restored.expires_at == 42.0
+
+    def test_from_attributes_invalid(self):
+        from_attributes = (
+            khc.services.postal_code.cache.PostalCodeCacheEntry.from_attributes
+        )
+        assert from_attributes({}) is None
+        assert from_attributes({"postal_code_cache": {"postal_code": 1}}) is None
@@ -1,6 +1,10 @@
+import logging
+import threading
+import time
 import pytest
 import unittest.mock
 import requests
+import khc.base.deadline
 import khc.services.postal_code.model
 import ask_sdk_core.handler_input
 import khc.services.postal_code.provider
@@ -31,21 +35,28 @@ class TestPostalCodeProvider:
         return mock
 
     @pytest.fixture
-    def requests_get_mock(self):
-        with unittest.mock.patch("requests.get") as mock_get:
-            yield mock_get
+    def session_mock(self):
+        return unittest.mock.Mock(spec=requests.Session)
 
-    def test_get_postal_code_success(self, handler_input_mock, requests_get_mock):
+    @pytest.fixture
+    def provider(self, session_mock):
+        return khc.services.postal_code.provider.PostalCodeProvider(
+            session=session_mock
+        )
+
+    @pytest.fixture
+    def requests_get_mock(self, session_mock):
+        return session_mock.get
+
+    def test_get_postal_code_success(
+        self, provider, handler_input_mock, requests_get_mock
+    ):
         response_mock = unittest.mock.Mock(spec=requests.Response)
         response_mock.status_code = 200
         response_mock.json.return_value = {"countryCode": "DE", "postalCode": "12345"}
         requests_get_mock.return_value = response_mock
 
-        postal_code = (
-            khc.services.postal_code.provider.PostalCodeProvider.get_postal_code(
-                handler_input_mock
-            )
-        )
+        postal_code = provider.get_postal_code(handler_input_mock)
 
         requests_get_mock.assert_called_once_with(
             "https://api.amazonalexa.com/v1/devices/device123/settings/address/countryAndPostalCode",
@@ -55,7 +66,7 @@ class TestPostalCodeProvider:
         assert postal_code == "12345"
 
     def test_get_postal_code_no_postal_code_in_response(
-        self, handler_input_mock, requests_get_mock
+        self, provider, handler_input_mock, requests_get_mock
     ):
         response_mock = unittest.mock.Mock(spec=requests.Response)
         response_mock.status_code = 200
@@ -65,12 +76,10 @@ class TestPostalCodeProvider:
         requests_get_mock.return_value = response_mock
 
         with pytest.raises(PermissionError, match="Postal code not available."):
-            khc.services.postal_code.provider.PostalCodeProvider.get_postal_code(
-                handler_input_mock
-            )
+            provider.get_postal_code(handler_input_mock)
 
     def test_get_postal_code_permission_denied(
-        self, handler_input_mock, requests_get_mock
+        self, provider, handler_input_mock, requests_get_mock
     ):
         response_mock = unittest.mock.Mock(spec=requests.Response)
         response_mock.status_code = 403
@@ -80,17 +89,166 @@ class TestPostalCodeProvider:
         with pytest.raises(
             PermissionError, match="Missing permissions for device address."
         ):
-            khc.services.postal_code.provider.PostalCodeProvider.get_postal_code(
-                handler_input_mock
-            )
+            provider.get_postal_code(handler_input_mock)
 
-    def test_get_postal_code_other_error(self, handler_input_mock, requests_get_mock):
+    def test_get_postal_code_other_error(
+        self, provider, handler_input_mock, requests_get_mock
+    ):
         response_mock = unittest.mock.Mock(spec=requests.Response)
         response_mock.status_code = 500
         response_mock.text = "Internal Server Error"
         requests_get_mock.return_value = response_mock
 
         with pytest.raises(PermissionError, match="Failed to get postal code: 500"):
-            khc.services.postal_code.provider.PostalCodeProvider.get_postal_code(
-                handler_input_mock
+            provider.get_postal_code(handler_input_mock)
+
+    def test_get_postal_code_is_cached_per_device(
+        self, provider, handler_input_mock, requests_get_mock
+    ):
+        response_mock = unittest.mock.Mock(spec=requests.Response)
+        response_mock.status_code = 200
+        response_mock.json.return_value = {"countryCode": "DE", "postalCode": "12345"}
+        requests_get_mock.return_value = response_mock
+
+        assert provider.get_postal_code(handler_input_mock) == "12345"
+        assert provider.get_postal_code(handler_input_mock) == "12345"
+
+        requests_get_mock.assert_called_once()
+
+    def test_logs_resolved_postal_code_by_device_key(
+        self, provider, handler_input_mock, requests_get_mock, caplog
+    ):
+        response_mock = unittest.mock.Mock(spec=requests.Response)
+        response_mock.status_code = 200
+        response_mock.json.return_value = {"countryCode": "DE", "postalCode": "12345"}
+        requests_get_mock.return_value = response_mock
+        device_id = handler_input_mock.request_envelope.context.system.device.device_id
+
+        with caplog.at_level(logging.INFO):
+            provider.get_postal_code(handler_input_mock)
+            provider.get_postal_code(handler_input_mock)
+
+        message = khc.services.postal_code.provider.RESOLVED_MESSAGE.format(
+            postal_code="12345",
+            device=khc.services.postal_code.provider.device_key(device_id),
+        )
+        assert caplog.messages.count(message) == 2
+        assert device_id not in caplog.text
+
+    def test_missing_consent_token_skips_api_call(
+        self, provider, handler_input_mock, requests_get_mock
+    ):
+        handler_input_mock.request_envelope.context.system.user.permissions = None
+
+        with pytest.raises(PermissionError):
+            provider.get_postal_code(handler_input_mock)
+
+        # The permission prompt must not wait for the network, its latency is
+        # gated by the no_consent benchmark of bench/micro.py.
+        requests_get_mock.assert_not_called()
+        assert provider.last_known_postal_code(handler_input_mock) is None
+
+    def test_last_known_postal_code_without_api_call(
+        self, provider, handler_input_mock, requests_get_mock
+    ):
+        assert provider.last_known_postal_code(handler_input_mock) is None
+        provider.cache.put(handler_input_mock.request_envelope, "12345")
+
+        assert provider.last_known_postal_code(handler_input_mock) == "12345"
+        requests_get_mock.assert_not_called()
+
+    @pytest.mark.parametrize("status_code", [403, 404])
+    def test_get_postal_code_caches_negative_results(
+        self, provider, handler_input_mock, requests_get_mock, status_code
+    ):
+        response_mock = unittest.mock.Mock(spec=requests.Response)
+        response_mock.status_code = status_code
+        response_mock.text = "Error"
+        requests_get_mock.return_value = response_mock
+
+        for _ in range(2):
+            with pytest.raises(PermissionError):
+                provider.get_postal_code(handler_input_mock)
+
+        requests_get_mock.assert_called_once()
+
+    def test_get_postal_code_does_not_cache_server_errors(
+        self, provider, handler_input_mock, requests_get_mock
+    ):
+        response_mock = unittest.mock.Mock(spec=requests.Response)
+        response_mock.status_code = 500
+        response_mock.text = "Internal Server Error"
+        requests_get_mock.return_value = response_mock
+
+        for _ in range(2):
+            with pytest.raises(PermissionError):
+                provider.get_postal_code(handler_input_mock)
+
+        assert requests_get_mock.call_count == 2
+
+    def test_get_postal_code_uses_remaining_time_as_timeout(
+        self, provider, handler_input_mock, requests_get_mock
+    ):
+        response_mock = unittest.mock.Mock(spec=requests.Response)
+        response_mock.status_code = 200
+        response_mock.json.return_value = {"countryCode": "DE", "postalCode": "12345"}
+        requests_get_mock.return_value = response_mock
+        deadline = khc.base.deadline.Deadline(expires_at=1.5, clock=lambda: 0.0)
+
+        provider.get_postal_code(handler_input_mock, deadline=deadline)
+
+        assert requests_get_mock.call_args.kwargs["timeout"] == 1.5
+
+    def test_get_postal_code_deadline_exceeded(
+        self, provider, handler_input_mock, requests_get_mock
+    ):
+        deadline = khc.base.deadline.Deadline(expires_at=0.0, clock=lambda: 0.0)
+
+        with pytest.raises(khc.base.deadline.DeadlineExceeded):
+            provider.get_postal_code(handler_input_mock, deadline=deadline)
+
+        requests_get_mock.assert_not_called()
+
+    def test_get_postal_code_timeout_raises_deadline_exceeded(
+        self, provider, handler_input_mock, requests_get_mock
+    ):
+        requests_get_mock.side_effect = requests.Timeout("read timed out")
+
+        with pytest.raises(khc.base.deadline.DeadlineExceeded):
+            provider.get_postal_code(handler_input_mock)
+
+    def test_concurrent_lookups_share_one_call(
+        self, provider, handler_input_mock, requests_get_mock
+    ):
+        started = threading.Event()
+        release = threading.Event()
+        response_mock = unittest.mock.Mock(spec=requests.Response)
+        response_mock.status_code = 200
+        response_mock.json.return_value = {"countryCode": "DE", "postalCode": "12345"}
+
+        def slow_get(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return response_mock
+
+        requests_get_mock.side_effect = slow_get
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    provider.get_postal_code(handler_input_mock)
+                )
             )
+            for _ in range(3)
+        ]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        requests_get_mock.assert_called_once()
+        assert results == ["12345"] * 3
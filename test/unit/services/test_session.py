@@ -0,0 +1,32 @@
+import unittest.mock
+import requests
+import requests.adapters
+import khc.services.session
+
+
+class TestCreateSession:
+    def test_mounts_pooled_adapter(self):
+        session = khc.services.session.create_session(pool_maxsize=7)
+
+        adapter = session.get_adapter("https://openrouter.ai")
+        assert isinstance(adapter, requests.adapters.HTTPAdapter)
+        assert adapter._pool_maxsize == 7
+        assert session.headers["Connection"] == "keep-alive"
+
+    def test_primes_given_urls(self):
+        with unittest.mock.patch.object(requests.Session, "head") as head_mock:
+            khc.services.session.create_session(prime_urls=["https://example.org"])
+
+        head_mock.assert_called_once_with("https://example.org", timeout=1.0)
+
+
+class TestPrimeSession:
+    def test_ignores_connection_errors(self):
+        session = unittest.mock.Mock(spec=requests.Session)
+        session.head.side_effect = requests.ConnectionError("refused")
+
+        khc.services.session.prime_session(
+            session, ["https://a.example", "https://b.example"]
+        )
+
+        assert session.head.call_count == 2
@@ -0,0 +1,104 @@
+import datetime
+import os
+import pytest
+import khc.services.weather.answer_store
+import khc.services.weather.cache
+
+DAY = datetime.date(2025, 7, 1)
+
+
+def clock_at(day: datetime.date):
+    return lambda: datetime.datetime(
+        day.year, day.month, day.day, 7, tzinfo=khc.services.weather.cache.BERLIN
+    )
+
+
+def rewrite(path: str, day: datetime.date, verdicts: dict[str, bool]) -> None:
+    # Like the nightly precompute, with a modification time that surely differs.
+    mtime = os.stat(path).st_mtime_ns
+    khc.services.weather.answer_store.write_answer_store(path, day, verdicts)
+    os.utime(path, ns=(mtime + 1_000_000_000, mtime + 1_000_000_000))
+
+
+class TestAnswerStore:
+    @pytest.fixture
+    def path(self, tmp_path):
+        path = str(tmp_path / "answers.json")
+        khc.services.weather.answer_store.write_answer_store(
+            path, DAY, {"70173": True, "24103": False}
+        )
+        return path
+
+    def test_get(self, path):
+        store = khc.services.weather.answer_store.AnswerStore(path, clock_at(DAY))
+        assert store.get("70173") is True
+        assert store.get("24103") is False
+        assert store.get("12345") is None
+        assert len(store) == 2
+        assert store.day == DAY
+
+    def test_get_other_day(self, path):
+        store = khc.services.weather.answer_store.AnswerStore(
+            path, clock_at(DAY + datetime.timedelta(days=1))
+        )
+        assert store.get("70173") is None
+
+    def test_missing_file(self, tmp_path):
+        store = khc.services.weather.answer_store.AnswerStore(
+            str(tmp_path / "missing.json"), clock_at(DAY)
+        )
+        assert store.get("70173") is None
+        assert store.day is None
+
+    def test_invalid_file(self, tmp_path):
+        path = tmp_path / "answers.json"
+        path.write_text('{"day": "gestern"}')
+        store = khc.services.weather.answer_store.AnswerStore(str(path), clock_at(DAY))
+        assert store.get("70173") is None
+
+    def test_reloads_new_store_after_day_rollover(self, path):
+        now = [clock_at(DAY)()]
+        store = khc.services.weather.answer_store.AnswerStore(
+            path, lambda: now[0], check_interval=3600
+        )
+        assert store.get("70173") is True
+
+        next_day = DAY + datetime.timedelta(days=1)
+        now[0] = clock_at(next_day)()
+        assert store.get("70173") is None
+        rewrite(path, next_day, {"70173": False})
+
+        assert store.get("70173") is False
+        assert store.day == next_day
+
+    def test_reloads_changed_file(self, path):
+        store = khc.services.weather.answer_store.AnswerStore(
+            path, clock_at(DAY), check_interval=0
+        )
+        assert store.get("24103") is False
+
+        rewrite(path, DAY, {"24103": True})
+
+        assert store.get("24103") is True
+
+    def test_checks_changes_at_most_every_interval(self, path):
+        store = khc.services.weather.answer_store.AnswerStore(
+            path, clock_at(DAY), check_interval=3600
+        )
+        assert store.get("24103") is False
+
+        rewrite(path, DAY, {"24103": True})
+
+        assert store.get("24103") is False
+
+
+class TestWriteAnswerStore:
+    def test_overwrites_atomically(self, tmp_path):
+        path = str(tmp_path / "answers.json")
+        khc.services.weather.answer_store.write_answer_store(path, DAY, {"1": True})
+        khc.services.weather.answer_store.write_answer_store(path, DAY, {"2": False})
+
+        store = khc.services.weather.answer_store.AnswerStore(path, clock_at(DAY))
+        assert store.get("1") is None
+        assert store.get("2") is False
+        assert [p.name for p in tmp_path.iterdir()] == ["answers.json"]
@@ -0,0 +1,135 @@
+import datetime
+import pytest
+import khc.services.weather.cache
+
+
+class FakeClock:
+    def __init__(self, now: datetime.datetime) -> None:
+        self.now = now
+
+    def __call__(self) -> datetime.datetime:
+        return self.now
+
+
+class TestAnswerCache:
+    @pytest.fixture
+    def clock(self):
+        return FakeClock(
+            datetime.datetime(
+                2025, 7, 1, 8, 0, tzinfo=khc.services.weather.cache.BERLIN
+            )
+        )
+
+    @pytest.fixture
+    def cache(self, clock):
+        return khc.services.weather.cache.AnswerCache(max_entries=3, clock=clock)
+
+    def test_get_returns_stored_value(self, cache):
+        cache.put("12345", "Ja")
+        assert cache.get("12345") == "Ja"
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 0
+
+    def test_get_missing_counts_miss(self, cache):
+        assert cache.get("12345") is None
+        assert cache.stats.misses == 1
+
+    def test_entries_expire_at_berlin_midnight(self, cache, clock):
+        cache.put("12345", "Ja")
+        # 23:59 in Berlin is still the same day.
+        clock.now = datetime.datetime(2025, 7, 1, 21, 59, tzinfo=datetime.timezone.utc)
+        assert cache.get("12345") == "Ja"
+        # 22:00 UTC is midnight in Berlin (CEST).
+        clock.now = datetime.datetime(2025, 7, 1, 22, 0, tzinfo=datetime.timezone.utc)
+        assert cache.get("12345") is None
+        assert cache.stats.expirations == 1
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self, cache):
+        cache.put("1", "a")
+        cache.put("2", "b")
+        cache.put("3", "c")
+        cache.get("1")
+        cache.put("4", "d")
+
+        assert cache.get("2") is None
+        assert cache.get("1") == "a"
+        assert cache.stats.evictions == 1
+
+    def test_evicts_by_size(self, clock):
+        cache = khc.services.weather.cache.AnswerCache(max_bytes=250, clock=clock)
+        cache.put("1", "x" * 40)
+        cache.put("2", "y" * 40)
+        cache.put("3", "z" * 40)
+
+        assert cache.get("1") is None
+        assert cache.size_bytes <= 250
+        assert cache.stats.evictions >= 1
+
+    def test_oversized_value_is_not_stored(self, clock):
+        cache = khc.services.weather.cache.AnswerCache(max_bytes=100, clock=clock)
+        cache.put("1", "x" * 200)
+        assert len(cache) == 0
+
+    def test_put_overwrites_existing_entry(self, cache):
+        cache.put("1", "a")
+        cache.put("1", "b")
+        assert cache.get("1") == "b"
+        assert len(cache) == 1
+
+    def test_clear(self, cache):
+        cache.put("1", "a")
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.size_bytes == 0
+
+    def test_get_stale_returns_answer_of_earlier_day(self, cache, clock):
+        cache.put("12345", "Ja")
+        clock.now = datetime.datetime(
+            2025, 7, 2, 8, 0, tzinfo=khc.services.weather.cache.BERLIN
+        )
+
+        assert cache.get("12345") is None
+        assert cache.get_stale("12345") == "Ja"
+        assert cache.get_stale("99999") is None
+
+    def test_needs_refresh_after_refresh_age(self, clock):
+        cache = khc.services.weather.cache.AnswerCache(
+            clock=clock, refresh_after=datetime.timedelta(hours=2)
+        )
+        cache.put("12345", "Ja")
+
+        assert not cache.needs_refresh("12345")
+        clock.now += datetime.timedelta(hours=2)
+        assert cache.needs_refresh("12345")
+        assert cache.get("12345") == "Ja"
+        assert not cache.needs_refresh("99999")
+
+    def test_never_needs_refresh_without_refresh_age(self, cache, clock):
+        cache.put("12345", "Ja")
+        clock.now += datetime.timedelta(hours=10)
+
+        assert not cache.needs_refresh("12345")
+
+    def test_negative_entries_expire(self, clock):
+        cache = khc.services.weather.cache.AnswerCache(
+            clock=clock, negative_ttl=datetime.timedelta(seconds=30)
+        )
+        cache.put_negative("12345")
+
+        assert cache.is_negative("12345")
+        clock.now += datetime.timedelta(seconds=30)
+        assert not cache.is_negative("12345")
+
+    def test_put_clears_negative_entry(self, clock):
+        cache = khc.services.weather.cache.AnswerCache(
+            clock=clock, negative_ttl=datetime.timedelta(seconds=30)
+        )
+        cache.put_negative("12345")
+        cache.put("12345", "Ja")
+
+        assert not cache.is_negative("12345")
+
+    def test_no_negative_entries_without_ttl(self, cache):
+        cache.put_negative("12345")
+        assert not cache.is_negative("12345")
@@ -0,0 +1,73 @@
+import pytest
+import khc.services.gazetteer.index
+import khc.services.weather.region
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    path = str(tmp_path / "postal_codes.bin")
+    khc.services.gazetteer.index.write_index(
+        [
+            khc.services.gazetteer.index.Place(
+                "89073", "Ulm", "Baden-Württemberg", 48.40, 10.05
+            ),
+            khc.services.gazetteer.index.Place(
+                "89231", "Neu-Ulm", "Bayern", 48.38, 10.10
+            ),
+            khc.services.gazetteer.index.Place(
+                "24103", "Kiel", "Schleswig-Holstein", 54.32, 10.13
+            ),
+        ],
+        path,
+    )
+    return khc.services.gazetteer.index.GazetteerIndex(path)
+
+
+def test_postal_code_mapper_is_identity():
+    mapper = khc.services.weather.region.PostalCodeRegionMapper()
+
+    assert mapper.region_of("89073") == "89073"
+
+
+def test_prefix_mapper_groups_by_leading_digits():
+    mapper = khc.services.weather.region.PrefixRegionMapper(digits=2)
+
+    assert mapper.region_of("89073") == mapper.region_of("89231") == "prefix2:89"
+    assert mapper.region_of("24103") == "prefix2:24"
+
+
+def test_prefix_mapper_rejects_invalid_digits():
+    with pytest.raises(ValueError):
+        khc.services.weather.region.PrefixRegionMapper(digits=6)
+
+
+def test_grid_mapper_groups_neighbouring_centroids(gazetteer):
+    mapper = khc.services.weather.region.GridRegionMapper(gazetteer)
+
+    assert mapper.region_of("89073") == mapper.region_of("89231")
+    assert mapper.region_of("89073") != mapper.region_of("24103")
+
+
+def test_grid_mapper_falls_back_to_postal_code(gazetteer):
+    mapper = khc.services.weather.region.GridRegionMapper(gazetteer)
+
+    assert mapper.region_of("10115") == "10115"
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        ("postal_code", khc.services.weather.region.PostalCodeRegionMapper),
+        ("prefix:3", khc.services.weather.region.PrefixRegionMapper),
+        ("grid:0.5", khc.services.weather.region.GridRegionMapper),
+    ],
+)
+def test_create_region_mapper(gazetteer, spec, expected):
+    mapper = khc.services.weather.region.create_region_mapper(spec, gazetteer)
+
+    assert isinstance(mapper, expected)
+
+
+def test_create_region_mapper_rejects_unknown_spec():
+    with pytest.raises(ValueError):
+        khc.services.weather.region.create_region_mapper("district")
@@ -0,0 +1,29 @@
+import datetime
+import pytest
+import khc.services.gazetteer.index
+import khc.services.weather.rules
+
+FREIBURG = khc.services.gazetteer.index.Place(
+    "79098", "Freiburg im Breisgau", "Baden-Württemberg", 47.99, 7.85
+)
+KIEL = khc.services.gazetteer.index.Place(
+    "24103", "Kiel", "Schleswig-Holstein", 54.32, 10.13
+)
+
+
+@pytest.mark.parametrize(
+    "day, place, shorts",
+    [
+        (datetime.date(2025, 7, 1), KIEL, True),
+        (datetime.date(2025, 7, 1), None, True),
+        (datetime.date(2025, 5, 20), FREIBURG, True),
+        (datetime.date(2025, 5, 20), KIEL, False),
+        (datetime.date(2025, 5, 20), None, False),
+        (datetime.date(2025, 1, 15), FREIBURG, False),
+    ],
+)
+def test_seasonal_verdict(day, place, shorts):
+    verdict = khc.services.weather.rules.seasonal_verdict(day, place)
+
+    assert verdict.shorts is shorts
+    assert verdict.place == (place.name if place else None)
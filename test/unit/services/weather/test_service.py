@@ -1,7 +1,19 @@
+import datetime
+import threading
+import time
 import pytest
+import requests
 import unittest.mock
+import khc.base.circuit_breaker
+import khc.base.deadline
+import khc.services.gazetteer.index
 import khc.services.openrouter.client
+import khc.services.openrouter.models
+import khc.services.weather.answer_store
+import khc.services.weather.cache
+import khc.services.weather.region
 import khc.services.weather.service
+import khc.services.weather.shared_cache
 
 
 class TestWeatherService:
@@ -32,5 +44,687 @@ class TestWeatherService:
 
         result = weather_service.get_short_answer(postal_code)
 
-        openrouter_client_mock.chat_completion.assert_called_once_with(expected_prompt)
+        openrouter_client_mock.chat_completion.assert_called_once_with(
+            expected_prompt, deadline=None, raise_transient=True, background=False
+        )
         assert result == expected_response
+
+    def test_get_short_answer_uses_cache(self, weather_service, openrouter_client_mock):
+        openrouter_client_mock.chat_completion.return_value = "Ja, Lass baumeln."
+
+        first = weather_service.get_short_answer("12345")
+        second = weather_service.get_short_answer("12345")
+
+        openrouter_client_mock.chat_completion.assert_called_once()
+        assert first == second == "Ja, Lass baumeln."
+        assert weather_service.answer_cache.stats.hits == 1
+
+    def test_uses_empty_caches_passed_in(self, openrouter_client_mock):
+        answer_cache = khc.services.weather.cache.AnswerCache()
+        verdict_cache = khc.services.weather.cache.AnswerCache()
+        openrouter_client_mock.chat_completion.return_value = "Ja, Lass baumeln."
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock,
+            answer_cache=answer_cache,
+            verdict_cache=verdict_cache,
+        )
+
+        weather_service.get_short_answer("12345")
+
+        assert weather_service.answer_cache is answer_cache
+        assert weather_service.verdict_cache is verdict_cache
+        assert answer_cache.get("12345") == "Ja, Lass baumeln."
+
+    def test_get_short_answer_does_not_cache_errors(
+        self, weather_service, openrouter_client_mock
+    ):
+        openrouter_client_mock.chat_completion.return_value = (
+            khc.services.openrouter.client.FALLBACK_MESSAGE
+        )
+
+        weather_service.get_short_answer("12345")
+        weather_service.get_short_answer("12345")
+
+        assert openrouter_client_mock.chat_completion.call_count == 2
+
+    def test_transient_failures_are_not_cached_negatively(self, openrouter_client_mock):
+        openrouter_client_mock.chat_completion.side_effect = (
+            khc.base.deadline.DeadlineExceeded("No time left.")
+        )
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock,
+            answer_cache=khc.services.weather.cache.AnswerCache(
+                negative_ttl=datetime.timedelta(seconds=30)
+            ),
+        )
+
+        assert (
+            weather_service.get_short_answer("12345")
+            == khc.services.openrouter.client.FALLBACK_MESSAGE
+        )
+        assert not weather_service.answer_cache.is_negative("12345")
+
+    def test_get_short_answer_streams_until_complete(self, openrouter_client_mock):
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock, stream=True
+        )
+        openrouter_client_mock.stream_chat_completion.return_value = (
+            "Ja, in Musterstadt kann man heute eine kurze Hose tragen. Lass baumeln. "
+            "Viel"
+        )
+
+        result = weather_service.get_short_answer("12345")
+
+        openrouter_client_mock.chat_completion.assert_not_called()
+        stop_when = openrouter_client_mock.stream_chat_completion.call_args.kwargs[
+            "stop_when"
+        ]
+        assert not stop_when(
+            "Ja, in Musterstadt kann man heute eine kurze Hose tragen."
+        )
+        assert stop_when(
+            "Nein, in X kann man heute keine kurze Hose tragen. Versteck die Waden."
+        )
+        assert result == (
+            "Ja, in Musterstadt kann man heute eine kurze Hose tragen. Lass baumeln."
+        )
+
+
+class TestTrimCompleteAnswer:
+    def test_incomplete_answer(self):
+        assert khc.services.weather.service.trim_complete_answer("Ja, in St.") is None
+
+    def test_abbreviation_in_place_name(self):
+        answer = (
+            "Ja, in St. Ingbert kann man heute eine kurze Hose tragen. Lass baumeln!"
+        )
+        assert khc.services.weather.service.trim_complete_answer(answer) == answer
+
+
+class TestWeatherServiceStructured:
+    @pytest.fixture
+    def openrouter_client_mock(self):
+        return unittest.mock.Mock(spec=khc.services.openrouter.client.OpenRouterClient)
+
+    @pytest.fixture
+    def weather_service(self, openrouter_client_mock):
+        return khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock, structured=True
+        )
+
+    def test_renders_verdict_locally(self, weather_service, openrouter_client_mock):
+        openrouter_client_mock.verdict_completion.return_value = (
+            khc.services.openrouter.models.ShortsVerdict(shorts=True, place="Ulm")
+        )
+
+        result = weather_service.get_short_answer("89073")
+
+        openrouter_client_mock.chat_completion.assert_not_called()
+        assert result == (
+            "Ja, in Ulm kann man heute eine kurze Hose tragen. Lass baumeln."
+        )
+        assert weather_service.verdict_cache.get("89073") == (
+            khc.services.openrouter.models.ShortsVerdict(shorts=True, place="Ulm")
+        )
+
+    def test_missing_verdict_falls_back(self, weather_service, openrouter_client_mock):
+        openrouter_client_mock.verdict_completion.return_value = None
+
+        result = weather_service.get_short_answer("89073")
+
+        assert result == khc.services.openrouter.client.FALLBACK_MESSAGE
+        assert len(weather_service.verdict_cache) == 0
+
+
+class TestWeatherServiceGazetteer:
+    @pytest.fixture
+    def openrouter_client_mock(self):
+        return unittest.mock.Mock(spec=khc.services.openrouter.client.OpenRouterClient)
+
+    @pytest.fixture
+    def gazetteer(self, tmp_path):
+        path = str(tmp_path / "postal_codes.bin")
+        khc.services.gazetteer.index.write_index(
+            [
+                khc.services.gazetteer.index.Place(
+                    "89073", "Ulm", "Baden-Württemberg", 48.4, 9.99
+                )
+            ],
+            path,
+        )
+        return khc.services.gazetteer.index.GazetteerIndex(path)
+
+    def test_text_prompt_names_place(self, openrouter_client_mock, gazetteer):
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock, gazetteer=gazetteer
+        )
+        openrouter_client_mock.chat_completion.return_value = "Ja."
+
+        weather_service.get_short_answer("89073")
+
+        prompt = openrouter_client_mock.chat_completion.call_args.args[0]
+        assert "Postleitzahl 89073 (Ulm, Baden-Württemberg)" in prompt
+
+    def test_structured_renders_place_locally(self, openrouter_client_mock, gazetteer):
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock,
+            structured=True,
+            gazetteer=gazetteer,
+        )
+        openrouter_client_mock.verdict_completion.return_value = (
+            khc.services.openrouter.models.ShortsVerdict(shorts=False)
+        )
+
+        result = weather_service.get_short_answer("89073")
+
+        call = openrouter_client_mock.verdict_completion.call_args
+        assert "Ulm (Baden-Württemberg, 48.40° N, 9.99° O)" in call.args[0]
+        assert call.kwargs["include_place"] is False
+        assert result.startswith("Nein, in Ulm ")
+
+    def test_unknown_postal_code_falls_back_to_model_place(
+        self, openrouter_client_mock, gazetteer
+    ):
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock,
+            structured=True,
+            gazetteer=gazetteer,
+        )
+        openrouter_client_mock.verdict_completion.return_value = (
+            khc.services.openrouter.models.ShortsVerdict(shorts=True, place="Kiel")
+        )
+
+        result = weather_service.get_short_answer("24103")
+
+        assert "include_place" not in (
+            openrouter_client_mock.verdict_completion.call_args.kwargs
+        )
+        assert result.startswith("Ja, in Kiel ")
+
+
+class TestWeatherServiceAnswerStore:
+    @pytest.fixture
+    def openrouter_client_mock(self):
+        return unittest.mock.Mock(spec=khc.services.openrouter.client.OpenRouterClient)
+
+    def test_answers_from_store(self, openrouter_client_mock):
+        answer_store = unittest.mock.Mock(
+            spec=khc.services.weather.answer_store.AnswerStore
+        )
+        answer_store.get.return_value = False
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock, answer_store=answer_store
+        )
+
+        result = weather_service.get_short_answer("24103")
+
+        openrouter_client_mock.chat_completion.assert_not_called()
+        assert result.startswith("Nein, in deiner Gegend ")
+        assert weather_service.answer_cache.get("24103") == result
+
+    def test_store_miss_calls_openrouter(self, openrouter_client_mock):
+        answer_store = unittest.mock.Mock(
+            spec=khc.services.weather.answer_store.AnswerStore
+        )
+        answer_store.get.return_value = None
+        openrouter_client_mock.chat_completion.return_value = "Ja."
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock, answer_store=answer_store
+        )
+
+        assert weather_service.get_short_answer("24103") == "Ja."
+
+    def test_get_verdict_bypasses_cache(self, openrouter_client_mock):
+        verdict = khc.services.openrouter.models.ShortsVerdict(True, "Kiel")
+        openrouter_client_mock.verdict_completion.return_value = verdict
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock
+        )
+
+        assert weather_service.get_verdict("24103") == verdict
+        assert weather_service.get_verdict("24103") == verdict
+        assert openrouter_client_mock.verdict_completion.call_count == 2
+
+
+class TestWeatherServiceRegion:
+    @pytest.fixture
+    def openrouter_client_mock(self):
+        return unittest.mock.Mock(spec=khc.services.openrouter.client.OpenRouterClient)
+
+    @pytest.fixture
+    def weather_service(self, openrouter_client_mock):
+        return khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock,
+            structured=True,
+            region_mapper=khc.services.weather.region.PrefixRegionMapper(digits=3),
+        )
+
+    def test_postal_codes_share_region_verdict(
+        self, weather_service, openrouter_client_mock
+    ):
+        openrouter_client_mock.verdict_completion.return_value = (
+            khc.services.openrouter.models.ShortsVerdict(shorts=True, place="Ulm")
+        )
+
+        first = weather_service.get_short_answer("89073")
+        second = weather_service.get_short_answer("89075")
+
+        openrouter_client_mock.verdict_completion.assert_called_once()
+        assert first.startswith("Ja, in Ulm ")
+        assert second.startswith("Ja, in deiner Gegend ")
+
+    def test_store_is_keyed_by_region(self, openrouter_client_mock):
+        answer_store = unittest.mock.Mock(
+            spec=khc.services.weather.answer_store.AnswerStore
+        )
+        answer_store.get.return_value = True
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock,
+            structured=True,
+            answer_store=answer_store,
+            region_mapper=khc.services.weather.region.PrefixRegionMapper(digits=2),
+        )
+
+        result = weather_service.get_short_answer("89073")
+
+        answer_store.get.assert_called_once_with("prefix2:89")
+        openrouter_client_mock.verdict_completion.assert_not_called()
+        assert result.startswith("Ja, in deiner Gegend ")
+
+    def test_concurrent_misses_share_one_call(
+        self, weather_service, openrouter_client_mock
+    ):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_verdict(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return khc.services.openrouter.models.ShortsVerdict(True, "Ulm")
+
+        openrouter_client_mock.verdict_completion.side_effect = slow_verdict
+        results = {}
+        threads = {
+            postal_code: threading.Thread(
+                target=lambda code=postal_code: results.update(
+                    {code: weather_service.get_short_answer(code)}
+                )
+            )
+            for postal_code in ("89073", "89075")
+        }
+        threads["89073"].start()
+        started.wait(5)
+        threads["89075"].start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads.values():
+            thread.join(5)
+
+        openrouter_client_mock.verdict_completion.assert_called_once()
+        assert results["89073"].startswith("Ja, in Ulm ")
+        assert results["89075"].startswith("Ja, in deiner Gegend ")
+
+    def test_waiting_past_deadline_falls_back(
+        self, weather_service, openrouter_client_mock
+    ):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_verdict(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return khc.services.openrouter.models.ShortsVerdict(True)
+
+        openrouter_client_mock.verdict_completion.side_effect = slow_verdict
+        leader = threading.Thread(
+            target=lambda: weather_service.get_short_answer("89073")
+        )
+        leader.start()
+        started.wait(5)
+        try:
+            result = weather_service.get_short_answer(
+                "89075", deadline=khc.base.deadline.Deadline.after(0.06)
+            )
+        finally:
+            release.set()
+            leader.join(5)
+
+        assert result == khc.services.openrouter.client.FALLBACK_MESSAGE
+
+
+class TestWeatherServiceBatch:
+    @pytest.fixture
+    def openrouter_client_mock(self):
+        return unittest.mock.Mock(spec=khc.services.openrouter.client.OpenRouterClient)
+
+    @pytest.fixture
+    def weather_service(self, openrouter_client_mock):
+        return khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock
+        )
+
+    def test_get_verdicts_in_one_call(self, weather_service, openrouter_client_mock):
+        openrouter_client_mock.batch_verdict_completion.return_value = {
+            "89073": khc.services.openrouter.models.ShortsVerdict(True),
+            "24103": khc.services.openrouter.models.ShortsVerdict(False),
+            "99999": khc.services.openrouter.models.ShortsVerdict(True),
+        }
+
+        verdicts = weather_service.get_verdicts(["89073", "24103"])
+
+        call = openrouter_client_mock.batch_verdict_completion.call_args
+        assert call.args[0].endswith("\n89073\n24103")
+        assert call.kwargs["max_tokens"] == (
+            khc.services.weather.service.BATCH_TOKENS_OVERHEAD
+            + 2 * khc.services.weather.service.BATCH_TOKENS_PER_ITEM
+        )
+        assert verdicts == {
+            "89073": khc.services.openrouter.models.ShortsVerdict(True),
+            "24103": khc.services.openrouter.models.ShortsVerdict(False),
+        }
+        assert weather_service.batch_size == khc.services.weather.service.BATCH_SIZE
+
+    def test_get_verdicts_splits_incomplete_chunks(
+        self, weather_service, openrouter_client_mock
+    ):
+        def answer_first_only(prompt, max_tokens, deadline):
+            postal_code = prompt.split("\n")[1]
+            return {postal_code: khc.services.openrouter.models.ShortsVerdict(True)}
+
+        openrouter_client_mock.batch_verdict_completion.side_effect = answer_first_only
+        weather_service.batch_size = 4
+
+        verdicts = weather_service.get_verdicts(["01067", "24103", "70173", "89073"])
+
+        assert set(verdicts) == {"01067", "24103", "70173", "89073"}
+        assert openrouter_client_mock.batch_verdict_completion.call_count == 4
+        assert weather_service.batch_size == 4
+
+    def test_get_verdicts_grows_chunks_within_call(
+        self, weather_service, openrouter_client_mock
+    ):
+        def answer_all(prompt, max_tokens, deadline):
+            return {
+                line: khc.services.openrouter.models.ShortsVerdict(True)
+                for line in prompt.split("\n")[1:]
+            }
+
+        openrouter_client_mock.batch_verdict_completion.side_effect = answer_all
+        weather_service.batch_size = 2
+
+        verdicts = weather_service.get_verdicts([f"{code:05d}" for code in range(6)])
+
+        assert len(verdicts) == 6
+        assert [
+            len(call.args[0].split("\n")) - 1
+            for call in openrouter_client_mock.batch_verdict_completion.call_args_list
+        ] == [2, 4]
+        assert weather_service.batch_size == 2
+
+    def test_get_verdicts_gives_up_on_single_postal_code(
+        self, weather_service, openrouter_client_mock
+    ):
+        openrouter_client_mock.batch_verdict_completion.return_value = {}
+
+        assert weather_service.get_verdicts(["01067", "24103"]) == {}
+        assert openrouter_client_mock.batch_verdict_completion.call_count == 3
+
+    def test_get_verdicts_retries_failed_request_without_splitting(
+        self, weather_service, openrouter_client_mock
+    ):
+        verdicts = {
+            "01067": khc.services.openrouter.models.ShortsVerdict(True),
+            "24103": khc.services.openrouter.models.ShortsVerdict(False),
+        }
+        openrouter_client_mock.batch_verdict_completion.side_effect = [None, verdicts]
+
+        assert weather_service.get_verdicts(["01067", "24103"]) == verdicts
+        calls = openrouter_client_mock.batch_verdict_completion.call_args_list
+        assert calls[0].args[0] == calls[1].args[0]
+
+    def test_get_verdicts_rate_limits_every_request(
+        self, weather_service, openrouter_client_mock
+    ):
+        openrouter_client_mock.batch_verdict_completion.side_effect = [
+            None,
+            {"01067": khc.services.openrouter.models.ShortsVerdict(True)},
+            {"24103": khc.services.openrouter.models.ShortsVerdict(False)},
+        ]
+        rate_limiter = unittest.mock.Mock()
+
+        weather_service.get_verdicts(["01067", "24103"], rate_limiter=rate_limiter)
+
+        assert openrouter_client_mock.batch_verdict_completion.call_count == 3
+        assert rate_limiter.acquire.call_count == 3
+
+    def test_get_verdicts_gives_up_on_failed_chunk(
+        self, weather_service, openrouter_client_mock
+    ):
+        openrouter_client_mock.batch_verdict_completion.return_value = None
+        weather_service.batch_size = 2
+
+        verdicts = weather_service.get_verdicts(["01067", "24103", "70173", "89073"])
+
+        assert verdicts == {}
+        assert openrouter_client_mock.batch_verdict_completion.call_count == 4
+        assert {
+            len(call.args[0].split("\n")) - 1
+            for call in openrouter_client_mock.batch_verdict_completion.call_args_list
+        } == {2}
+
+
+class TestWeatherServiceCircuitOpen:
+    @pytest.fixture
+    def openrouter_client_mock(self):
+        mock = unittest.mock.Mock(spec=khc.services.openrouter.client.OpenRouterClient)
+        mock.available.return_value = False
+        return mock
+
+    @pytest.fixture
+    def clock(self):
+        return lambda: datetime.datetime(
+            2025, 1, 15, 8, 0, tzinfo=khc.services.weather.cache.BERLIN
+        )
+
+    def test_answers_from_store_without_calling(self, openrouter_client_mock):
+        answer_store = unittest.mock.Mock(
+            spec=khc.services.weather.answer_store.AnswerStore
+        )
+        answer_store.get.return_value = True
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock,
+            structured=True,
+            answer_store=answer_store,
+        )
+
+        result = weather_service.get_short_answer("24103")
+
+        openrouter_client_mock.verdict_completion.assert_not_called()
+        assert result.startswith("Ja, in deiner Gegend ")
+
+    def test_answers_from_stale_cache(self, openrouter_client_mock):
+        now = [
+            datetime.datetime(
+                2025, 7, 1, 8, 0, tzinfo=khc.services.weather.cache.BERLIN
+            )
+        ]
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock,
+            answer_cache=khc.services.weather.cache.AnswerCache(clock=lambda: now[0]),
+        )
+        weather_service.answer_cache.put("24103", "Ja, gestern.")
+        now[0] += datetime.timedelta(days=1)
+
+        assert weather_service.get_short_answer("24103") == "Ja, gestern."
+        openrouter_client_mock.chat_completion.assert_not_called()
+
+    def test_falls_back_to_seasonal_verdict(self, openrouter_client_mock, clock):
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock,
+            verdict_cache=khc.services.weather.cache.AnswerCache(clock=clock),
+        )
+
+        result = weather_service.get_short_answer("24103")
+
+        openrouter_client_mock.chat_completion.assert_not_called()
+        assert result.startswith("Nein, in deiner Gegend ")
+
+    def test_degrades_while_probe_is_in_flight(self, clock):
+        breaker = khc.base.circuit_breaker.CircuitBreaker(min_calls=1, open_seconds=0.0)
+        breaker.record_failure()
+        probe = breaker.allow()
+        assert probe is not None and probe.probe
+        session = unittest.mock.Mock()
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=khc.services.openrouter.client.OpenRouterClient(
+                api_key="key", session=session, breaker=breaker
+            ),
+            verdict_cache=khc.services.weather.cache.AnswerCache(clock=clock),
+        )
+
+        result = weather_service.get_short_answer("24103")
+
+        session.post.assert_not_called()
+        assert result.startswith("Nein, in deiner Gegend ")
+
+    def test_degrades_when_rejected_by_circuit(self, openrouter_client_mock, clock):
+        openrouter_client_mock.available.side_effect = [True, False]
+        openrouter_client_mock.chat_completion.side_effect = (
+            khc.base.circuit_breaker.CircuitOpenError("Circuit is open.")
+        )
+        weather_service = khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock,
+            verdict_cache=khc.services.weather.cache.AnswerCache(clock=clock),
+        )
+
+        result = weather_service.get_short_answer("24103")
+
+        openrouter_client_mock.chat_completion.assert_called_once()
+        assert result.startswith("Nein, in deiner Gegend ")
+
+
+class TestWeatherServiceRevalidation:
+    @pytest.fixture
+    def openrouter_client_mock(self):
+        return unittest.mock.Mock(spec=khc.services.openrouter.client.OpenRouterClient)
+
+    @pytest.fixture
+    def now(self):
+        return [
+            datetime.datetime(
+                2025, 7, 1, 8, 0, tzinfo=khc.services.weather.cache.BERLIN
+            )
+        ]
+
+    @pytest.fixture
+    def weather_service(self, openrouter_client_mock, now):
+        return khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client_mock,
+            answer_cache=khc.services.weather.cache.AnswerCache(
+                clock=lambda: now[0], refresh_after=datetime.timedelta(hours=1)
+            ),
+        )
+
+    def test_serves_stale_entry_and_refreshes(
+        self, weather_service, openrouter_client_mock, now
+    ):
+        openrouter_client_mock.chat_completion.return_value = "Ja, am Morgen."
+        weather_service.get_short_answer("89073")
+        now[0] += datetime.timedelta(hours=3)
+        openrouter_client_mock.chat_completion.return_value = "Nein, am Mittag."
+
+        assert weather_service.get_short_answer("89073") == "Ja, am Morgen."
+        assert weather_service.refresher.join(5)
+        assert weather_service.get_short_answer("89073") == "Nein, am Mittag."
+        assert openrouter_client_mock.chat_completion.call_count == 2
+        refresh = openrouter_client_mock.chat_completion.call_args.kwargs
+        assert refresh["background"] is True
+        assert (
+            0
+            < refresh["deadline"].remaining()
+            <= khc.services.weather.service.REFRESH_SECONDS
+        )
+
+    def test_fresh_entry_is_not_refreshed(
+        self, weather_service, openrouter_client_mock
+    ):
+        openrouter_client_mock.chat_completion.return_value = "Ja."
+        weather_service.get_short_answer("89073")
+        weather_service.get_short_answer("89073")
+
+        assert weather_service.refresher.pending() == 0
+        openrouter_client_mock.chat_completion.assert_called_once()
+
+
+class TestWeatherServiceSharedCache:
+    @pytest.fixture
+    def backend(self):
+        return khc.services.weather.shared_cache.InMemoryBackend()
+
+    def create_service(self, openrouter_client, backend):
+        return khc.services.weather.service.WeatherService(
+            openrouter_client=openrouter_client,
+            answer_cache=khc.services.weather.shared_cache.TieredCache(
+                backend, "answer", negative_ttl=datetime.timedelta(seconds=30)
+            ),
+        )
+
+    def test_containers_share_answers(self, backend):
+        first_client = unittest.mock.Mock(
+            spec=khc.services.openrouter.client.OpenRouterClient
+        )
+        first_client.chat_completion.return_value = "Ja, Lass baumeln."
+        second_client = unittest.mock.Mock(
+            spec=khc.services.openrouter.client.OpenRouterClient
+        )
+
+        self.create_service(first_client, backend).get_short_answer("12345")
+        second = self.create_service(second_client, backend)
+
+        assert second.get_short_answer("12345") == "Ja, Lass baumeln."
+        second_client.chat_completion.assert_not_called()
+        assert second.answer_cache.stats.shared_hits == 1
+
+    def test_failures_are_not_shared(self, backend):
+        first_client = unittest.mock.Mock(
+            spec=khc.services.openrouter.client.OpenRouterClient
+        )
+        first_client.chat_completion.side_effect = requests.ReadTimeout("Too slow.")
+        second_client = unittest.mock.Mock(
+            spec=khc.services.openrouter.client.OpenRouterClient
+        )
+        second_client.chat_completion.return_value = "Ja, Lass baumeln."
+
+        first = self.create_service(first_client, backend)
+        first.get_short_answer("12345")
+
+        assert (
+            self.create_service(second_client, backend).get_short_answer("12345")
+            == "Ja, Lass baumeln."
+        )
+        assert not first.answer_cache.is_negative("12345")
+        second_client.chat_completion.assert_called_once()
+
+    def test_no_answers_are_cached_negatively(self, backend):
+        first_client = unittest.mock.Mock(
+            spec=khc.services.openrouter.client.OpenRouterClient
+        )
+        first_client.chat_completion.return_value = (
+            khc.services.openrouter.client.FALLBACK_MESSAGE
+        )
+        second_client = unittest.mock.Mock(
+            spec=khc.services.openrouter.client.OpenRouterClient
+        )
+
+        second_client.chat_completion.return_value = "Ja, Lass baumeln."
+
+        first = self.create_service(first_client, backend)
+        first.get_short_answer("12345")
+        first.get_short_answer("12345")
+
+        assert (
+            self.create_service(second_client, backend).get_short_answer("12345")
+            == "Ja, Lass baumeln."
+        )
+        first_client.chat_completion.assert_called_once()
+        second_client.chat_completion.assert_called_once()
@@ -0,0 +1,280 @@
+import datetime
+import socketserver
+import threading
+import unittest.mock
+import pytest
+import khc.services.openrouter.models
+import khc.services.weather.cache
+import khc.services.weather.shared_cache
+
+
+class FakeClock:
+    def __init__(self, now: datetime.datetime) -> None:
+        self.now = now
+
+    def __call__(self) -> datetime.datetime:
+        return self.now
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        values = self.server.values  # type: ignore[attr-defined]
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2].decode())
+            command = args[0].upper()
+            if command == "MGET":
+                reply = b"*%d\r\n" % (len(args) - 1)
+                for key in args[1:]:
+                    value = values.get(key)
+                    if value is None:
+                        reply += b"$-1\r\n"
+                    else:
+                        data = value.encode()
+                        reply += b"$%d\r\n%s\r\n" % (len(data), data)
+            elif command == "SET":
+                values[args[1]] = args[2]
+                reply = b"+OK\r\n"
+            else:
+                reply = b"-ERR unknown command\r\n"
+            self.wfile.write(reply)
+
+
+class TestInMemoryBackend:
+    def test_values_expire(self):
+        now = [1000.0]
+        backend = khc.services.weather.shared_cache.InMemoryBackend(
+            clock=lambda: now[0]
+        )
+        backend.set_many({"a": "1", "b": "2"}, ttl_seconds=10)
+
+        assert backend.get_many(["a", "b", "c"]) == {"a": "1", "b": "2"}
+        now[0] += 10
+        assert backend.get_many(["a"]) == {}
+
+
+class TestRedisBackend:
+    @pytest.fixture
+    def server(self):
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FakeRedisHandler)
+        server.daemon_threads = True
+        server.values = {}  # type: ignore[attr-defined]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    @pytest.fixture
+    def backend(self, server):
+        backend = khc.services.weather.shared_cache.RedisBackend(
+            "127.0.0.1", server.server_address[1], timeout=2
+        )
+        yield backend
+        backend.close()
+
+    def test_set_and_get_many(self, backend, server):
+        backend.set_many({"a": "Jä", "b": "2"}, ttl_seconds=60)
+
+        assert server.values == {"a": "Jä", "b": "2"}
+        assert backend.get_many(["a", "missing", "b"]) == {"a": "Jä", "b": "2"}
+
+    def test_error_reply_raises(self, backend):
+        with pytest.raises(khc.services.weather.shared_cache.RedisError):
+            backend._execute([("FLUSHALL",)])
+        assert backend.get_many(["a"]) == {}
+
+    def test_unreachable_server_raises(self, server):
+        port = server.server_address[1]
+        server.shutdown()
+        server.server_close()
+        backend = khc.services.weather.shared_cache.RedisBackend(
+            "127.0.0.1", port, timeout=0.5
+        )
+
+        with pytest.raises(OSError):
+            backend.get_many(["a"])
+
+
+class TestDynamoDBBackend:
+    def test_get_many_skips_expired_and_retries_unprocessed(self):
+        client = unittest.mock.Mock()
+        client.batch_get_item.side_effect = [
+            {
+                "Responses": {
+                    "answers": [
+                        {
+                            "key": {"S": "a"},
+                            "value": {"S": "1"},
+                            "expires_at": {"N": "2000"},
+                        },
+                        {
+                            "key": {"S": "b"},
+                            "value": {"S": "2"},
+                            "expires_at": {"N": "500"},
+                        },
+                    ]
+                },
+                "UnprocessedKeys": {"answers": {"Keys": [{"key": {"S": "c"}}]}},
+            },
+            {
+                "Responses": {
+                    "answers": [
+                        {
+                            "key": {"S": "c"},
+                            "value": {"S": "3"},
+                            "expires_at": {"N": "2000"},
+                        }
+                    ]
+                }
+            },
+        ]
+        backend = khc.services.weather.shared_cache.DynamoDBBackend(
+            "answers", client=client, clock=lambda: 1000.0
+        )
+
+        assert backend.get_many(["a", "b", "c"]) == {"a": "1", "c": "3"}
+        assert client.batch_get_item.call_count == 2
+
+    def test_set_many_writes_in_batches(self):
+        client = unittest.mock.Mock()
+        client.batch_write_item.return_value = {}
+        backend = khc.services.weather.shared_cache.DynamoDBBackend(
+            "answers", client=client, clock=lambda: 1000.0
+        )
+
+        backend.set_many({str(i): "x" for i in range(30)}, ttl_seconds=60)
+
+        batches = [
+            call.kwargs["RequestItems"]["answers"]
+            for call in client.batch_write_item.call_args_list
+        ]
+        assert [len(batch) for batch in batches] == [25, 5]
+        assert batches[0][0]["PutRequest"]["Item"]["expires_at"] == {"N": "1060"}
+
+
+class TestCreateBackend:
+    def test_redis_url(self):
+        backend = khc.services.weather.shared_cache.create_backend(
+            "redis://cache.local:6380/2"
+        )
+        assert isinstance(backend, khc.services.weather.shared_cache.RedisBackend)
+        assert (backend.host, backend.port, backend.db) == ("cache.local", 6380, 2)
+
+    def test_unknown_url(self):
+        with pytest.raises(ValueError):
+            khc.services.weather.shared_cache.create_backend("memcached://host")
+
+
+class TestTieredCache:
+    @pytest.fixture
+    def clock(self):
+        return FakeClock(
+            datetime.datetime(
+                2025, 7, 1, 8, 0, tzinfo=khc.services.weather.cache.BERLIN
+            )
+        )
+
+    @pytest.fixture
+    def backend(self):
+        return khc.services.weather.shared_cache.InMemoryBackend()
+
+    def create_cache(self, backend, clock):
+        return khc.services.weather.shared_cache.create_verdict_cache(
+            backend,
+            "prefix:3",
+            clock=clock,
+            negative_ttl=datetime.timedelta(seconds=30),
+        )
+
+    def test_writes_through_to_shared_backend(self, backend, clock):
+        verdict = khc.services.openrouter.models.ShortsVerdict(True, "Ulm")
+        self.create_cache(backend, clock).put("prefix3:890", verdict)
+        other = self.create_cache(backend, clock)
+
+        assert other.get("prefix3:890") == verdict
+        assert other.stats.shared_hits == 1
+        # The answer is kept in the process now.
+        assert other.get("prefix3:890") == verdict
+        assert other.stats.hits == 1
+
+    def test_shared_entries_belong_to_their_day(self, backend, clock):
+        cache = self.create_cache(backend, clock)
+        cache.put("a", khc.services.openrouter.models.ShortsVerdict(True))
+        clock.now += datetime.timedelta(days=1)
+
+        assert self.create_cache(backend, clock).get("a") is None
+
+    def test_negative_entries_stay_in_process(self, backend, clock):
+        cache = self.create_cache(backend, clock)
+        cache.put_negative("a")
+        other = self.create_cache(backend, clock)
+
+        assert cache.is_negative("a")
+        assert other.get("a") is None
+        assert not other.is_negative("a")
+        clock.now += datetime.timedelta(seconds=30)
+        assert not cache.is_negative("a")
+
+    def test_skips_shared_negative_entries(self, backend, clock):
+        cache = self.create_cache(backend, clock)
+        backend.set_many(
+            {
+                cache._shared_key(
+                    cache.today(), "a"
+                ): khc.services.weather.shared_cache.NEGATIVE
+            },
+            30,
+        )
+
+        assert cache.get("a") is None
+        assert not cache.is_negative("a")
+
+    def test_get_many_asks_backend_once_for_misses(self, backend, clock):
+        cache = self.create_cache(backend, clock)
+        cache.put_many(
+            {
+                "a": khc.services.openrouter.models.ShortsVerdict(True),
+                "b": khc.services.openrouter.models.ShortsVerdict(False),
+            }
+        )
+        other = self.create_cache(backend, clock)
+        other.put("c", khc.services.openrouter.models.ShortsVerdict(True))
+
+        with unittest.mock.patch.object(
+            backend, "get_many", wraps=backend.get_many
+        ) as get_many:
+            found = other.get_many(["a", "b", "c", "d"])
+
+        assert set(found) == {"a", "b", "c"}
+        get_many.assert_called_once_with(
+            [
+                "verdict:prefix:3:2025-07-01:a",
+                "verdict:prefix:3:2025-07-01:b",
+                "verdict:prefix:3:2025-07-01:d",
+            ]
+        )
+
+    def test_backend_failures_are_misses(self, clock):
+        backend = unittest.mock.Mock(
+            spec=khc.services.weather.shared_cache.CacheBackend
+        )
+        backend.get_many.side_effect = OSError("unreachable")
+        backend.set_many.side_effect = OSError("unreachable")
+        cache = self.create_cache(backend, clock)
+
+        cache.put("a", khc.services.openrouter.models.ShortsVerdict(True))
+        assert cache.get("a") == khc.services.openrouter.models.ShortsVerdict(True)
+        assert cache.get("b") is None
+
+    def test_expires_at_midnight_in_backend(self, backend, clock):
+        with unittest.mock.patch.object(backend, "set_many") as set_many:
+            self.create_cache(backend, clock).put(
+                "a", khc.services.openrouter.models.ShortsVerdict(True)
+            )
+
+        assert set_many.call_args.args[1] == 16 * 3600
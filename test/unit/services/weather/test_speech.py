@@ -0,0 +1,26 @@
+import khc.services.openrouter.models
+import khc.services.weather.speech
+
+
+class TestRenderAnswer:
+    def test_yes(self):
+        verdict = khc.services.openrouter.models.ShortsVerdict(True, "Stuttgart")
+        assert khc.services.weather.speech.render_answer(verdict) == (
+            "Ja, in Stuttgart kann man heute eine kurze Hose tragen. Lass baumeln."
+        )
+
+    def test_no(self):
+        verdict = khc.services.openrouter.models.ShortsVerdict(False, "Kiel")
+        assert khc.services.weather.speech.render_answer(verdict) == (
+            "Nein, in Kiel kann man heute keine kurze Hose tragen. Versteck die Waden."
+        )
+
+    def test_place_overrides_verdict_place(self):
+        verdict = khc.services.openrouter.models.ShortsVerdict(True, "Falsch")
+        answer = khc.services.weather.speech.render_answer(verdict, place="Ulm")
+        assert answer.startswith("Ja, in Ulm ")
+
+    def test_unknown_place(self):
+        verdict = khc.services.openrouter.models.ShortsVerdict(True, None)
+        answer = khc.services.weather.speech.render_answer(verdict)
+        assert answer.startswith("Ja, in deiner Gegend ")
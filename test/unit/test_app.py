@@ -1,6 +1,11 @@
+import os
+import subprocess
+import sys
+import time
 import pytest
 import unittest.mock
 
+import khc.base.deadline
 import khc.handler.launch_request_handler
 import khc.services.postal_code.provider
 import khc.services.openrouter.client
@@ -9,6 +14,8 @@ import ask_sdk_core.skill_builder
 
 import khc.app  # Hier der Modulname deiner create_skill Funktion
 
+SRC_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+
 
 class TestCreateSkill:
     @pytest.fixture(autouse=True)
@@ -23,7 +30,9 @@ class TestCreateSkill:
             spec=khc.services.postal_code.provider.PostalCodeProvider
         )
         monkeypatch.setattr(
-            khc.services.postal_code.provider, "PostalCodeProvider", lambda: postal_mock
+            khc.services.postal_code.provider,
+            "PostalCodeProvider",
+            lambda session, cache: postal_mock,
         )
 
         # Mock OpenRouterClient
@@ -31,7 +40,18 @@ class TestCreateSkill:
             spec=khc.services.openrouter.client.OpenRouterClient
         )
 
-        def openrouter_init(api_key):
+        def openrouter_init(
+            api_key,
+            session,
+            model,
+            hedge_model,
+            hedge_percentile,
+            hedge_ratio,
+            router,
+            emit_metrics,
+            disk_cache,
+            url,
+        ):
             assert api_key == "fake-api-key"
             return openrouter_mock
 
@@ -44,7 +64,16 @@ class TestCreateSkill:
             spec=khc.services.weather.service.WeatherService
         )
 
-        def weather_init(openrouter_client):
+        def weather_init(
+            openrouter_client,
+            answer_cache,
+            verdict_cache,
+            stream,
+            structured,
+            gazetteer,
+            answer_store,
+            region_mapper,
+        ):
             assert openrouter_client == openrouter_mock
             return weather_mock
 
@@ -57,9 +86,16 @@ class TestCreateSkill:
             spec=khc.handler.launch_request_handler.LaunchRequestHandler
         )
 
-        def launch_init(weather_service, postal_provider):
+        launch_kwargs = {}
+
+        def launch_init(
+            weather_service, postal_provider, progressive_response, speculate
+        ):
             assert weather_service == weather_mock
             assert postal_provider == postal_mock
+            launch_kwargs.update(
+                progressive_response=progressive_response, speculate=speculate
+            )
             return launch_handler_mock
 
         monkeypatch.setattr(
@@ -72,7 +108,20 @@ class TestCreateSkill:
         sb_mock.lambda_handler.return_value = "lambda_handler_func"
         monkeypatch.setattr(ask_sdk_core.skill_builder, "SkillBuilder", lambda: sb_mock)
 
-        yield
+        yield launch_kwargs
+
+    def test_create_skill_primes_connections(self, monkeypatch):
+        monkeypatch.setenv("KHC_PRIME_CONNECTIONS", "true")
+        with unittest.mock.patch(
+            "khc.services.session.create_session"
+        ) as create_session_mock:
+            khc.app.create_skill()
+
+        prime_urls = [
+            call.kwargs["prime_urls"] for call in create_session_mock.call_args_list
+        ]
+        assert [khc.app.ALEXA_API_ENDPOINT] in prime_urls
+        assert [khc.services.openrouter.client.OPENROUTER_URL] in prime_urls
 
     def test_create_skill_returns_skillbuilder(self):
         sb = khc.app.create_skill()
@@ -80,7 +129,145 @@ class TestCreateSkill:
         assert hasattr(sb, "add_request_handler")
         assert hasattr(sb, "lambda_handler")
 
+    def test_create_skill_disables_optional_features(self, patch_dependencies):
+        khc.app.create_skill()
+
+        assert patch_dependencies["progressive_response"] is None
+        assert patch_dependencies["speculate"] is False
+
+    def test_create_skill_enables_optional_features(
+        self, monkeypatch, patch_dependencies
+    ):
+        monkeypatch.setenv("KHC_PROGRESSIVE_RESPONSE", "true")
+        monkeypatch.setenv("KHC_SPECULATE", "true")
+        khc.app.create_skill()
+
+        assert patch_dependencies["progressive_response"] is not None
+        assert patch_dependencies["speculate"] is True
+
+    def test_create_skill_warns_about_region_without_verdicts(
+        self, monkeypatch, patch_dependencies, caplog
+    ):
+        monkeypatch.setenv("KHC_REGION", "prefix:3")
+        khc.app.create_skill()
+
+        assert "KHC_STRUCTURED_VERDICTS=true" in caplog.text
+
+    def test_create_skill_accepts_region_with_verdicts(
+        self, monkeypatch, patch_dependencies, caplog
+    ):
+        monkeypatch.setenv("KHC_REGION", "prefix:3")
+        monkeypatch.setenv("KHC_STRUCTURED_VERDICTS", "true")
+        khc.app.create_skill()
+
+        assert "KHC_REGION" not in caplog.text
+
+    def test_create_skill_accepts_region_with_answer_store(
+        self, monkeypatch, patch_dependencies, caplog, tmp_path
+    ):
+        monkeypatch.setenv("KHC_REGION", "prefix:3")
+        monkeypatch.setenv("KHC_ANSWER_STORE_PATH", str(tmp_path / "answers.json"))
+        khc.app.create_skill()
+
+        assert "KHC_REGION" not in caplog.text
+
     def test_lambda_handler_is_created(self):
         sb = khc.app.create_skill()
         lambda_handler = sb.lambda_handler()
         assert lambda_handler == "lambda_handler_func"
+
+    def test_lambda_handler_creates_skill_once(self, monkeypatch):
+        handler = unittest.mock.Mock(return_value={"response": {}})
+        create_skill = unittest.mock.Mock()
+        create_skill.return_value.lambda_handler.return_value = handler
+        monkeypatch.setattr(khc.app, "create_skill", create_skill)
+        monkeypatch.setattr(khc.app, "_handler", None)
+
+        khc.app.lambda_handler({"request": 1}, "context")
+        khc.app.lambda_handler({"request": 2}, "context")
+
+        create_skill.assert_called_once()
+        assert handler.call_count == 2
+        handler.assert_called_with({"request": 2}, "context")
+
+    def test_lambda_handler_charges_skill_creation_to_deadline(self, monkeypatch):
+        deadlines = []
+
+        def handler(event, context):
+            deadlines.append(khc.base.deadline.Deadline.from_lambda_context(context))
+            return {"response": {}}
+
+        def create_skill():
+            time.sleep(0.2)
+            sb = unittest.mock.Mock()
+            sb.lambda_handler.return_value = handler
+            return sb
+
+        monkeypatch.setattr(khc.app, "create_skill", create_skill)
+        monkeypatch.setattr(khc.app, "_handler", None)
+
+        khc.app.lambda_handler({"request": 1}, None)
+
+        budget = (
+            khc.base.deadline.ALEXA_BUDGET_SECONDS - khc.base.deadline.RESERVE_SECONDS
+        )
+        assert deadlines[0].remaining() <= budget - 0.2
+        assert khc.base.deadline.INVOCATION_STARTED.get() is None
+
+
+class TestImportTime:
+    def test_import_defers_heavy_modules(self):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                "import sys, khc.app; print(' '.join(sorted(sys.modules)))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={
+                **os.environ,
+                "PYTHONPATH": SRC_PATH,
+            },
+        )
+
+        modules = result.stdout.split()
+        for heavy in ("requests", "ask_sdk_core", "ask_sdk_model", "khc.services"):
+            assert heavy not in modules
+        cumulative = {
+            fields[2].strip(): int(fields[1])
+            for fields in (line.split("|") for line in result.stderr.splitlines())
+            if len(fields) == 3 and fields[1].strip().isdigit()
+        }
+        assert cumulative["khc.app"] / 1e6 < khc.app.IMPORT_BUDGET_SECONDS
+
+    def test_create_skill_skips_disabled_features(self):
+        env = {
+            name: value
+            for name, value in os.environ.items()
+            if not name.startswith("KHC_")
+        }
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, khc.app; khc.app.create_skill(); "
+                "print(' '.join(sorted(sys.modules)))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**env, "PYTHONPATH": SRC_PATH},
+        )
+
+        modules = result.stdout.split()
+        for optional in (
+            "khc.services.directive.progressive_response",
+            "khc.services.openrouter.disk_cache",
+            "khc.services.weather.answer_store",
+            "khc.services.weather.shared_cache",
+        ):
+            assert optional not in modules
@@ -0,0 +1,172 @@
+import datetime
+import json
+import unittest.mock
+import pytest
+import khc.base.rate_limiter
+import khc.precompute
+import khc.services.gazetteer.index
+import khc.services.openrouter.models
+import khc.services.weather.answer_store
+import khc.services.weather.cache
+import khc.services.weather.region
+import khc.services.weather.service
+import khc.services.weather.shared_cache
+
+DAY = datetime.date(2025, 7, 1)
+
+
+class TestPrecompute:
+    @pytest.fixture
+    def weather_service_mock(self):
+        mock = unittest.mock.Mock(spec=khc.services.weather.service.WeatherService)
+        mock.get_verdicts.side_effect = lambda keys, rate_limiter=None: {
+            key: khc.services.openrouter.models.ShortsVerdict(shorts=key < "50000")
+            for key in keys
+            if key != "99999"
+        }
+        mock.verdict_cache = khc.services.weather.cache.AnswerCache()
+        return mock
+
+    @pytest.fixture
+    def rate_limiter(self):
+        return khc.base.rate_limiter.RateLimiter(rate=1000, burst=1000)
+
+    def test_computes_all_keys(self, weather_service_mock, rate_limiter, tmp_path):
+        verdicts, failed = khc.precompute.precompute(
+            weather_service_mock,
+            ["01067", "70173", "99999"],
+            DAY,
+            str(tmp_path / "checkpoint"),
+            rate_limiter,
+            workers=2,
+        )
+
+        assert verdicts == {"01067": True, "70173": False}
+        assert failed == ["99999"]
+
+    def test_batches_keys(self, weather_service_mock, rate_limiter, tmp_path):
+        verdicts, _ = khc.precompute.precompute(
+            weather_service_mock,
+            ["01067", "24103", "70173"],
+            DAY,
+            str(tmp_path / "checkpoint"),
+            rate_limiter,
+            batch_size=2,
+        )
+
+        assert sorted(
+            call.args[0] for call in weather_service_mock.get_verdicts.call_args_list
+        ) == [["01067", "24103"], ["70173"]]
+        assert len(verdicts) == 3
+        assert all(
+            call.kwargs["rate_limiter"] is rate_limiter
+            for call in weather_service_mock.get_verdicts.call_args_list
+        )
+
+    def test_resumes_from_checkpoint(
+        self, weather_service_mock, rate_limiter, tmp_path
+    ):
+        checkpoint = tmp_path / "checkpoint"
+        checkpoint.write_text(
+            json.dumps({"day": DAY.isoformat(), "key": "01067", "shorts": False})
+            + "\n"
+            + json.dumps({"day": "2025-06-30", "key": "70173", "shorts": True})
+            + "\n"
+            + '{"day": "2025-07-01", "key": "701'
+        )
+
+        verdicts, _ = khc.precompute.precompute(
+            weather_service_mock,
+            ["01067", "70173"],
+            DAY,
+            str(checkpoint),
+            rate_limiter,
+        )
+
+        weather_service_mock.get_verdicts.assert_called_once_with(
+            ["70173"], rate_limiter=rate_limiter
+        )
+        assert verdicts == {"01067": False, "70173": False}
+        assert khc.precompute.load_checkpoint(str(checkpoint), DAY) == verdicts
+
+    def test_computes_one_verdict_per_region(
+        self, weather_service_mock, rate_limiter, tmp_path
+    ):
+        verdicts, _ = khc.precompute.precompute(
+            weather_service_mock,
+            ["70173", "70174", "01067"],
+            DAY,
+            str(tmp_path / "checkpoint"),
+            rate_limiter,
+            region_mapper=khc.services.weather.region.PrefixRegionMapper(digits=2),
+        )
+
+        weather_service_mock.get_verdicts.assert_called_once_with(
+            ["70173", "01067"], rate_limiter=rate_limiter
+        )
+        assert verdicts == {"prefix2:70": False, "prefix2:01": True}
+
+    def test_uses_and_fills_shared_verdict_cache(
+        self, weather_service_mock, rate_limiter, tmp_path
+    ):
+        backend = khc.services.weather.shared_cache.InMemoryBackend()
+        weather_service_mock.verdict_cache = (
+            khc.services.weather.shared_cache.create_verdict_cache(
+                backend, "postal_code"
+            )
+        )
+        other = khc.services.weather.shared_cache.create_verdict_cache(
+            backend, "postal_code"
+        )
+        other.put("01067", khc.services.openrouter.models.ShortsVerdict(False))
+
+        verdicts, _ = khc.precompute.precompute(
+            weather_service_mock,
+            ["01067", "70173"],
+            DAY,
+            str(tmp_path / "checkpoint"),
+            rate_limiter,
+        )
+
+        weather_service_mock.get_verdicts.assert_called_once_with(
+            ["70173"], rate_limiter=rate_limiter
+        )
+        assert verdicts == {"01067": False, "70173": False}
+        other.clear()
+        assert other.get("70173") == khc.services.openrouter.models.ShortsVerdict(False)
+
+
+class TestMain:
+    def test_requires_gazetteer(self, tmp_path):
+        exit_code = khc.precompute.main(
+            [str(tmp_path / "answers.json"), "--gazetteer", str(tmp_path / "none")]
+        )
+        assert exit_code == 1
+
+    def test_writes_answer_store(self, tmp_path, monkeypatch):
+        gazetteer_path = str(tmp_path / "postal_codes.bin")
+        khc.services.gazetteer.index.write_index(
+            [
+                khc.services.gazetteer.index.Place(
+                    "01067", "Dresden", "Sachsen", 51, 13
+                ),
+                khc.services.gazetteer.index.Place("70173", "Stuttgart", "BW", 48, 9),
+            ],
+            gazetteer_path,
+        )
+        monkeypatch.setattr(
+            khc.services.weather.service.WeatherService,
+            "get_verdicts",
+            lambda self, keys, rate_limiter=None: {
+                key: khc.services.openrouter.models.ShortsVerdict(True) for key in keys
+            },
+        )
+        output = str(tmp_path / "answers.json")
+
+        exit_code = khc.precompute.main(
+            [output, "--gazetteer", gazetteer_path, "--rate", "1000"]
+        )
+
+        assert exit_code == 0
+        store = khc.services.weather.answer_store.AnswerStore(output)
+        assert len(store) == 2